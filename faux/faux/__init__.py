@@ -1,10 +1,20 @@
 import logging
 import logging.config
-import os
+from typing import Optional
 
+from faux.core.config import get_config
 
-def configure_logging():
-    log_level = os.getenv("LOG_LEVEL", "INFO")
+
+def configure_logging(level: Optional[str] = None):
+    """
+    Sets up logging to stderr for the applications built on faux.
+
+    Importing faux doesn't touch the logging configuration, entry points such as
+    main.py call this explicitly.
+
+    :param level: The log level. Defaults to the log_level of the active FauxConfig.
+    """
+    log_level = level or get_config().log_level
     log_format = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
 
     logging.basicConfig(
@@ -12,11 +22,9 @@ def configure_logging():
         format=log_format,
         handlers=[logging.StreamHandler()],
     )
+    logger.info("Logging is configured for faux package")
 
 
-# Configure logging for the package
-configure_logging()
-
-# Create a logger for this package
+# Create a logger for this package, silent until logging is configured
 logger = logging.getLogger(__name__)
-logger.info("Logging is configured for faux package")
+logger.addHandler(logging.NullHandler())
@@ -0,0 +1,523 @@
+import argparse
+import fnmatch
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Callable, NamedTuple
+
+import numpy as np
+
+from faux.bus.brokers import BrokerPublisher, InMemoryBroker
+from faux.bus.event_bus import EventBus
+from faux.bus.subscribers import MessageCounter, NdjsonTopicWriter
+from faux.core import faux_utils
+from faux.core.config import configure
+from faux.core.identity import IdentityPool
+from faux.core.metrics import Metrics
+from faux.core.models import User as UserModel
+from faux.database.catalog import ProductCatalog, file_catalog
+from faux.simulator.batch import Chunk, count_rows, generate_customer_batch
+from faux.simulator.sim_utils import (
+    create_simulation,
+    generate_customer_data,
+    iter_simulation,
+)
+from faux.simulator.streams import RandomStreams
+from faux.sinks.columnar import ColumnarFileSink
+from faux.sinks.ndjson import NdjsonFileSink
+
+# The postgres sink benchmarks write to a throwaway schema that is dropped once
+# the run is over. `main` configures it before the database modules are imported,
+# which only the postgres benchmarks do.
+BENCHMARK_SCHEMA = os.getenv("FAUX_BENCHMARK_SCHEMA", "faux_benchmark")
+
+RESULTS_VERSION = 1
+NOW = datetime(2024, 5, 25)
+
+
+class Benchmark(NamedTuple):
+    """
+    A single benchmark.
+
+    `setup` prepares the input for `size` units of work and isn't timed, `run`
+    does the work and returns the number of processed units by name (e.g.
+    customers and rows), which are turned into throughputs.
+    """
+
+    name: str
+    size: int
+    setup: Callable[[int, int], Any]
+    run: Callable[[Any], dict[str, int]]
+
+
+def benchmark_catalog(seed: int) -> ProductCatalog:
+    """
+    Builds the product catalog from config/products.json with ids drawn from the
+    seed, so benchmarks don't depend on the products stored in a database.
+    """
+    return file_catalog(seed)
+
+
+def _seeded_streams(seed: int) -> RandomStreams:
+    return RandomStreams.from_seed_sequence(np.random.SeedSequence(seed))
+
+
+def _setup_models(size: int, seed: int) -> list[UserModel]:
+    faux_utils.fake.seed_instance(seed)
+    return [
+        UserModel(**faux_utils.generate_customer(dump_mode="python", ts=NOW))
+        for _ in range(size)
+    ]
+
+
+def _run_dump_model(models: list[UserModel]) -> dict[str, int]:
+    for model in models:
+        faux_utils.dump_model(model, "json")
+    return {"models": len(models)}
+
+
+def _run_generate_customer(args: tuple[int, RandomStreams]) -> dict[str, int]:
+    size, streams = args
+    for _ in range(size):
+        faux_utils.generate_customer(faker=streams.fake, customer_id=streams.uuid4(), ts=NOW)
+    return {"customers": size}
+
+
+def _run_generate_customer_data(
+    args: tuple[int, RandomStreams, ProductCatalog]
+) -> dict[str, int]:
+    size, streams, catalog = args
+    records = [
+        generate_customer_data(streams=streams, now=NOW, catalog=catalog)
+        for _ in range(size)
+    ]
+    return {"customers": size, "rows": count_rows(records)}
+
+
+def _run_generate_customer_batch(
+    args: tuple[int, RandomStreams, ProductCatalog]
+) -> dict[str, int]:
+    size, streams, catalog = args
+    batch = generate_customer_batch(
+        size, streams.numpy, catalog.ids, now=NOW, fake=streams.fake
+    )
+    return {"customers": size, "rows": size + batch.num_events}
+
+
+def _setup_simulation(identity_pool: bool = False) -> Callable[[int, int], dict]:
+    def setup(size: int, seed: int) -> dict[str, Any]:
+        return {
+            "n": size,
+            "seed": seed,
+            "catalog": benchmark_catalog(seed),
+            "identities": IdentityPool(seed=seed) if identity_pool else None,
+        }
+
+    return setup
+
+
+def _simulation(**options: Any) -> Callable[[dict[str, Any]], dict[str, int]]:
+    def run(arguments: dict[str, Any]) -> dict[str, int]:
+        records = create_simulation(**arguments, **options)
+        return {"customers": arguments["n"], "rows": count_rows(records)}
+
+    return run
+
+
+def _run_compact_simulation(arguments: dict[str, Any]) -> dict[str, int]:
+    # the chunks are kept, so the peak memory is that of the whole simulation
+    chunks = list(iter_simulation(**arguments, mode="batch", compact=True))
+    return {"customers": arguments["n"], "rows": sum(map(count_rows, chunks))}
+
+
+def _setup_sink_data(compact: bool = False) -> Callable[[int, int], list[Chunk]]:
+    def setup(size: int, seed: int) -> list[Chunk]:
+        return list(
+            iter_simulation(
+                size,
+                seed=seed,
+                mode="batch",
+                trusted=True,
+                catalog=benchmark_catalog(seed),
+                compact=compact,
+            )
+        )
+
+    return setup
+
+
+def _setup_postgres_data(
+    compact: bool = False, replay: bool = False
+) -> Callable[[int, int], list[Chunk]]:
+    generate = _setup_sink_data(compact)
+
+    def setup(size: int, seed: int) -> list[Chunk]:
+        from faux.database.base import Base, get_engine
+        from faux.database.db_models import Events, User
+        from faux.sinks.postgres import PostgresSink
+
+        chunks = generate(size, seed)
+        with get_engine().begin() as connection:
+            Base.metadata.create_all(connection)
+            connection.exec_driver_sql(
+                f"TRUNCATE {User.__table__.fullname}, {Events.__table__.fullname}"
+            )
+        if replay:
+            # every row already exists, as when a run is written a second time
+            with PostgresSink(mode="copy") as sink:
+                sink.write_all(chunks)
+        return chunks
+
+    return setup
+
+
+def _sink_counts(chunks: list[Chunk]) -> dict[str, int]:
+    return {
+        "customers": sum(map(len, chunks)),
+        "rows": sum(map(count_rows, chunks)),
+    }
+
+
+def _postgres_sink(mode: str, connections: int = 1) -> Callable[[Any], dict[str, int]]:
+    def run(chunks: list[Chunk]) -> dict[str, int]:
+        from faux.sinks.postgres import PostgresSink
+
+        with PostgresSink(mode=mode, connections=connections) as sink:
+            sink.write_all(chunks)
+        return _sink_counts(chunks)
+
+    return run
+
+
+def _run_parquet_sink(chunks: list[Chunk]) -> dict[str, int]:
+    with tempfile.TemporaryDirectory() as root:
+        with ColumnarFileSink(root) as sink:
+            sink.write_all(chunks)
+    return _sink_counts(chunks)
+
+
+def _run_ndjson_sink(chunks: list[Chunk]) -> dict[str, int]:
+    with tempfile.TemporaryDirectory() as root:
+        with NdjsonFileSink(root) as sink:
+            sink.write_all(chunks)
+    return _sink_counts(chunks)
+
+
+def _run_bus_fan_out(chunks: list[Chunk]) -> dict[str, int]:
+    with tempfile.TemporaryDirectory() as root:
+        with EventBus() as bus:
+            bus.subscribe(NdjsonTopicWriter(root), name="files")
+            bus.subscribe(BrokerPublisher(InMemoryBroker()), name="broker")
+            bus.subscribe(MessageCounter(Metrics()), name="metrics")
+            bus.publish_all(chunks)
+    return _sink_counts(chunks)
+
+
+def _with_catalog(size: int, seed: int) -> tuple[int, RandomStreams, ProductCatalog]:
+    return size, _seeded_streams(seed), benchmark_catalog(seed)
+
+
+BENCHMARKS = [
+    Benchmark("micro.dump_model", 20_000, _setup_models, _run_dump_model),
+    Benchmark(
+        "micro.generate_customer",
+        5_000,
+        lambda size, seed: (size, _seeded_streams(seed)),
+        _run_generate_customer,
+    ),
+    Benchmark(
+        "micro.generate_customer_data",
+        1_000,
+        _with_catalog,
+        _run_generate_customer_data,
+    ),
+    Benchmark(
+        "micro.generate_customer_batch",
+        5_000,
+        _with_catalog,
+        _run_generate_customer_batch,
+    ),
+    Benchmark(
+        "simulation.scalar",
+        2_000,
+        _setup_simulation(),
+        _simulation(mode="scalar"),
+    ),
+    Benchmark(
+        "simulation.scalar_trusted",
+        2_000,
+        _setup_simulation(),
+        _simulation(mode="scalar", trusted=True),
+    ),
+    Benchmark(
+        "simulation.batch",
+        10_000,
+        _setup_simulation(),
+        _simulation(mode="batch"),
+    ),
+    Benchmark(
+        "simulation.batch_identity_pool",
+        10_000,
+        _setup_simulation(identity_pool=True),
+        _simulation(mode="batch"),
+    ),
+    Benchmark(
+        "simulation.batch_compact",
+        10_000,
+        _setup_simulation(),
+        _run_compact_simulation,
+    ),
+    Benchmark("sink.postgres_orm", 2_000, _setup_postgres_data(), _postgres_sink("orm")),
+    Benchmark(
+        "sink.postgres_orm_compact",
+        2_000,
+        _setup_postgres_data(compact=True),
+        _postgres_sink("orm"),
+    ),
+    Benchmark(
+        "sink.postgres_orm_4_connections",
+        2_000,
+        _setup_postgres_data(),
+        _postgres_sink("orm", connections=4),
+    ),
+    Benchmark("sink.postgres_copy", 5_000, _setup_postgres_data(), _postgres_sink("copy")),
+    Benchmark(
+        "sink.postgres_copy_compact",
+        5_000,
+        _setup_postgres_data(compact=True),
+        _postgres_sink("copy"),
+    ),
+    Benchmark(
+        "sink.postgres_copy_4_connections",
+        5_000,
+        _setup_postgres_data(),
+        _postgres_sink("copy", connections=4),
+    ),
+    Benchmark("sink.postgres_merge", 5_000, _setup_postgres_data(), _postgres_sink("merge")),
+    Benchmark(
+        "sink.postgres_merge_replay",
+        5_000,
+        _setup_postgres_data(replay=True),
+        _postgres_sink("merge"),
+    ),
+    Benchmark("sink.parquet", 5_000, _setup_sink_data(), _run_parquet_sink),
+    Benchmark(
+        "sink.parquet_compact",
+        5_000,
+        _setup_sink_data(compact=True),
+        _run_parquet_sink,
+    ),
+    Benchmark("sink.ndjson", 5_000, _setup_sink_data(), _run_ndjson_sink),
+    Benchmark(
+        "sink.ndjson_compact",
+        5_000,
+        _setup_sink_data(compact=True),
+        _run_ndjson_sink,
+    ),
+    Benchmark("bus.fan_out", 5_000, _setup_sink_data(compact=True), _run_bus_fan_out),
+]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _measure(benchmark: Benchmark, size: int, seed: int, connection: Any) -> None:
+    """
+    Runs one benchmark in a forked child process and sends its measurements back.
+    """
+    try:
+        if "faux.database.base" in sys.modules:
+            from faux.database.base import dispose_inherited_engine
+
+            dispose_inherited_engine()
+        state = benchmark.setup(size, seed)
+        gc.collect()
+        started = time.perf_counter()
+        counts = benchmark.run(state)
+        seconds = time.perf_counter() - started
+        connection.send(
+            {"seconds": seconds, "counts": counts, "peak_rss_mb": _peak_rss_mb()}
+        )
+    except BaseException:
+        connection.send({"error": traceback.format_exc()})
+    finally:
+        connection.close()
+
+
+def run_benchmark(benchmark: Benchmark, scale: float, seed: int, repeat: int) -> dict:
+    """
+    Runs a benchmark `repeat` times, each run in a fresh process so the peak memory
+    of every run is measured on its own.
+
+    :param benchmark: The benchmark to run.
+    :param scale: The factor the benchmark's size is multiplied with.
+    :param seed: The seed every run starts from.
+    :param repeat: The number of runs.
+    :return: The result of the benchmark. Throughputs are those of the fastest run.
+    """
+    context = multiprocessing.get_context("fork")
+    size = max(1, int(benchmark.size * scale))
+    runs = []
+    for _ in range(repeat):
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_measure, args=(benchmark, size, seed, sender)
+        )
+        process.start()
+        sender.close()
+        try:
+            measurement = receiver.recv()
+        except EOFError:
+            measurement = {"error": f"process exited with code {process.exitcode}"}
+        process.join()
+        if "error" in measurement:
+            raise RuntimeError(f"{benchmark.name} failed:\n{measurement['error']}")
+        runs.append(measurement)
+
+    best = min(runs, key=lambda measurement: measurement["seconds"])
+    return {
+        "size": size,
+        "seconds": best["seconds"],
+        "runs": [measurement["seconds"] for measurement in runs],
+        "throughput": {
+            f"{unit}_per_second": count / best["seconds"]
+            for unit, count in best["counts"].items()
+        },
+        "peak_rss_mb": max(measurement["peak_rss_mb"] for measurement in runs),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compares benchmark results with a baseline.
+
+    :param results: The results of the current run.
+    :param baseline: The results of an earlier run.
+    :param threshold: The fraction by which a throughput may drop before it counts
+        as a regression, e.g. 0.1 for 10%.
+    :return: A description of every regression.
+    """
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            continue
+        for metric, value in result["throughput"].items():
+            reference = previous["throughput"].get(metric)
+            if reference and value < reference * (1 - threshold):
+                regressions.append(
+                    f"{name} {metric}: {value:,.0f} < {reference:,.0f} "
+                    f"({value / reference - 1:+.1%})"
+                )
+    return regressions
+
+
+def drop_benchmark_schema() -> None:
+    from sqlalchemy.schema import DropSchema
+
+    from faux.database.base import get_engine
+
+    with get_engine().begin() as connection:
+        connection.execute(DropSchema(BENCHMARK_SCHEMA, cascade=True, if_exists=True))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the simulator and the sinks. Sink benchmarks write to "
+        "a throwaway schema (FAUX_BENCHMARK_SCHEMA, default 'faux_benchmark') of the "
+        "DATABASE_URL database, which is dropped afterwards."
+    )
+    parser.add_argument(
+        "-o", "--output", default="benchmark-results.json", help="file the results are written to"
+    )
+    parser.add_argument(
+        "--baseline", default=None, help="results of an earlier run to compare with"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="fraction a throughput may drop below the baseline before the run fails",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="seed of every benchmark")
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="factor applied to every benchmark size"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark")
+    parser.add_argument(
+        "-k",
+        "--only",
+        action="append",
+        default=None,
+        metavar="PATTERN",
+        help="only run the benchmarks matching this glob pattern, e.g. 'sink.*'",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    configure(project_schema=BENCHMARK_SCHEMA)
+
+    benchmarks = [
+        benchmark
+        for benchmark in BENCHMARKS
+        if not args.only
+        or any(fnmatch.fnmatch(benchmark.name, pattern) for pattern in args.only)
+    ]
+    results = {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "benchmarks": {},
+    }
+    try:
+        for benchmark in benchmarks:
+            result = run_benchmark(benchmark, args.scale, args.seed, args.repeat)
+            results["benchmarks"][benchmark.name] = result
+            throughput = ", ".join(
+                f"{value:,.0f} {metric.replace('_', ' ')}"
+                for metric, value in result["throughput"].items()
+            )
+            print(
+                f"{benchmark.name:<34} {result['seconds']:8.3f}s  {throughput}  "
+                f"peak {result['peak_rss_mb']:.0f} MB"
+            )
+    finally:
+        # only the postgres sink benchmarks need a database
+        if any(benchmark.name.startswith("sink.postgres") for benchmark in benchmarks):
+            drop_benchmark_schema()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No throughput regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
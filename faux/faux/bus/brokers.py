@@ -0,0 +1,102 @@
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from typing import Any, Optional
+
+from faux.core.encoding import dumps
+
+
+class Broker(ABC):
+    """
+    The interface of an adapter to a message broker, e.g. a RabbitMQ exchange
+    that routes messages by their topic as routing key.
+
+    Brokers receive the messages of the event bus already batched and encoded
+    as JSON, see `BrokerPublisher`, and must be closed once publishing is done.
+    """
+
+    @abstractmethod
+    def publish(self, topic: str, payloads: list[bytes]) -> None:
+        """
+        Publishes a batch of encoded messages to a topic.
+
+        :param topic: The topic, e.g. 'checkout'.
+        :param payloads: The messages, each encoded as a JSON document.
+        """
+
+    def close(self) -> None:
+        """
+        Flushes any buffered messages and releases the broker connection.
+        """
+
+
+class InMemoryBroker(Broker):
+    """
+    A stand-in broker that keeps the published messages in memory, to exercise
+    the broker path without a broker server.
+
+    Every topic is a queue of payloads that can be consumed in publish order,
+    from any thread. With `max_messages`, only the most recent messages of a
+    topic are kept.
+
+    Attributes:
+        max_messages (Optional[int]): The maximum number of messages kept per topic.
+        published (dict[str, int]): The number of messages published per topic.
+    """
+
+    def __init__(self, max_messages: Optional[int] = None):
+        self.max_messages = max_messages
+        self.published: dict[str, int] = defaultdict(int)
+        self._queues: dict[str, deque] = defaultdict(lambda: deque(maxlen=max_messages))
+        self._lock = threading.Lock()
+
+    def publish(self, topic: str, payloads: list[bytes]) -> None:
+        with self._lock:
+            self._queues[topic].extend(payloads)
+            self.published[topic] += len(payloads)
+
+    def topics(self) -> list[str]:
+        with self._lock:
+            return sorted(self._queues)
+
+    def pending(self, topic: str) -> int:
+        """
+        Returns the number of messages of a topic that weren't consumed yet.
+        """
+        with self._lock:
+            return len(self._queues.get(topic, ()))
+
+    def consume(self, topic: str, max_messages: Optional[int] = None) -> list[bytes]:
+        """
+        Takes the oldest messages of a topic.
+
+        :param topic: The topic.
+        :param max_messages: Optional maximum number of messages to take. Takes
+            all of them when None.
+        :return: The encoded messages, oldest first.
+        """
+        with self._lock:
+            queue = self._queues.get(topic)
+            if not queue:
+                return []
+            count = len(queue) if max_messages is None else min(max_messages, len(queue))
+            return [queue.popleft() for _ in range(count)]
+
+
+class BrokerPublisher:
+    """
+    An event bus handler that forwards every batch of messages to a broker,
+    encoded with `faux.core.encoding.dumps`.
+
+    Attributes:
+        broker (Broker): The broker the messages are published to.
+    """
+
+    def __init__(self, broker: Broker):
+        self.broker = broker
+
+    def __call__(self, topic: str, messages: list[Any]) -> None:
+        self.broker.publish(topic, [dumps(message) for message in messages])
+
+    def close(self) -> None:
+        self.broker.close()
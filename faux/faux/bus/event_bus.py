@@ -0,0 +1,349 @@
+import fnmatch
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Iterable, Optional
+
+from faux.simulator.batch import EVENT_TYPES, Chunk, CustomerBatch
+from faux.simulator.pipeline import StageStats
+
+logger = logging.getLogger(__name__)
+
+# The topic user rows are published to, events are published to their event type
+USERS_TOPIC = "users"
+TOPICS = (USERS_TOPIC, *EVENT_TYPES)
+
+# Receives the topic and a batch of messages of that topic
+Handler = Callable[[str, list[Any]], None]
+
+# Returned by a closed buffer once it is drained
+_DONE = object()
+
+
+def chunk_messages(chunk: Chunk) -> dict[str, list[dict[str, Any]]]:
+    """
+    Splits a chunk into the messages of every topic: its user rows and its event
+    rows by event type.
+
+    :param chunk: A list of dictionaries containing customer and event data, or a CustomerBatch.
+    :return: The messages keyed by topic, without empty topics.
+    """
+    if isinstance(chunk, CustomerBatch):
+        # batches are dumped straight to UUIDs and datetimes
+        users, events = chunk.to_rows("python")
+    else:
+        users = [customer_data["customer"] for customer_data in chunk]
+        events = [event for customer_data in chunk for event in customer_data["events"]]
+
+    messages = defaultdict(list)
+    if users:
+        messages[USERS_TOPIC] = users
+    for event in events:
+        messages[event["event_type"]].append(event)
+    return messages
+
+
+class _Buffer:
+    """
+    A bounded FIFO of (topic, messages) items that holds at most `capacity`
+    messages. A put blocks while the buffer is full, unless the buffer is empty,
+    so an item larger than the capacity still gets through.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.size = 0
+        self._items: deque = deque()
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def put(self, topic: str, messages: list[Any], abort: threading.Event) -> None:
+        with self._condition:
+            while self.size and self.size + len(messages) > self.capacity:
+                if abort.is_set():
+                    return
+                # wakes up regularly to notice an abort
+                self._condition.wait(0.1)
+            self._items.append((topic, messages))
+            self.size += len(messages)
+            self._condition.notify_all()
+
+    def get(self, timeout: Optional[float]) -> Any:
+        """
+        Takes the oldest item, or returns None when none arrived within timeout
+        and _DONE once the buffer is closed and drained.
+        """
+        with self._condition:
+            if not self._items and not self._closed:
+                self._condition.wait(timeout)
+            if self._items:
+                topic, messages = self._items.popleft()
+                self.size -= len(messages)
+                self._condition.notify_all()
+                return topic, messages
+            return _DONE if self._closed else None
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class Subscription:
+    """
+    A handler consuming the messages of the topics it subscribed to in its own thread.
+
+    Messages are collected per topic and handed to the handler in batches of
+    `batch_size` messages. A partial batch is handed over once its oldest
+    message has waited `linger` seconds, so slow topics aren't held back
+    indefinitely. Published messages wait in a buffer of at most `buffer_size`
+    messages, and publishing blocks while it is full, so a slow subscriber slows
+    down the publisher instead of growing memory.
+
+    Attributes:
+        name (str): The name of the subscription, also used for its thread.
+        patterns (tuple[str, ...]): The topics the subscription receives, as
+            fnmatch patterns, e.g. `("*",)` or `("checkout", "users")`.
+        batch_size (int): The maximum number of messages per batch.
+        linger (float): The longest a message waits for its batch to fill, in seconds.
+        buffer_size (int): The maximum number of messages waiting to be handled.
+        stats (StageStats): The batches and messages handled so far and the
+            seconds the handler spent on them.
+    """
+
+    def __init__(
+        self,
+        bus: "EventBus",
+        handler: Handler,
+        patterns: tuple[str, ...],
+        name: str,
+        batch_size: int,
+        linger: float,
+        buffer_size: int,
+    ):
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1: {batch_size}")
+        if linger < 0:
+            raise ValueError(f"linger must not be negative: {linger}")
+        self.name = name
+        self.patterns = patterns
+        self.batch_size = batch_size
+        self.linger = linger
+        self.buffer_size = buffer_size
+        self.stats = StageStats(name)
+        self._bus = bus
+        self._handler = handler
+        self._buffer = _Buffer(buffer_size)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def matches(self, topic: str) -> bool:
+        return any(fnmatch.fnmatchcase(topic, pattern) for pattern in self.patterns)
+
+    def _put(self, topic: str, messages: list[Any]) -> None:
+        self._buffer.put(topic, messages, self._bus._failed)
+
+    def _dispatch(self, topic: str, batch: list[Any]) -> None:
+        if self._bus._failed.is_set():
+            return
+        try:
+            started = time.perf_counter()
+            self._handler(topic, batch)
+            self.stats.add(len(batch), time.perf_counter() - started)
+        except Exception as e:
+            self._bus._fail(e)
+
+    def _flush(self, pending: dict[str, list[Any]]) -> None:
+        for topic, batch in pending.items():
+            if batch:
+                self._dispatch(topic, batch)
+        pending.clear()
+
+    def _run(self) -> None:
+        pending: dict[str, list[Any]] = {}
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            item = self._buffer.get(timeout)
+            if item is _DONE:
+                self._flush(pending)
+                return
+            if item is not None:
+                topic, messages = item
+                if deadline is None:
+                    deadline = time.monotonic() + self.linger
+                batch = pending.setdefault(topic, [])
+                batch.extend(messages)
+                while len(batch) >= self.batch_size:
+                    self._dispatch(topic, batch[: self.batch_size])
+                    del batch[: self.batch_size]
+            if deadline is not None and time.monotonic() >= deadline:
+                self._flush(pending)
+                deadline = None
+
+    def _close(self) -> None:
+        """
+        Hands over what is left in the buffer and stops the thread. Closes the
+        handler too if it has a `close` method.
+        """
+        self._buffer.close()
+        self._thread.join()
+        close = getattr(self._handler, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                self._bus._fail(e)
+        logger.info(str(self.stats))
+
+
+class EventBus:
+    """
+    An in-process publish/subscribe bus for the simulated users and events.
+
+    Every message is published to a topic, user rows to 'users' and event rows
+    to their event type (see `publish_chunk`), and delivered to every
+    subscription whose patterns match the topic. Every subscription consumes in
+    its own thread with its own bounded buffer, so one generated stream can be
+    fanned out to several consumers, e.g. a database, files and a broker (see
+    `faux.bus.subscribers`), which all work in parallel. Subscribers receive the
+    same message objects and must not modify them.
+
+    When a handler fails, the remaining messages are dropped and the error is
+    raised by the next publish or by `close`, like `run_pipeline` stops at the
+    first failed write.
+
+    Attributes:
+        batch_size (int): The default batch size of new subscriptions.
+        linger (float): The default linger of new subscriptions, in seconds.
+        buffer_size (int): The default buffer size of new subscriptions, in messages.
+        subscriptions (list[Subscription]): The subscriptions, in subscription order.
+    """
+
+    def __init__(self, batch_size: int = 1000, linger: float = 0.05, buffer_size: int = 50_000):
+        self.batch_size = batch_size
+        self.linger = linger
+        self.buffer_size = buffer_size
+        self.subscriptions: list[Subscription] = []
+        self._routes: dict[str, list[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._failed = threading.Event()
+        self._errors: list[Exception] = []
+        self._closed = False
+
+    def subscribe(
+        self,
+        handler: Handler,
+        topics: Iterable[str] = ("*",),
+        name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        linger: Optional[float] = None,
+        buffer_size: Optional[int] = None,
+    ) -> Subscription:
+        """
+        Subscribes a handler to topics and starts its thread.
+
+        :param handler: Called with a topic and a batch of its messages. If it has
+            a `close` method, that is called when the bus is closed.
+        :param topics: The topics to receive, as fnmatch patterns. Defaults to all topics.
+        :param name: Optional name of the subscription.
+        :param batch_size: Optional batch size, defaults to the bus's.
+        :param linger: Optional linger in seconds, defaults to the bus's.
+        :param buffer_size: Optional buffer size in messages, defaults to the bus's.
+        :return: The subscription.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The event bus is closed")
+            subscription = Subscription(
+                self,
+                handler,
+                tuple(topics),
+                name or f"faux-subscriber-{len(self.subscriptions)}",
+                batch_size or self.batch_size,
+                self.linger if linger is None else linger,
+                buffer_size or self.buffer_size,
+            )
+            self.subscriptions.append(subscription)
+            self._routes.clear()
+        return subscription
+
+    def _route(self, topic: str) -> list[Subscription]:
+        routes = self._routes.get(topic)
+        if routes is None:
+            with self._lock:
+                routes = self._routes[topic] = [
+                    subscription
+                    for subscription in self.subscriptions
+                    if subscription.matches(topic)
+                ]
+        return routes
+
+    def _fail(self, error: Exception) -> None:
+        with self._lock:
+            self._errors.append(error)
+        self._failed.set()
+
+    def _raise_error(self) -> None:
+        if self._errors:
+            raise self._errors[0]
+
+    def publish(self, topic: str, messages: list[Any]) -> None:
+        """
+        Publishes messages to a topic. Blocks while the buffer of a subscription
+        receiving the topic is full.
+
+        :param topic: The topic, e.g. 'checkout'.
+        :param messages: The messages. Topics nobody subscribed to are dropped.
+        :raises RuntimeError: If the bus is closed.
+        """
+        if self._closed:
+            raise RuntimeError("The event bus is closed")
+        self._raise_error()
+        if not messages:
+            return
+        for subscription in self._route(topic):
+            subscription._put(topic, messages)
+
+    def publish_chunk(self, chunk: Chunk) -> int:
+        """
+        Publishes the users and events of a chunk, see `chunk_messages`.
+
+        :param chunk: A list of dictionaries containing customer and event data, or a CustomerBatch.
+        :return: The number of published messages.
+        """
+        published = 0
+        for topic, messages in chunk_messages(chunk).items():
+            self.publish(topic, messages)
+            published += len(messages)
+        return published
+
+    def publish_all(self, chunks: Iterable[Chunk]) -> int:
+        """
+        Publishes every chunk of an iterable, e.g. the output of `iter_simulation`.
+
+        :param chunks: An iterable of chunks.
+        :return: The number of published messages.
+        """
+        return sum(self.publish_chunk(chunk) for chunk in chunks)
+
+    def close(self) -> None:
+        """
+        Waits for every subscription to handle its buffered messages and stops them.
+
+        :raises Exception: The first error of a handler, if any failed.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for subscription in self.subscriptions:
+            subscription._close()
+        self._raise_error()
+
+    def __enter__(self) -> "EventBus":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
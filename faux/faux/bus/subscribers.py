@@ -0,0 +1,86 @@
+import logging
+import uuid
+from pathlib import Path
+from typing import IO, Any, Union
+
+from faux.bus.event_bus import USERS_TOPIC
+from faux.core.encoding import dumps_lines
+from faux.core.metrics import Metrics, metrics
+
+logger = logging.getLogger(__name__)
+
+# The subscribers the bus sink of faux.main can fan out to
+SUBSCRIBERS = ("postgres", "ndjson", "metrics")
+
+
+class PostgresWriter:
+    """
+    An event bus handler that writes every batch to the users or events table,
+    in its own transaction.
+
+    Attributes:
+        mode (str): How the rows are loaded, one of SINK_MODES. See `write_rows`.
+    """
+
+    def __init__(self, mode: str = "copy"):
+        from faux.database.db_utils import SINK_MODES
+
+        if mode not in SINK_MODES:
+            raise ValueError(f"Unsupported sink mode: {mode}")
+        self.mode = mode
+
+    def __call__(self, topic: str, messages: list[dict[str, Any]]) -> None:
+        from faux.database.db_utils import write_rows
+
+        if topic == USERS_TOPIC:
+            write_rows(messages, [], self.mode)
+        else:
+            write_rows([], messages, self.mode)
+
+
+class NdjsonTopicWriter:
+    """
+    An event bus handler that appends every topic to its own newline delimited
+    JSON file, `<root>/<topic>/part-<id>.ndjson`, one message per line.
+
+    Attributes:
+        root (Path): The directory the topic files are written to.
+        messages_written (dict[str, int]): The number of messages written per topic.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.messages_written: dict[str, int] = {}
+        self._part_name = f"part-{uuid.uuid4().hex[:12]}.ndjson"
+        self._files: dict[str, IO[bytes]] = {}
+
+    def __call__(self, topic: str, messages: list[Any]) -> None:
+        file = self._files.get(topic)
+        if file is None:
+            path = self.root / topic / self._part_name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            file = self._files[topic] = open(path, "wb")
+        file.write(dumps_lines(messages))
+        self.messages_written[topic] = self.messages_written.get(topic, 0) + len(messages)
+
+    def close(self) -> None:
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+        logger.info(f"Wrote {self.messages_written} messages as NDJSON to {self.root}")
+
+
+class MessageCounter:
+    """
+    An event bus handler that counts the messages of every topic as the
+    `<topic>_messages` counter of a Metrics instance.
+
+    Attributes:
+        metrics (Metrics): The metrics the counters are kept in.
+    """
+
+    def __init__(self, counters: Metrics = metrics):
+        self.metrics = counters
+
+    def __call__(self, topic: str, messages: list[Any]) -> None:
+        self.metrics.incr(f"{topic}_messages", len(messages))
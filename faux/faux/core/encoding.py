@@ -0,0 +1,79 @@
+import json
+from typing import Any
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# The library `dumps` encodes with, 'orjson' when it is installed
+JSON_LIBRARY = "orjson" if orjson is not None else "json"
+
+# numpy scalars show up in values taken from a CustomerBatch's columns
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY if orjson is not None else 0
+
+
+def json_default(value: Any) -> Any:
+    """
+    Serializes the UUIDs and datetimes nested in JSON values the same way
+    pydantic does in 'json' mode, and numpy scalars as the numbers orjson writes
+    for them. Pass it as the `default` of json.dumps.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Encodes a value as compact UTF-8 JSON.
+
+    orjson writes UUIDs and naive datetimes natively, as the same strings pydantic
+    writes in 'json' mode, so records dumped in 'python' mode are encoded in a
+    single pass without converting their ids and timestamps to strings first.
+    Falls back to the standard library when orjson isn't installed.
+
+    :param value: The value to encode.
+    :return: The JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=json_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        value, default=json_default, separators=(",", ":"), ensure_ascii=False
+    ).encode()
+
+
+def dumps_str(value: Any) -> str:
+    """
+    Encodes a value as compact JSON text, see `dumps`.
+
+    Used as the `json_serializer` of the engine and for the JSON columns of COPY
+    streams, which both expect a str.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=json_default, option=_ORJSON_OPTIONS).decode()
+    return json.dumps(value, default=json_default, separators=(",", ":"), ensure_ascii=False)
+
+
+def dumps_lines(values: Any) -> bytes:
+    """
+    Encodes values as newline delimited JSON, one document per line.
+
+    :param values: An iterable of values to encode.
+    :return: The NDJSON document, ending in a newline unless it is empty.
+    """
+    lines = b"\n".join(map(dumps, values))
+    return lines + b"\n" if lines else lines
+
+
+def loads(document: Any) -> Any:
+    """
+    Decodes a JSON document from bytes or str.
+    """
+    if orjson is not None:
+        return orjson.loads(document)
+    return json.loads(document)
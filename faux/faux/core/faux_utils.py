@@ -1,23 +1,24 @@
-from faker import Faker
 from datetime import datetime
 import random as rd
+import threading
 import uuid
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Optional
 import pydantic
 
+from faux.core.config import get_config
 from faux.core.models import (
     User,
     CheckoutEvent,
     VisitEvent,
-    VisitEventData,
-    CheckoutEventData,
     CART_UPDATE_EVENT,
     AddToCartEvent,
     RemoveFromCartEvent,
-    AddToCartEventData,
-    RemoveFromCartEventData,
     CHECKOUT_STATUS,
 )
+from faux.core.identity import Identity
+
+if TYPE_CHECKING:
+    from faker import Faker
 
 
 # TODO: see if you can access the BROWSER_TYPE values directly from the type object
@@ -25,13 +26,104 @@ browsers = ("chrome", "duckduckgo", "firefox", "opera")
 qty_min = 1
 qty_max = 5
 
-fake = Faker()
+_fake: Optional["Faker"] = None
+_fake_lock = threading.Lock()
+
+# Decides which trusted payloads are still validated. It is kept apart from the
+# simulation random streams so sampling never changes the generated data.
+_validation_sampler = rd.Random()
 
 # pydantic dump_model has a dump_mode arg
 # options can be 'json' or 'python' - json returns dict of json serialiable data
 
 
-def generate_customer(dump_mode: str = "json") -> dict:
+def get_faker() -> "Faker":
+    """
+    Returns the shared Faker instance, creating it with the configured locale on first use.
+    """
+    global _fake
+    with _fake_lock:
+        if _fake is None:
+            from faker import Faker
+
+            _fake = Faker(get_config().faker_locale)
+        return _fake
+
+
+def __getattr__(name: str) -> Any:
+    # `fake` is created lazily, importing this module doesn't construct Faker
+    if name == "fake":
+        return get_faker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def should_validate(trusted: bool, validate_sample_rate: float) -> bool:
+    """
+    Decides whether a payload goes through full model validation.
+
+    :param trusted: Whether the payload was built by trusted code.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :return: True if the payload must be validated.
+    """
+    if not trusted:
+        return True
+    return validate_sample_rate > 0 and _validation_sampler.random() < validate_sample_rate
+
+
+def _to_jsonable(value: Any) -> Any:
+    """
+    Converts UUIDs and datetimes (also nested in dictionaries) the same way
+    pydantic does in 'json' mode.
+
+    :param value: The value to convert.
+    :return: The json-serializable value.
+    """
+    if isinstance(value, dict):
+        return {key: _to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _dump_payload(
+    model_class: type[pydantic.BaseModel],
+    payload: dict,
+    dump_mode: str,
+    trusted: bool,
+    validate_sample_rate: float,
+) -> dict:
+    """
+    Dumps a payload, validating it through its model unless it is trusted.
+
+    Trusted payloads are returned as they are (converted to json-serializable
+    values in 'json' mode), except for a `validate_sample_rate` fraction of them.
+
+    :param model_class: The Pydantic model the payload conforms to.
+    :param payload: The payload, laid out like `model_class.model_dump()`.
+    :param dump_mode: The mode to dump the payload. Options are 'json' or 'python'.
+    :param trusted: Whether to skip validation.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :return: A dictionary representation of the payload.
+    """
+    if should_validate(trusted, validate_sample_rate):
+        return dump_model(model_class(**payload), dump_mode)
+
+    if dump_mode not in {"json", "python"}:
+        raise ValueError(f"Unsupported dump mode: {dump_mode}")
+    return _to_jsonable(payload) if dump_mode == "json" else payload
+
+
+def generate_customer(
+    dump_mode: str = "json",
+    faker: Optional["Faker"] = None,
+    customer_id: Optional[uuid.UUID] = None,
+    ts: Optional[datetime] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
+    identity: Optional[Identity] = None,
+) -> dict:
     """
     Generates a fake customer and returns it as a dictionary.
 
@@ -39,15 +131,37 @@ def generate_customer(dump_mode: str = "json") -> dict:
     json returns a dictionary that is json-serializable while python will
     return a python dictionary with non-json serializable objects like
     UUID and datetime.
+    :param faker: Optional Faker instance to draw the customer details from.
+        Defaults to the shared module instance.
+    :param customer_id: Optional unique identifier for the customer.
+    :param ts: Optional creation timestamp. If not provided, the current time is used.
+    :param trusted: Skip model validation (including email checks) for this payload.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :param identity: Optional username, email and location, e.g. from an IdentityPool.
+        If not provided, they are drawn from Faker.
     :return: A dictionary representation of the generated customer.
     """
-
-    user = User(username=fake.user_name(), email=fake.email(), location=fake.city())
-    return dump_model(user, dump_mode)
+    if identity is None:
+        faker = faker or get_faker()
+        identity = Identity(faker.user_name(), faker.email(), faker.city())
+    user = {
+        "id": customer_id or uuid.uuid4(),
+        "timestamp": ts or datetime.utcnow(),
+        "username": identity.username,
+        "email": identity.email,
+        "location": identity.location,
+    }
+    return _dump_payload(User, user, dump_mode, trusted, validate_sample_rate)
 
 
 def generate_visit_event(
-    customer_id: uuid.UUID, ts: datetime = None, dump_mode: str = "json"
+    customer_id: uuid.UUID,
+    ts: datetime = None,
+    dump_mode: str = "json",
+    rng: rd.Random = rd,
+    event_id: Optional[uuid.UUID] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
 ) -> dict:
     """
     Generates a visit event for a given customer.
@@ -55,22 +169,21 @@ def generate_visit_event(
     :param customer_id: The unique identifier of the customer.
     :param ts: Optional timestamp for the event. If not provided, the current time is used.
     :param dump_mode: The mode to dump the model. Options are 'json' or 'python'.
+    :param rng: The random number generator used to pick the browser.
+    :param event_id: Optional unique identifier for the event.
+    :param trusted: Skip model validation for this payload.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
     :return: A dictionary representation of the generated visit event.
     """
-    if ts:
-        visit = VisitEvent(
-            timestamp=ts,
-            customer_id=customer_id,
-            event_type="visit",
-            event_data=VisitEventData(browser=rd.choice(browsers), timestamp=ts),
-        )
-    else:
-        visit = VisitEvent(
-            customer_id=customer_id,
-            event_type="visit",
-            event_data=VisitEventData(browser=rd.choice(browsers)),
-        )
-    return dump_model(visit, dump_mode)
+    ts = ts or datetime.utcnow()
+    visit = {
+        "id": event_id or uuid.uuid4(),
+        "timestamp": ts,
+        "customer_id": customer_id,
+        "event_type": "visit",
+        "event_data": {"browser": rng.choice(browsers), "timestamp": ts},
+    }
+    return _dump_payload(VisitEvent, visit, dump_mode, trusted, validate_sample_rate)
 
 
 def generate_cart_update_event(
@@ -79,6 +192,10 @@ def generate_cart_update_event(
     event_type: CART_UPDATE_EVENT,
     qty: Optional[int] = None,
     dump_mode: str = "json",
+    ts: Optional[datetime] = None,
+    event_id: Optional[uuid.UUID] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
 ) -> dict:
     """
     Generates a visit event for a given customer.
@@ -86,21 +203,25 @@ def generate_cart_update_event(
     :param customer_id: The unique identifier of the customer.
     :param ts: Optional timestamp for the event. If not provided, the current time is used.
     :param dump_mode: The mode to dump the model. Options are 'json' or 'python'.
+    :param event_id: Optional unique identifier for the event.
+    :param trusted: Skip model validation for this payload.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
     :return: A dictionary representation of the generated visit event.
     """
-    event_data = (
-        AddToCartEventData(item_id=item_id, quantity=qty)
-        if event_type == "add_to_cart"
-        else RemoveFromCartEventData(item_id=item_id)
-    )
+    ts = ts or datetime.utcnow()
+    event_data = {"item_id": item_id, "timestamp": ts}
+    if event_type == "add_to_cart":
+        event_data["quantity"] = qty
 
-    event = (
-        AddToCartEvent(customer_id=customer_id, event_data=event_data)
-        if event_type == "add_to_cart"
-        else RemoveFromCartEvent(customer_id=customer_id, event_data=event_data)
-    )
-
-    return dump_model(event, dump_mode)
+    event = {
+        "id": event_id or uuid.uuid4(),
+        "timestamp": ts,
+        "customer_id": customer_id,
+        "event_type": event_type,
+        "event_data": event_data,
+    }
+    model_class = AddToCartEvent if event_type == "add_to_cart" else RemoveFromCartEvent
+    return _dump_payload(model_class, event, dump_mode, trusted, validate_sample_rate)
 
 
 def generate_checkout_event(
@@ -109,6 +230,10 @@ def generate_checkout_event(
     status: CHECKOUT_STATUS,
     checked_out_at: datetime,
     dump_mode: str = "json",
+    ts: Optional[datetime] = None,
+    event_id: Optional[uuid.UUID] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
 ) -> dict:
     """
     Generates a checkout event for a given customer.
@@ -118,17 +243,55 @@ def generate_checkout_event(
     :param status: The status of the checkout ('success', 'failed', 'cancelled').
     :param checked_out_at: The timestamp when the checkout occurred.
     :param dump_mode: The mode to dump the model. Options are 'json' or 'python'.
+    :param ts: Optional timestamp for the event. If not provided, the current time is used.
+    :param event_id: Optional unique identifier for the event.
+    :param trusted: Skip model validation for this payload.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
     :return: A dictionary representation of the generated checkout event.
     """
     # use the generated orderId to populate a payments table
-    checkout = CheckoutEvent(
-        customer_id=customer_id,
-        event_type="checkout",
-        event_data=CheckoutEventData(
-            status=status, order_id=order_id, timestamp=checked_out_at
-        ),
+    checkout = {
+        "id": event_id or uuid.uuid4(),
+        "timestamp": ts or datetime.utcnow(),
+        "customer_id": customer_id,
+        "event_type": "checkout",
+        "event_data": {
+            "status": status,
+            "order_id": order_id,
+            "timestamp": checked_out_at,
+        },
+    }
+    return _dump_payload(
+        CheckoutEvent, checkout, dump_mode, trusted, validate_sample_rate
     )
-    return dump_model(checkout, mode=dump_mode)
+
+
+EVENT_MODELS = {
+    "visit": VisitEvent,
+    "add_to_cart": AddToCartEvent,
+    "remove_from_cart": RemoveFromCartEvent,
+    "checkout": CheckoutEvent,
+}
+
+
+def validate_sample(customers_data: list[dict], validate_sample_rate: float) -> int:
+    """
+    Sends a random fraction of already built customer records through full model validation.
+
+    :param customers_data: Customer records, each with a 'customer' and an 'events' entry.
+    :param validate_sample_rate: The fraction of records to validate.
+    :return: The number of records that were validated.
+    :raises pydantic.ValidationError: If a sampled record is invalid.
+    """
+    validated = 0
+    for customer_data in customers_data:
+        if not should_validate(True, validate_sample_rate):
+            continue
+        User(**customer_data["customer"])
+        for event in customer_data["events"]:
+            EVENT_MODELS[event["event_type"]](**event)
+        validated += 1
+    return validated
 
 
 def dump_model(model: pydantic.BaseModel, mode: str = "json") -> dict:
@@ -0,0 +1,151 @@
+import random
+import re
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+from faux.core.config import get_config
+
+
+_BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+class Identity(NamedTuple):
+    """
+    The personal details of a customer.
+    """
+
+    username: str
+    email: str
+    location: str
+
+
+def _to_base36(number: int) -> str:
+    digits = []
+    while True:
+        number, remainder = divmod(number, 36)
+        digits.append(_BASE36[remainder])
+        if not number:
+            return "".join(reversed(digits))
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", value.lower())
+
+
+def _distinct(draw: Callable[[], str], size: int) -> tuple[str, ...]:
+    """
+    Draws up to `size` distinct values, giving up once the provider runs out of new ones.
+
+    :param draw: A callable returning a random value.
+    :param size: The number of distinct values wanted.
+    :return: The distinct values in the order they were drawn.
+    """
+    values = {}
+    for _ in range(size * 4):
+        value = draw()
+        if value:
+            values.setdefault(value, None)
+        if len(values) == size:
+            break
+    return tuple(values)
+
+
+class IdentityPool:
+    """
+    A precomputed pool of name parts, email domains and cities to compose customers from.
+
+    The parts are drawn from Faker once, after which composing an identity is a
+    handful of list lookups. Every identity carries a tag derived from the
+    customer's index in the simulation (and the optional namespace), so usernames
+    and emails are unique across a run without keeping track of the ones already
+    handed out. The pool only holds tuples of strings, so it is cheap to send to
+    worker processes.
+
+    Attributes:
+        first_names (tuple[str, ...]): Lower case first names.
+        last_names (tuple[str, ...]): Lower case last names.
+        domains (tuple[str, ...]): Email domains.
+        cities (tuple[str, ...]): City names.
+        namespace (str): Appended to every tag, to keep identities from separate
+            runs that share an index range apart.
+    """
+
+    def __init__(
+        self,
+        size: int = 1000,
+        seed: int = 0,
+        locale: Optional[str] = None,
+        namespace: str = "",
+    ):
+        from faker import Faker
+
+        fake = Faker(locale or get_config().faker_locale)
+        fake.seed_instance(seed)
+        self.first_names = _distinct(lambda: _slug(fake.first_name()), size)
+        self.last_names = _distinct(lambda: _slug(fake.last_name()), size)
+        self.domains = _distinct(lambda: fake.email().rsplit("@", 1)[1], size)
+        self.cities = _distinct(fake.city, size)
+        self.namespace = _slug(namespace)
+
+    def _tag(self, index: int) -> str:
+        # name slugs and base36 never contain '_' or '-', so the tag can always be
+        # told apart from the names and the namespace from the index
+        tag = _to_base36(index)
+        return f"{tag}-{self.namespace}" if self.namespace else tag
+
+    def compose(self, index: int, first: int, last: int, domain: int, city: int) -> Identity:
+        """
+        Composes the identity of the customer at `index` from the given pool positions.
+
+        :param index: The customer's index in the simulation.
+        :param first: The position of the first name in the pool.
+        :param last: The position of the last name in the pool.
+        :param domain: The position of the email domain in the pool.
+        :param city: The position of the city in the pool.
+        :return: The customer's identity.
+        """
+        first_name = self.first_names[first]
+        last_name = self.last_names[last]
+        tag = self._tag(index)
+        return Identity(
+            username=f"{first_name}{last_name}_{tag}",
+            email=f"{first_name}.{last_name}.{tag}@{self.domains[domain]}",
+            location=self.cities[city],
+        )
+
+    def identity(self, index: int, rng: random.Random = random) -> Identity:
+        """
+        Draws the identity of the customer at `index`.
+
+        :param index: The customer's index in the simulation.
+        :param rng: The random number generator used to pick the parts.
+        :return: The customer's identity.
+        """
+        return self.compose(
+            index,
+            rng.randrange(len(self.first_names)),
+            rng.randrange(len(self.last_names)),
+            rng.randrange(len(self.domains)),
+            rng.randrange(len(self.cities)),
+        )
+
+    def identities(
+        self, first_index: int, n: int, rng: np.random.Generator
+    ) -> list[Identity]:
+        """
+        Draws the identities of n consecutive customers, starting at `first_index`.
+
+        :param first_index: The index of the first customer in the simulation.
+        :param n: The number of identities to draw.
+        :param rng: The numpy random generator used to pick the parts.
+        :return: The customers' identities.
+        """
+        picks = [
+            rng.integers(0, len(parts), n).tolist()
+            for parts in (self.first_names, self.last_names, self.domains, self.cities)
+        ]
+        return [
+            self.compose(first_index + offset, *positions)
+            for offset, positions in enumerate(zip(*picks))
+        ]
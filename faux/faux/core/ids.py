@@ -0,0 +1,73 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from faux.simulator.clock import US_PER_MS, to_epoch_us
+
+# 4 draws every id at random, 7 puts the time it was created in front, see `make_uuid`
+UUID_VERSIONS = (4, 7)
+
+_RANDOM_BITS = (1 << 80) - 1
+_VERSION_MASK = 0xF << 76
+_VARIANT_MASK = 0x3 << 62
+
+
+def check_uuid_version(version: int) -> int:
+    if version not in UUID_VERSIONS:
+        raise ValueError(f"Unsupported UUID version: {version}")
+    return version
+
+
+def make_uuid(bits: int, timestamp: Optional[datetime], version: int) -> uuid.UUID:
+    """
+    Builds a UUID from 128 random bits.
+
+    A version 7 UUID starts with the milliseconds since the Unix epoch of its
+    timestamp, so ids sort by the time they were created and new rows are
+    appended at the end of a primary key index instead of all over it. Both
+    versions use the same random bits, so switching versions doesn't change
+    anything else that is drawn from the same generator.
+
+    :param bits: 128 random bits, e.g. `rng.getrandbits(128)`.
+    :param timestamp: The naive UTC time a version 7 UUID is created at.
+        Defaults to the current time.
+    :param version: The UUID version, 4 or 7.
+    :return: The UUID.
+    """
+    if version == 4:
+        return uuid.UUID(int=bits, version=4)
+    check_uuid_version(version)
+    millis = to_epoch_us(timestamp or datetime.utcnow()) // US_PER_MS
+    value = (millis << 80) | (bits & _RANDOM_BITS)
+    value = (value & ~_VERSION_MASK) | (7 << 76)
+    value = (value & ~_VARIANT_MASK) | (0x2 << 62)
+    return uuid.UUID(int=value)
+
+
+def random_uuid_bytes(
+    rng: np.random.Generator,
+    size: int,
+    epoch_us: Optional[np.ndarray] = None,
+    version: int = 4,
+) -> np.ndarray:
+    """
+    Draws `size` random UUIDs as a (size, 16) uint8 array, see `make_uuid`.
+
+    :param rng: The numpy random generator to draw from.
+    :param size: The number of UUIDs to draw.
+    :param epoch_us: The times the UUIDs are created at in epoch microseconds.
+        Required for version 7.
+    :param version: The UUID version, 4 or 7.
+    :return: An array holding the 16 bytes of each UUID.
+    """
+    check_uuid_version(version)
+    raw = rng.integers(0, 256, size=(size, 16), dtype=np.uint8)
+    if version == 7:
+        millis = (np.asarray(epoch_us, dtype=np.int64) // US_PER_MS).astype(">u8")
+        # the low 6 bytes of the big endian milliseconds
+        raw[:, :6] = millis.view(np.uint8).reshape(-1, 8)[:, 2:]
+    raw[:, 6] = (raw[:, 6] & 0x0F) | (version << 4)
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    return raw
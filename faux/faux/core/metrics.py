@@ -0,0 +1,232 @@
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """
+    A histogram of durations with power-of-two microsecond buckets.
+
+    Recording a duration is a couple of integer operations, so stages can be timed
+    without measurably slowing them down. Quantiles are approximated by the upper
+    bound of the bucket they fall in.
+
+    Attributes:
+        count (int): The number of recorded durations.
+        total (float): The sum of the recorded durations in seconds.
+        min (float): The shortest recorded duration in seconds.
+        max (float): The longest recorded duration in seconds.
+        buckets (dict[int, int]): The number of durations per bucket. Bucket k holds
+            durations of [2^(k-1), 2^k) microseconds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets: dict[int, int] = defaultdict(int)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[int(seconds * 1_000_000).bit_length()] += 1
+
+    def merge(self, other: "Histogram") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] += count
+
+    def quantile(self, q: float) -> float:
+        """
+        Approximates a quantile of the recorded durations.
+
+        :param q: The quantile, between 0 and 1.
+        :return: The approximate duration in seconds, 0 when nothing was recorded.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min((1 << bucket) / 1_000_000, self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class Metrics:
+    """
+    Counters and per-stage timings of the simulator.
+
+    Counters track things like the generated customers, the events per type
+    (`events.<event_type>`) and the rows written by the sinks. Timings are kept
+    per stage ('generate', 'validate', 'dump', 'sink_flush') and are recorded
+    once per chunk, never per event.
+
+    Metrics are safe to update from several threads. Worker processes record into
+    their own instance and send it back to be merged into the parent's.
+
+    Attributes:
+        counters (dict[str, int]): The counters by name.
+        timings (dict[str, Histogram]): The timing histograms by stage.
+    """
+
+    def __init__(self):
+        self.counters: dict[str, int] = defaultdict(int)
+        self.timings: dict[str, Histogram] = defaultdict(Histogram)
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.timings[stage].observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """
+        Times the body of a with statement as one observation of `stage`.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def merge(self, other: "Metrics") -> None:
+        with self._lock:
+            for name, value in other.counters.items():
+                self.counters[name] += value
+            for stage, histogram in other.timings.items():
+                self.timings[stage].merge(histogram)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.timings.clear()
+            self._started = time.perf_counter()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Returns a snapshot of the counters and timings.
+
+        :return: A dictionary with the seconds since the metrics were (re)set under
+            'elapsed', the counters under 'counters' and a summary of every stage's
+            histogram (count, total, mean, min, max, p50, p95, p99 in seconds) under 'timings'.
+        """
+        with self._lock:
+            return {
+                "elapsed": time.perf_counter() - self._started,
+                "counters": dict(self.counters),
+                "timings": {
+                    stage: histogram.as_dict()
+                    for stage, histogram in self.timings.items()
+                },
+            }
+
+    def summary(self) -> str:
+        """
+        Formats the metrics as a single log line.
+        """
+        snapshot = self.stats()
+        elapsed = snapshot["elapsed"]
+        counters = ", ".join(
+            f"{name}={value} ({value / elapsed:,.0f}/s)"
+            for name, value in sorted(snapshot["counters"].items())
+        )
+        timings = ", ".join(
+            f"{stage} {timing['total']:.2f}s p50 {timing['p50'] * 1000:.1f}ms "
+            f"p99 {timing['p99'] * 1000:.1f}ms"
+            for stage, timing in snapshot["timings"].items()
+        )
+        return f"elapsed {elapsed:.1f}s | {counters} | {timings}"
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class SummaryReporter:
+    """
+    Logs a summary line of a Metrics instance every `interval` seconds from a
+    background thread. Can be used as a context manager.
+
+    Attributes:
+        metrics (Metrics): The metrics to report.
+        interval (float): The seconds between summary lines.
+    """
+
+    def __init__(self, metrics: "Metrics", interval: float):
+        self.metrics = metrics
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            logger.info(self.metrics.summary())
+
+    def start(self) -> "SummaryReporter":
+        self._thread = threading.Thread(
+            target=self._run, name="faux-metrics", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "SummaryReporter":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+# The metrics of the current process
+metrics = Metrics()
+
+
+def stats() -> dict[str, Any]:
+    """
+    Returns a snapshot of the simulator's counters and stage timings. See `Metrics.stats`.
+    """
+    return metrics.stats()
@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field, EmailStr, UUID4
+from pydantic import AfterValidator, BaseModel, Field, EmailStr
 from datetime import datetime
-from typing import Literal
+from typing import Annotated, Literal
 import uuid
 
+from faux.core.ids import UUID_VERSIONS
+
 
 EVENT_TYPE = Literal["visit", "add_to_cart", "remove_from_cart", "checkout"]
 CART_UPDATE_EVENT = Literal["add_to_cart", "remove_from_cart"]
@@ -10,16 +12,26 @@ CHECKOUT_STATUS = Literal["success", "failed", "cancelled"]
 BROWSER_TYPE = Literal["chrome", "duckduckgo", "firefox", "opera"]
 
 
+def _check_id_version(value: uuid.UUID) -> uuid.UUID:
+    if value.version not in UUID_VERSIONS:
+        raise ValueError(f"UUID version {value.version} is not one of {UUID_VERSIONS}")
+    return value
+
+
+# A version 4 or version 7 UUID, see faux.core.ids
+FauxId = Annotated[uuid.UUID, AfterValidator(_check_id_version)]
+
+
 class CustomBase(BaseModel):
     """
     A base model with default id and timestamp fields.
 
     Attributes:
-        id (UUID4): The unique identifier for the model.
+        id (FauxId): The unique identifier for the model.
         timestamp (datetime): The timestamp when the model instance was created.
     """
 
-    id: UUID4 = Field(default_factory=uuid.uuid4)
+    id: FauxId = Field(default_factory=uuid.uuid4)
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -59,11 +71,11 @@ class Event(CustomBase):
     serve as a base model for the different types of events.
 
     Attributes:
-        customer_id (UUID4): The unique identifier of the customer associated with the event.
+        customer_id (FauxId): The unique identifier of the customer associated with the event.
         event_type (EVENT_TYPE): The type of event.
     """
 
-    customer_id: UUID4
+    customer_id: FauxId
     event_type: EVENT_TYPE
 
 
@@ -72,11 +84,11 @@ class CartItemEventData(BaseModel):
     A model representing the data for a cart item event.
 
     Attributes:
-        item_id (UUID4): The unique identifier of the cart item.
+        item_id (FauxId): The unique identifier of the cart item.
         timestamp (datetime): The timestamp when the event occurred.
     """
 
-    item_id: UUID4
+    item_id: FauxId
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -86,12 +98,12 @@ class CheckoutEventData(BaseModel):
 
     Attributes:
         status (CHECKOUT_STATUS): The status of the checkout.
-        order_id (UUID4): The unique identifier of the order.
+        order_id (FauxId): The unique identifier of the order.
         timestamp (datetime): The timestamp when the checkout occurred.
     """
 
     status: CHECKOUT_STATUS
-    order_id: UUID4
+    order_id: FauxId
     timestamp: datetime
 
 
@@ -0,0 +1,188 @@
+import csv
+import io
+from functools import lru_cache
+from typing import Any, Iterable
+
+from sqlalchemy import JSON, Column, MetaData, Table, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+
+from faux.core.encoding import dumps_str
+
+
+# Marker written for NULL values so that empty strings survive the CSV round trip
+COPY_NULL = r"\N"
+
+# What `merge_rows` does with rows whose primary key already exists
+MERGE_ACTIONS = ("nothing", "update")
+
+
+def _encode_value(value: Any, is_json: bool) -> Any:
+    """
+    Encodes a single value for a CSV COPY stream.
+
+    UUIDs and datetimes are written through their str() and isoformat()
+    representations, JSON columns are serialized with `dumps_str`.
+
+    :param value: The value to encode.
+    :param is_json: Whether the target column is a JSON column.
+    :return: The value as written to the CSV stream.
+    """
+    if value is None:
+        return COPY_NULL
+    if is_json:
+        return dumps_str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(table: Table, rows: Iterable[dict[str, Any]]) -> io.StringIO:
+    """
+    Encodes rows as a CSV buffer with one line per row in table column order.
+
+    :param table: The table the rows will be copied into.
+    :param rows: The rows to encode, as dictionaries keyed by column name.
+    :return: A buffer positioned at the start of the encoded rows.
+    """
+    columns = [(column.name, isinstance(column.type, JSON)) for column in table.columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [_encode_value(row.get(name), is_json) for name, is_json in columns]
+        for row in rows
+    )
+    buffer.seek(0)
+    return buffer
+
+
+def copy_rows(connection: Connection, table: Table, rows: list[dict[str, Any]]) -> None:
+    """
+    Loads rows into a table with PostgreSQL's `COPY ... FROM STDIN`.
+
+    :param connection: A SQLAlchemy connection using the psycopg2 driver.
+    :param table: The table to load the rows into.
+    :param rows: The rows to load, as dictionaries keyed by column name.
+    """
+    preparer = connection.dialect.identifier_preparer
+    column_list = ", ".join(preparer.quote(column.name) for column in table.columns)
+    statement = (
+        f"COPY {preparer.format_table(table)} ({column_list}) "
+        f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    )
+    with connection.connection.dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(statement, encode_csv(table, rows))
+
+
+def supports_copy(connection: Connection) -> bool:
+    """
+    Checks whether a connection can stream rows with `COPY ... FROM STDIN`.
+
+    :param connection: The SQLAlchemy connection to check.
+    :return: True for PostgreSQL connections using the psycopg2 driver.
+    """
+    return (
+        connection.dialect.name == "postgresql"
+        and connection.dialect.driver == "psycopg2"
+    )
+
+
+def bulk_insert(connection: Connection, table: Table, rows: list[dict[str, Any]]) -> None:
+    """
+    Loads rows into a table with COPY when the dialect supports it,
+    falling back to an executemany INSERT otherwise.
+
+    :param connection: The SQLAlchemy connection to load the rows through.
+    :param table: The table to load the rows into.
+    :param rows: The rows to load, as dictionaries keyed by column name.
+    """
+    if not rows:
+        return
+    if supports_copy(connection):
+        copy_rows(connection, table, rows)
+    else:
+        connection.execute(insert(table), rows)
+
+
+@lru_cache(maxsize=None)
+def staging_table(table: Table) -> Table:
+    """
+    Returns the staging table rows are copied into before they are merged into
+    a table, see `merge_rows`. It has the table's columns and no constraints.
+    """
+    columns = [Column(column.name, column.type) for column in table.columns]
+    return Table(f"{table.name}_staging", MetaData(), *columns)
+
+
+def _upsert(connection: Connection, table: Table, action: str, statement=None):
+    """
+    Builds an INSERT into a table that skips or updates the rows whose primary
+    key already exists.
+
+    :param connection: The connection the statement will be executed on.
+    :param table: The table to insert into.
+    :param action: 'nothing' to skip existing rows, 'update' to overwrite them.
+    :param statement: Optional SELECT of the rows to insert. The rows are passed
+        as parameters when None.
+    :return: The INSERT ... ON CONFLICT statement.
+    """
+    dialects = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+    if connection.dialect.name not in dialects:
+        raise ValueError(f"Merging rows isn't supported on {connection.dialect.name}")
+    upsert = dialects[connection.dialect.name](table)
+    if statement is not None:
+        upsert = upsert.from_select([column.name for column in table.columns], statement)
+
+    keys = [column.name for column in table.primary_key.columns]
+    if action == "nothing":
+        return upsert.on_conflict_do_nothing(index_elements=keys)
+    if action == "update":
+        return upsert.on_conflict_do_update(
+            index_elements=keys,
+            set_={
+                column.name: upsert.excluded[column.name]
+                for column in table.columns
+                if not column.primary_key
+            },
+        )
+    raise ValueError(f"Unsupported merge action: {action}")
+
+
+def merge_rows(
+    connection: Connection, table: Table, rows: list[dict[str, Any]], action: str = "nothing"
+) -> int:
+    """
+    Loads rows into a table, skipping or updating the rows that already exist.
+
+    The rows are copied into a temporary staging table first, which PostgreSQL
+    never writes to the WAL, and merged into the table with a single
+    `INSERT ... SELECT ... ON CONFLICT`. Writing the same rows again is then
+    safe, and costs one set-based statement instead of a lookup per row. The
+    staging table is created once per connection and emptied after every merge.
+    Dialects without COPY insert the rows with an executemany
+    `INSERT ... ON CONFLICT` instead.
+
+    :param connection: The SQLAlchemy connection to load the rows through.
+    :param table: The table to merge the rows into.
+    :param rows: The rows to merge, as dictionaries keyed by column name.
+    :param action: 'nothing' to skip existing rows, 'update' to overwrite them.
+    :return: The number of inserted or updated rows, or -1 when the driver
+        doesn't report it.
+    """
+    if action not in MERGE_ACTIONS:
+        raise ValueError(f"Unsupported merge action: {action}")
+    if not rows:
+        return 0
+    if not supports_copy(connection):
+        return connection.execute(_upsert(connection, table, action), rows).rowcount
+
+    staging = staging_table(table)
+    preparer = connection.dialect.identifier_preparer
+    connection.exec_driver_sql(
+        f"CREATE TEMPORARY TABLE IF NOT EXISTS {preparer.format_table(staging)} "
+        f"(LIKE {preparer.format_table(table)} INCLUDING DEFAULTS)"
+    )
+    copy_rows(connection, staging, rows)
+    merged = connection.execute(_upsert(connection, table, action, select(staging)))
+    connection.exec_driver_sql(f"TRUNCATE {preparer.format_table(staging)}")
+    return merged.rowcount
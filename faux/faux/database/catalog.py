@@ -0,0 +1,161 @@
+import json
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional, Union
+
+
+ProductRow = tuple[uuid.UUID, float]
+
+# The products seeded into the products table
+PRODUCTS_FILE = Path(__file__).resolve().parents[1] / "config/products.json"
+
+
+def read_products_file(path: Union[str, Path] = PRODUCTS_FILE) -> list[dict[str, Any]]:
+    """
+    Reads the names and prices of the products from a JSON file.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+class ProductCatalog:
+    """
+    An in-memory cache of the products table.
+
+    Product ids and prices are loaded once through `loader` and samples are
+    served from memory, so a simulation does not need to hit the database
+    for every customer. The cache can optionally expire after `ttl` seconds,
+    in which case it is reloaded on the next access.
+
+    Attributes:
+        ttl (Optional[float]): Seconds after which the cache is considered stale.
+            None means the cache never expires.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Iterable[ProductRow]],
+        ttl: Optional[float] = None,
+    ):
+        self._loader = loader
+        self.ttl = ttl
+        self._ids: tuple[uuid.UUID, ...] = ()
+        self._prices: dict[uuid.UUID, float] = {}
+        self._loaded_at: Optional[float] = None
+        self._refresh_hooks: list[Callable[["ProductCatalog"], None]] = []
+        self._lock = threading.Lock()
+
+    def load(self) -> "ProductCatalog":
+        """
+        Loads (or reloads) the product ids and prices using the catalog loader.
+
+        Registered refresh hooks are called once the new data is in place.
+
+        :return: The catalog instance, to allow chaining.
+        """
+        rows = list(self._loader())
+        with self._lock:
+            self._ids = tuple(product_id for product_id, _ in rows)
+            self._prices = {product_id: price for product_id, price in rows}
+            self._loaded_at = time.monotonic()
+        for hook in self._refresh_hooks:
+            hook(self)
+        return self
+
+    refresh = load
+
+    def on_refresh(self, hook: Callable[["ProductCatalog"], None]) -> None:
+        """
+        Registers a callback that is invoked every time the catalog is (re)loaded.
+
+        :param hook: A callable that receives the catalog instance.
+        """
+        self._refresh_hooks.append(hook)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    @property
+    def is_stale(self) -> bool:
+        """
+        Whether the cache has to be (re)loaded before it is used.
+        """
+        if self._loaded_at is None:
+            return True
+        if self.ttl is None:
+            return False
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    def _ensure_loaded(self) -> None:
+        if self.is_stale:
+            self.load()
+
+    @property
+    def ids(self) -> tuple[uuid.UUID, ...]:
+        self._ensure_loaded()
+        return self._ids
+
+    def price(self, product_id: uuid.UUID) -> float:
+        """
+        Returns the cached price of a product.
+
+        :param product_id: The unique identifier of the product.
+        :return: The price of the product.
+        """
+        self._ensure_loaded()
+        return self._prices[product_id]
+
+    def sample(self, k: int, rng: random.Random = random) -> list[uuid.UUID]:
+        """
+        Picks up to k distinct product ids at random.
+
+        Like `ORDER BY random() LIMIT k`, fewer than k ids are returned when the
+        catalog holds fewer than k products.
+
+        :param k: The number of product ids to pick.
+        :param rng: The random number generator to draw from. Defaults to the
+            global `random` module.
+        :return: A list of distinct product ids.
+        """
+        ids = self.ids
+        return rng.sample(ids, min(k, len(ids)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getstate__(self) -> dict:
+        # Worker processes receive a snapshot of the loaded data that never goes
+        # stale, so the loader (which may be a lambda or hold a connection), the
+        # hooks and the lock stay with the original instance.
+        self._ensure_loaded()
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_loader"] = None
+        state["ttl"] = None
+        state["_refresh_hooks"] = []
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def file_catalog(seed: int = 0, path: Union[str, Path] = PRODUCTS_FILE) -> ProductCatalog:
+    """
+    Builds a product catalog from a products JSON file with ids drawn from the
+    seed, for simulations that don't write to, or can't reach, a database.
+
+    :param seed: The seed the product ids are drawn from.
+    :param path: The products file. Defaults to config/products.json.
+    :return: The loaded catalog.
+    """
+    rng = random.Random(seed)
+    rows = [
+        (uuid.UUID(int=rng.getrandbits(128), version=4), product["price"])
+        for product in read_products_file(path)
+    ]
+    return ProductCatalog(loader=lambda: rows).load()
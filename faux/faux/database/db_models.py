@@ -1,7 +1,17 @@
+from faux.core.config import get_config
 from faux.database.base import Base
+from faux.database.partitions import PARTITION_GRANULARITIES
 
-from sqlalchemy import Column, String, DateTime, Float, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Date, DateTime, Float, Index, JSON
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+# JSONB on PostgreSQL, so event_data can be indexed and queried by containment
+EventData = JSON().with_variant(JSONB(), "postgresql")
+
+# 'day' or 'month' when events is range partitioned on timestamp, see faux.database.partitions
+EVENTS_PARTITION_BY = get_config().events_partition_by
+if EVENTS_PARTITION_BY not in (None,) + PARTITION_GRANULARITIES:
+    raise ValueError(f"Unsupported events partitioning: {EVENTS_PARTITION_BY}")
 
 
 class User(Base):
@@ -17,6 +27,8 @@ class User(Base):
     """
 
     __tablename__ = "users"
+    # the keyset pagination order, see faux.database.queries
+    __table_args__ = (Index("ix_users_timestamp_id", "timestamp", "id"),)
 
     id = Column(UUID(as_uuid=True), primary_key=True)
     timestamp = Column(DateTime)
@@ -37,6 +49,7 @@ class Product(Base):
     """
 
     __tablename__ = "products"
+    __table_args__ = (Index("ix_products_timestamp_id", "timestamp", "id"),)
 
     id = Column(UUID(as_uuid=True), primary_key=True)
     timestamp = Column(DateTime)
@@ -54,13 +67,53 @@ class Events(Base):
         timestamp (DateTime): The timestamp when the event occurred.
         customer_id (UUID): The unique identifier of the customer associated with the event.
         event_type (String): The type of event.
-        event_data (JSON): The data associated with the event.
+        event_data (JSON): The data associated with the event, stored as JSONB
+            on PostgreSQL.
+
+    With EVENTS_PARTITION_BY set, the table is range partitioned on timestamp,
+    which PostgreSQL requires to be part of the primary key.
     """
 
     __tablename__ = "events"
+    # every index ends in the keyset pagination order, so a filtered page is a
+    # single index range scan, see faux.database.queries
+    __table_args__ = (
+        Index("ix_events_timestamp_id", "timestamp", "id"),
+        Index("ix_events_event_type_timestamp_id", "event_type", "timestamp", "id"),
+        Index("ix_events_customer_id_timestamp_id", "customer_id", "timestamp", "id"),
+        Index("ix_events_event_data", "event_data", postgresql_using="gin").ddl_if(
+            dialect="postgresql"
+        ),
+        (
+            {"postgresql_partition_by": "RANGE (timestamp)"}
+            if EVENTS_PARTITION_BY is not None
+            else {}
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True)
-    timestamp = Column(DateTime)
+    timestamp = Column(DateTime, primary_key=EVENTS_PARTITION_BY is not None)
     customer_id = Column(UUID(as_uuid=True))
     event_type = Column(String)
-    event_data = Column(JSON)
+    event_data = Column(EventData)
+
+
+class BackfilledDay(Base):
+    """
+    A model recording a day that a backfill wrote completely.
+
+    The customers of a day are committed chunk by chunk, so the day is recorded
+    before its first chunk and only completed once its last chunk is, see
+    `faux.simulator.backfill`. Days without a record were never written by a
+    backfill and are left alone.
+
+    Attributes:
+        day (Date): The day the customers arrived on.
+        completed_at (DateTime): When the last chunk of the day was committed,
+            NULL while the day is being written.
+    """
+
+    __tablename__ = "backfilled_days"
+
+    day = Column(Date, primary_key=True)
+    completed_at = Column(DateTime)
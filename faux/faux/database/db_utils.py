@@ -1,11 +1,22 @@
-from sqlalchemy import select, func
-from faux.database.db_models import Product, User, Events
+from sqlalchemy import delete, exists, inspect, select, text, update
+from sqlalchemy.dialects.postgresql import JSONB
+from faux.database.db_models import EVENTS_PARTITION_BY, BackfilledDay, Product, User, Events
 from faux.core.models import Product as ProductModel
-from faux.database.base import Session, Base, engine
-from typing import Any
-from pathlib import Path
-import json
+from faux.database.base import Base, get_engine, get_session
+from faux.database.catalog import ProductCatalog, read_products_file
+from faux.database.bulk import bulk_insert, merge_rows
+from faux.database.partitions import RangePartitions
+from faux.core.config import get_config
+from faux.core.metrics import metrics
+from faux.simulator.batch import Chunk, CustomerBatch
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+from datetime import date, datetime, timedelta
+from typing import Any, Iterable, Iterator
+from itertools import islice
 import logging
+import uuid
+import zlib
 
 logger = logging.getLogger(__name__)
 
@@ -28,16 +39,10 @@ def seed_products_table():
     If the table is empty, it loads product data from 'config/products.json'
     and inserts it into the table. Logs the process.
     """
-    with Session() as session:
+    with get_session() as session:
         if table_is_empty(session, Product):
             logger.info("Setting up seed data...")
-            project_root = Path(__file__).resolve().parents[1]
-            product_file_path = project_root / "config/products.json"
-
-            with open(product_file_path, "r") as f:
-                products = json.loads(f.read())
-
-            for product in products:
+            for product in read_products_file():
                 product_data = ProductModel(
                     name=product["name"], price=product["price"]
                 ).model_dump(mode="json")
@@ -50,46 +55,433 @@ def seed_products_table():
             logger.info("Table has already been loaded with products data!")
 
 
-def get_product_ids(num_ids: int) -> list[str]:
+def load_products() -> list[tuple[uuid.UUID, float]]:
     """
-    Retrieves a specified number of random product IDs from the database.
+    Reads every product id and price from the database.
+
+    Rows are ordered by id so that seeded sampling from the catalog is reproducible.
+
+    :return: A list of (product_id, price) tuples.
+    """
+    with get_session() as session:
+        query = select(Product.id, Product.price).order_by(Product.id)
+        result = session.execute(query).all()
+    return [(product_id, price) for product_id, price in result]
+
+
+product_catalog = ProductCatalog(loader=load_products)
+
+# The partitions of the events table, None when the table isn't partitioned
+events_partitions = (
+    RangePartitions(Events.__table__, EVENTS_PARTITION_BY)
+    if EVENTS_PARTITION_BY is not None
+    else None
+)
+
+
+def get_product_ids(num_ids: int) -> list[uuid.UUID]:
+    """
+    Retrieves a specified number of random product IDs.
+
+    The IDs are sampled from the in-memory product catalog, which is loaded
+    from the database on first use.
 
     :param num_ids: The number of product IDs to retrieve.
-    :return: A list of product IDs as strings.
+    :return: A list of product IDs.
     """
-    with Session() as session:
-        query = select(Product.id).order_by(func.random()).limit(num_ids)
-        result = session.execute(query).scalars().all()
-    return [product_id for product_id in result]
+    return product_catalog.sample(num_ids)
 
 
-def write_to_sink(data: list[dict[str, Any]]) -> None:
+def _chunked(data: Iterable[Any], chunk_size: int) -> Iterator[list[Any]]:
     """
-    Writes customer and event data to the database.
+    Groups an iterable into lists of at most chunk_size items.
 
-    :param data: A list of dictionaries containing customer and event data.
+    :param data: The iterable to group.
+    :param chunk_size: The maximum number of items per list.
+    :return: An iterator over the lists.
     """
-    logger.info(f"Writing {len(data)} records to DB")
-    users = [User(**customer_data["customer"]) for customer_data in data]
+    iterator = iter(data)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+SINK_MODES = ("orm", "copy", "merge", "upsert")
+
+# The merge action of the sink modes that merge rows, see `merge_rows`
+_MERGE_ACTIONS = {"merge": "nothing", "upsert": "update"}
+
+
+def _chunk_rows(
+    chunk: Chunk, dump_mode: str
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Flattens a chunk into user and event rows.
+
+    :param chunk: A list of dictionaries containing customer and event data, or a CustomerBatch.
+    :param dump_mode: The mode a CustomerBatch is dumped in, 'json' or 'python'.
+        Records are used as they are.
+    :return: The user rows and the event rows.
+    """
+    if isinstance(chunk, CustomerBatch):
+        return chunk.to_rows(dump_mode)
+    users = [customer_data["customer"] for customer_data in chunk]
     events = [
-        Events(**customer_event)
-        for customer_data in data
+        customer_event
+        for customer_data in chunk
         for customer_event in customer_data["events"]
     ]
+    return users, events
+
+
+def _write_rows(users: list[dict[str, Any]], events: list[dict[str, Any]]) -> None:
+    """
+    Writes user and event rows to the database in their own transaction using the
+    ORM unit of work.
+
+    :param users: The user rows.
+    :param events: The event rows.
+    """
+    users = [User(**user) for user in users]
+    events = [Events(**event) for event in events]
 
-    with Session() as session:
+    with get_session() as session:
         session.add_all(users)
         session.add_all(events)
         session.commit()
-    logger.info("Records written successfully")
+
+
+def _copy_rows(users: list[dict[str, Any]], events: list[dict[str, Any]]) -> None:
+    """
+    Writes user and event rows to the database in their own transaction using
+    `COPY ... FROM STDIN`, or an executemany INSERT for dialects without COPY.
+
+    :param users: The user rows.
+    :param events: The event rows.
+    """
+    with get_engine().begin() as connection:
+        bulk_insert(connection, User.__table__, users)
+        bulk_insert(connection, Events.__table__, events)
+
+
+def _merge_rows(
+    users: list[dict[str, Any]], events: list[dict[str, Any]], action: str
+) -> None:
+    """
+    Merges user and event rows into the database in their own transaction, so
+    rows that were already written are skipped or updated instead of failing on
+    their primary keys. See `merge_rows`.
+
+    :param users: The user rows.
+    :param events: The event rows.
+    :param action: 'nothing' to skip existing rows, 'update' to overwrite them.
+    """
+    with get_engine().begin() as connection:
+        merged_users = merge_rows(connection, User.__table__, users, action)
+        merged_events = merge_rows(connection, Events.__table__, events, action)
+    # a rowcount of -1 means the driver doesn't know how many rows were merged
+    if action == "nothing" and merged_users != -1 and merged_events != -1:
+        metrics.incr(
+            "rows_skipped", len(users) + len(events) - merged_users - merged_events
+        )
+
+
+def write_rows(
+    users: list[dict[str, Any]], events: list[dict[str, Any]], mode: str = "orm"
+) -> None:
+    """
+    Writes user and event rows to the database in their own transaction.
+
+    When the events table is partitioned, the partitions the events fall in are
+    created first if they don't exist yet.
+
+    :param users: The user rows, keyed like the columns of the users table.
+    :param events: The event rows, keyed like the columns of the events table.
+    :param mode: How the rows are loaded. 'orm' adds ORM objects to a session,
+        'copy' streams the rows with PostgreSQL's COPY. 'merge' and 'upsert' copy
+        the rows to a staging table and merge them, skipping ('merge') or
+        updating ('upsert') the rows that already exist, so chunks can be
+        retried and seeded runs replayed.
+    """
+    if mode not in SINK_MODES:
+        raise ValueError(f"Unsupported sink mode: {mode}")
+
+    with metrics.timer("sink_flush"):
+        if events_partitions is not None and events:
+            timestamps = [event["timestamp"] for event in events]
+            events_partitions.ensure(get_engine(), min(timestamps), max(timestamps))
+        if mode == "copy":
+            _copy_rows(users, events)
+        elif mode in _MERGE_ACTIONS:
+            _merge_rows(users, events, _MERGE_ACTIONS[mode])
+        else:
+            _write_rows(users, events)
+    metrics.incr("rows_written", len(users) + len(events))
+
+
+def write_chunk(chunk: Chunk, mode: str = "orm") -> None:
+    """
+    Writes one chunk of customer and event data to the database in its own
+    transaction, see `write_rows`.
+
+    :param chunk: A list of dictionaries containing customer and event data, or a CustomerBatch.
+    :param mode: How the rows are loaded, one of SINK_MODES.
+    """
+    if mode not in SINK_MODES:
+        raise ValueError(f"Unsupported sink mode: {mode}")
+
+    # batches are dumped straight to UUIDs and datetimes, which every mode takes as they are
+    users, events = _chunk_rows(chunk, "python")
+    write_rows(users, events, mode)
+
+
+def delete_customers_between(start: datetime, end: datetime) -> int:
+    """
+    Deletes the customers created in a period together with all of their events,
+    in one transaction.
+
+    :param start: The start of the period, inclusive.
+    :param end: The end of the period, exclusive.
+    :return: The number of deleted customers.
+    """
+    created = (User.timestamp >= start) & (User.timestamp < end)
+    with get_engine().begin() as connection:
+        connection.execute(
+            delete(Events).where(Events.customer_id.in_(select(User.id).where(created)))
+        )
+        return connection.execute(delete(User).where(created)).rowcount
+
+
+def _day_bounds(day: date) -> tuple[datetime, datetime]:
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+def day_is_backfilled(day: date) -> bool:
+    """
+    Checks whether a backfill recorded a day as completely written.
+
+    :param day: The day.
+    :return: True if the day was recorded, see `record_backfilled_day`.
+    """
+    completed = (BackfilledDay.day == day) & BackfilledDay.completed_at.is_not(None)
+    with get_engine().connect() as connection:
+        return connection.execute(select(exists().where(completed))).scalar()
+
+
+def record_backfilled_day(day: date) -> None:
+    """
+    Records that every customer of a day was written, once `delete_backfilled_day`
+    started the day.
+
+    :param day: The day.
+    """
+    with get_engine().begin() as connection:
+        connection.execute(
+            update(BackfilledDay)
+            .where(BackfilledDay.day == day)
+            .values(completed_at=datetime.utcnow())
+        )
+
+
+def delete_backfilled_day(day: date, force: bool = False) -> int:
+    """
+    Deletes the customers a backfill created on a day together with all of their
+    events, and records the day as being written until `record_backfilled_day`.
+
+    Only days a backfill recorded, completely written or not, are deleted. A day
+    without a record that holds customers, e.g. from a run with `--now` on that
+    day, raises instead, unless force is set.
+
+    :param day: The day.
+    :param force: Delete the customers of a day no backfill recorded too.
+    :return: The number of deleted customers.
+    :raises RuntimeError: If the day holds customers no backfill recorded and
+        force isn't set.
+    """
+    start, end = _day_bounds(day)
+    with get_engine().begin() as connection:
+        # the record stays, so an interrupted day is still known as a backfilled one
+        recorded = connection.execute(
+            update(BackfilledDay).where(BackfilledDay.day == day).values(completed_at=None)
+        ).rowcount
+        if not recorded:
+            created = (User.timestamp >= start) & (User.timestamp < end)
+            if not force and connection.execute(select(exists().where(created))).scalar():
+                raise RuntimeError(
+                    f"{day} holds customers that weren't backfilled, overwrite the day "
+                    "to replace them"
+                )
+            connection.execute(BackfilledDay.__table__.insert().values(day=day))
+    return delete_customers_between(start, end)
+
+
+def partition_chunk(chunk: Chunk, num_partitions: int) -> list[Chunk]:
+    """
+    Splits a chunk into partitions by a hash of the customer id.
+
+    A customer and all of its events always land in the same partition.
+
+    :param chunk: A list of dictionaries containing customer and event data, or a CustomerBatch.
+    :param num_partitions: The number of partitions.
+    :return: The partitions, some of which may be empty.
+    """
+    if isinstance(chunk, CustomerBatch):
+        owners = [
+            zlib.crc32(customer_id.encode()) % num_partitions
+            for customer_id in chunk.customer_ids()
+        ]
+        return [
+            chunk.take([i for i, owner in enumerate(owners) if owner == partition])
+            for partition in range(num_partitions)
+        ]
+    partitions = [[] for _ in range(num_partitions)]
+    for customer_data in chunk:
+        customer_id = str(customer_data["customer"]["id"]).encode()
+        partitions[zlib.crc32(customer_id) % num_partitions].append(customer_data)
+    return partitions
+
+
+class PartitionedWriter:
+    """
+    Writes every chunk as `connections` partitions that are loaded concurrently.
+
+    The partitions are split by customer (see `partition_chunk`) and every one is
+    written by its own thread, over its own pooled connection and in its own
+    transaction, so the load is spread over several server backends. A chunk is
+    only committed partition by partition: when one partition fails, the others
+    may already be committed.
+
+    Attributes:
+        connections (int): The number of partitions, threads and connections.
+        mode (str): How the rows are loaded, one of SINK_MODES. See `write_chunk`.
+    """
+
+    def __init__(self, connections: int, mode: str = "orm"):
+        if mode not in SINK_MODES:
+            raise ValueError(f"Unsupported sink mode: {mode}")
+        config = get_config()
+        if connections > config.pool_size + config.max_overflow:
+            raise ValueError(
+                f"{connections} connections exceed the pool size of {config.pool_size} "
+                f"plus an overflow of {config.max_overflow}"
+            )
+        self.connections = connections
+        self.mode = mode
+        self._executor = ThreadPoolExecutor(
+            max_workers=connections, thread_name_prefix="faux-partition"
+        )
+
+    def write(self, chunk: Chunk) -> None:
+        futures = [
+            self._executor.submit(write_chunk, partition, self.mode)
+            for partition in partition_chunk(chunk, self.connections)
+            if partition
+        ]
+        # wait for every partition before raising the first error
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+    def __enter__(self) -> "PartitionedWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_to_sink(
+    data: Iterable[dict[str, Any]],
+    chunk_size: int = 1000,
+    mode: str = "orm",
+    connections: int = 1,
+) -> None:
+    """
+    Writes customer and event data to the database.
+
+    The data is consumed lazily and committed every chunk_size customers, so any
+    iterable (e.g. `chain.from_iterable(iter_simulation(...))`) can be streamed
+    into the database with bounded memory.
+
+    :param data: An iterable of dictionaries containing customer and event data.
+    :param chunk_size: The number of customers written per transaction.
+    :param mode: How the rows are loaded, one of SINK_MODES. See `write_chunk`.
+    :param connections: The number of connections every chunk is loaded over
+        concurrently, see `PartitionedWriter`.
+    """
+    if mode not in SINK_MODES:
+        raise ValueError(f"Unsupported sink mode: {mode}")
+
+    logger.info(f"Writing records to DB in {mode} mode over {connections} connections")
+    written = 0
+    # a single connection writes every chunk directly, without a thread pool
+    writer = PartitionedWriter(connections, mode=mode) if connections > 1 else None
+    with writer or contextlib.nullcontext():
+        for chunk in _chunked(data, chunk_size):
+            if writer is not None:
+                writer.write(chunk)
+            else:
+                write_chunk(chunk, mode=mode)
+            written += len(chunk)
+            logger.info(f"Committed {written} records")
+    logger.info(f"{written} records written successfully")
+
+
+def upgrade_schema(engine) -> None:
+    """
+    Brings tables created by older versions up to date with the models.
+
+    `create_all` skips tables that already exist, so this stores event_data as
+    JSONB on PostgreSQL and creates the indexes the tables are missing.
+
+    :param engine: The SQLAlchemy engine to use for the connection.
+    """
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            columns = inspect(conn).get_columns(Events.__tablename__, schema=Base.metadata.schema)
+            event_data = next(column for column in columns if column["name"] == "event_data")
+            if not isinstance(event_data["type"], JSONB):
+                logger.info("Converting events.event_data to JSONB, this rewrites the table")
+                table = f"{Base.metadata.schema}.{Events.__tablename__}"
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {table} ALTER COLUMN event_data "
+                        "TYPE jsonb USING event_data::jsonb"
+                    )
+                )
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    if events_partitions is not None and not events_partitions.is_partitioned(engine):
+        raise RuntimeError(
+            f"{Events.__tablename__} already exists as a plain table and can't be "
+            "partitioned in place. Recreate it or unset FAUX_EVENTS_PARTITION_BY."
+        )
 
 
 def start_application():
     """
     Starts the application by initializing the database schema and seeding the products table.
 
-    This function creates all tables defined in the Base metadata and seeds the products table.
+    This function creates all tables defined in the Base metadata, upgrades tables
+    created by older versions, seeds the products table and loads the product
+    catalog into memory. When the events table is partitioned, it also creates the
+    partitions of the upcoming days or months and drops the partitions that fell
+    out of the retention period.
     """
     logger.info("Starting DB to initiate data generation")
+    engine = get_engine()
     Base.metadata.create_all(engine)
+    upgrade_schema(engine)
+    if events_partitions is not None:
+        config = get_config()
+        events_partitions.ensure_upcoming(engine, config.events_partitions_ahead)
+        if config.events_retention_days is not None:
+            cutoff = datetime.utcnow() - timedelta(days=config.events_retention_days)
+            events_partitions.drop_before(engine, cutoff)
     seed_products_table()
+    product_catalog.load()
+    logger.info(f"Loaded {len(product_catalog)} products into the catalog")
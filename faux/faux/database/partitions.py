@@ -0,0 +1,199 @@
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional, Union
+
+from sqlalchemy import Engine, Table, text
+
+logger = logging.getLogger(__name__)
+
+PARTITION_GRANULARITIES = ("day", "month")
+
+Moment = Union[date, datetime, str]
+
+
+def _to_date(value: Moment) -> date:
+    # records dumped in 'json' mode carry ISO 8601 timestamps
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def period_start(value: Moment, granularity: str) -> date:
+    """
+    Returns the first day of the day or month a date falls in.
+    """
+    value = _to_date(value)
+    if granularity == "day":
+        return value
+    if granularity == "month":
+        return value.replace(day=1)
+    raise ValueError(f"Unsupported partition granularity: {granularity}")
+
+
+def next_period(start: date, granularity: str) -> date:
+    """
+    Returns the first day of the period after the one starting on start.
+    """
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if granularity == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    raise ValueError(f"Unsupported partition granularity: {granularity}")
+
+
+class RangePartitions:
+    """
+    The daily or monthly range partitions of a PostgreSQL table partitioned on a
+    timestamp column, e.g. `events_p20240525` or `events_p202405`.
+
+    Partitions are created on demand, see `ensure`, and expire by dropping them
+    as a whole, see `drop_before`. The partitions known to exist are remembered,
+    so ensuring them before every write only issues DDL for new periods.
+
+    Attributes:
+        table (Table): The partitioned table.
+        granularity (str): The period of a partition, 'day' or 'month'.
+    """
+
+    def __init__(self, table: Table, granularity: str):
+        if granularity not in PARTITION_GRANULARITIES:
+            raise ValueError(f"Unsupported partition granularity: {granularity}")
+        self.table = table
+        self.granularity = granularity
+        self._known: set[date] = set()
+        self._lock = threading.Lock()
+
+    def partition_name(self, start: date) -> str:
+        suffix = start.strftime("%Y%m%d" if self.granularity == "day" else "%Y%m")
+        return f"{self.table.name}_p{suffix}"
+
+    def _qualified_name(self, engine: Engine, name: str) -> str:
+        preparer = engine.dialect.identifier_preparer
+        if self.table.schema:
+            return f"{preparer.quote_schema(self.table.schema)}.{preparer.quote(name)}"
+        return preparer.quote(name)
+
+    def _parse_name(self, name: str) -> Optional[date]:
+        prefix = f"{self.table.name}_p"
+        if not name.startswith(prefix):
+            return None
+        try:
+            if self.granularity == "day":
+                return datetime.strptime(name[len(prefix) :], "%Y%m%d").date()
+            return datetime.strptime(name[len(prefix) :], "%Y%m").date()
+        except ValueError:
+            return None
+
+    def periods(self, first: Moment, last: Moment) -> Iterable[date]:
+        """
+        Iterates over the starts of the periods from the one holding first up to
+        and including the one holding last.
+        """
+        start = period_start(first, self.granularity)
+        last = _to_date(last)
+        while start <= last:
+            yield start
+            start = next_period(start, self.granularity)
+
+    def partitions(self, engine: Engine) -> dict[date, str]:
+        """
+        Lists the partitions of the table by the start of their period.
+        """
+        parent = engine.dialect.identifier_preparer.format_table(self.table)
+        query = text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        )
+        with engine.connect() as connection:
+            names = connection.execute(query, {"parent": parent}).scalars()
+            partitions = {self._parse_name(name): name for name in names}
+        partitions.pop(None, None)
+        return dict(sorted(partitions.items()))
+
+    def is_partitioned(self, engine: Engine) -> bool:
+        """
+        Checks whether the table in the database is actually partitioned.
+        """
+        parent = engine.dialect.identifier_preparer.format_table(self.table)
+        query = text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = CAST(:parent AS regclass))"
+        )
+        with engine.connect() as connection:
+            return connection.execute(query, {"parent": parent}).scalar()
+
+    def ensure(self, engine: Engine, first: Moment, last: Moment) -> None:
+        """
+        Creates the partitions covering first up to and including last that don't
+        exist yet.
+
+        :param engine: The SQLAlchemy engine to use for the connection.
+        :param first: The earliest time that needs a partition.
+        :param last: The latest time that needs a partition.
+        """
+        with self._lock:
+            missing = [
+                start for start in self.periods(first, last) if start not in self._known
+            ]
+            if not missing:
+                return
+            parent = engine.dialect.identifier_preparer.format_table(self.table)
+            with engine.begin() as connection:
+                # serializes concurrent writers creating the same partition
+                connection.execute(
+                    text("SELECT pg_advisory_xact_lock(hashtext(:parent))"),
+                    {"parent": parent},
+                )
+                for start in missing:
+                    name = self._qualified_name(engine, self.partition_name(start))
+                    end = next_period(start, self.granularity)
+                    connection.execute(
+                        text(
+                            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} "
+                            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                        )
+                    )
+            self._known.update(missing)
+            logger.info(f"Ensured {len(missing)} {self.table.name} partitions from {missing[0]}")
+
+    def ensure_upcoming(self, engine: Engine, periods: int, today: Optional[date] = None) -> None:
+        """
+        Creates the partitions of the current period and the next ones.
+
+        :param engine: The SQLAlchemy engine to use for the connection.
+        :param periods: The number of periods after the current one.
+        :param today: The current day. Defaults to the current UTC day.
+        """
+        start = period_start(today or datetime.utcnow().date(), self.granularity)
+        last = start
+        for _ in range(periods):
+            last = next_period(last, self.granularity)
+        self.ensure(engine, start, last)
+
+    def drop_before(self, engine: Engine, cutoff: Moment) -> list[str]:
+        """
+        Drops the partitions whose whole period is before cutoff, which expires
+        their rows without deleting them one by one.
+
+        :param engine: The SQLAlchemy engine to use for the connection.
+        :param cutoff: The earliest time to keep.
+        :return: The names of the dropped partitions.
+        """
+        cutoff = _to_date(cutoff)
+        expired = {
+            start: name
+            for start, name in self.partitions(engine).items()
+            if next_period(start, self.granularity) <= cutoff
+        }
+        with self._lock:
+            with engine.begin() as connection:
+                for name in expired.values():
+                    name = self._qualified_name(engine, name)
+                    connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            self._known.difference_update(expired)
+        if expired:
+            logger.info(f"Dropped {len(expired)} {self.table.name} partitions before {cutoff}")
+        return list(expired.values())
@@ -0,0 +1,175 @@
+import base64
+import uuid
+from datetime import datetime
+from typing import Any, Iterator, NamedTuple, Optional
+
+from sqlalchemy import literal, select, tuple_
+from sqlalchemy.dialects.postgresql import JSONB
+
+from faux.database.base import get_session
+from faux.database.db_models import Events, Product, User
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class Page(NamedTuple):
+    """
+    One page of rows.
+
+    next_cursor is None on the last page, otherwise it is passed as the cursor
+    of the next request to continue after the last row of this page.
+    """
+
+    rows: list[dict[str, Any]]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(timestamp: datetime, row_id: uuid.UUID) -> str:
+    """
+    Encodes the position after a row as an opaque cursor.
+
+    :param timestamp: The timestamp of the row.
+    :param row_id: The id of the row.
+    :return: A URL safe cursor.
+    """
+    position = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(position).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """
+    Decodes a cursor made by `encode_cursor`.
+
+    :param cursor: The cursor.
+    :return: The timestamp and the id of the row the cursor points after.
+    :raises ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(timestamp), uuid.UUID(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _fetch_page(model, filters: list, cursor: Optional[str], limit: int) -> Page:
+    """
+    Fetches the rows of a model after the cursor in (timestamp, id) order.
+
+    The cursor is a row comparison on (timestamp, id), which seeks straight to
+    the start of the page through an index that ends in those columns, so a page
+    costs the same however deep it is and however large the table grows.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}: {limit}")
+    conditions = list(filters)
+    if cursor is not None:
+        conditions.append(tuple_(model.timestamp, model.id) > decode_cursor(cursor))
+
+    # one extra row tells whether there is a next page
+    query = (
+        select(model.__table__)
+        .where(*conditions)
+        .order_by(model.timestamp, model.id)
+        .limit(limit + 1)
+    )
+    with get_session() as session:
+        rows = [dict(row) for row in session.execute(query).mappings()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+    return Page(rows, next_cursor)
+
+
+def fetch_users(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Page:
+    """
+    Fetches a page of users in creation order.
+
+    :param start: Optional earliest creation time, inclusive.
+    :param end: Optional latest creation time, exclusive.
+    :param cursor: The next_cursor of the previous page, or None for the first page.
+    :param limit: The maximum number of users on the page.
+    :return: The page.
+    """
+    filters = []
+    if start is not None:
+        filters.append(User.timestamp >= start)
+    if end is not None:
+        filters.append(User.timestamp < end)
+    return _fetch_page(User, filters, cursor, limit)
+
+
+def fetch_products(
+    cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+) -> Page:
+    """
+    Fetches a page of products in creation order.
+
+    :param cursor: The next_cursor of the previous page, or None for the first page.
+    :param limit: The maximum number of products on the page.
+    :return: The page.
+    """
+    return _fetch_page(Product, [], cursor, limit)
+
+
+def fetch_events(
+    start: datetime,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+    customer_id: Optional[uuid.UUID] = None,
+    data_contains: Optional[dict[str, Any]] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Page:
+    """
+    Fetches a page of events in time order.
+
+    Filtering by event type or customer uses the (event_type, timestamp, id) and
+    (customer_id, timestamp, id) indexes. data_contains matches events whose
+    event_data contains the given object, e.g. `{"status": "success"}`, through
+    the GIN index on event_data, and is only supported on PostgreSQL.
+
+    :param start: The earliest event time, inclusive.
+    :param end: Optional latest event time, exclusive.
+    :param event_type: Optional event type to filter on, e.g. 'checkout'.
+    :param customer_id: Optional customer to filter on.
+    :param data_contains: Optional object the event_data must contain.
+    :param cursor: The next_cursor of the previous page, or None for the first page.
+    :param limit: The maximum number of events on the page.
+    :return: The page.
+    """
+    filters = [Events.timestamp >= start]
+    if end is not None:
+        filters.append(Events.timestamp < end)
+    if event_type is not None:
+        filters.append(Events.event_type == event_type)
+    if customer_id is not None:
+        filters.append(Events.customer_id == customer_id)
+    if data_contains is not None:
+        filters.append(Events.event_data.op("@>")(literal(data_contains, JSONB)))
+    return _fetch_page(Events, filters, cursor, limit)
+
+
+def iter_pages(fetch, **filters) -> Iterator[Page]:
+    """
+    Iterates over every page of a fetch function, following the cursors.
+
+    :param fetch: One of `fetch_users`, `fetch_products` or `fetch_events`.
+    :param filters: The keyword arguments of the fetch function, except the cursor.
+    :return: An iterator over the pages.
+    """
+    cursor = None
+    while True:
+        page = fetch(cursor=cursor, **filters)
+        yield page
+        if page.next_cursor is None:
+            return
+        cursor = page.next_cursor
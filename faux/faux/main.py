@@ -1,8 +1,315 @@
-from database.db_utils import start_application
-from faux.simulator.sim_utils import create_simulation
-from faux.database.db_utils import write_to_sink
+import argparse
+import contextlib
+import logging
+import os
+import random
+from datetime import date, datetime
+
+from faux import configure_logging
+from faux.bus.event_bus import EventBus
+from faux.bus.subscribers import (
+    SUBSCRIBERS,
+    MessageCounter,
+    NdjsonTopicWriter,
+    PostgresWriter,
+)
+from faux.core.config import configure, get_config
+from faux.core.ids import UUID_VERSIONS
+from faux.simulator.sim_utils import iter_simulation
+from faux.core.identity import IdentityPool
+from faux.core.metrics import SummaryReporter, metrics
+from faux.simulator.customer_store import CustomerStore
+from faux.simulator.scenario import Scenario
+from faux.simulator.pipeline import run_pipeline
+from faux.simulator.backfill import (
+    SinkFactory,
+    backfill,
+    file_sink_factory,
+    postgres_sink_factory,
+)
+from faux.database.catalog import PRODUCTS_FILE, file_catalog
+from faux.database.db_utils import SINK_MODES, start_application
+from faux.sinks.base import Sink
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate fake e-commerce events data.")
+    parser.add_argument(
+        "-n", "--customers", type=int, default=100, help="number of customers to simulate"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=1000, help="customers per chunk/transaction"
+    )
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible runs")
+    parser.add_argument(
+        "--mode", choices=("scalar", "batch"), default="scalar", help="generation engine"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="number of generator processes"
+    )
+    parser.add_argument(
+        "--trusted",
+        action="store_true",
+        help="skip pydantic validation of the generated payloads",
+    )
+    parser.add_argument(
+        "--validate-sample-rate",
+        type=float,
+        default=0.0,
+        help="fraction of trusted payloads that are validated anyway",
+    )
+    parser.add_argument(
+        "--identity-pool",
+        type=int,
+        default=None,
+        metavar="SIZE",
+        help="compose customer details from a precomputed pool of SIZE names and cities",
+    )
+    parser.add_argument(
+        "--identity-namespace",
+        default="",
+        help="tag appended to pooled identities to keep separate runs unique",
+    )
+    parser.add_argument(
+        "--sink",
+        choices=("postgres", "parquet", "arrow", "ndjson", "bus"),
+        default="postgres",
+        help="where the generated data is written. 'bus' publishes it to an event "
+        "bus with the --subscribers as consumers",
+    )
+    parser.add_argument(
+        "--subscribers",
+        nargs="+",
+        choices=SUBSCRIBERS,
+        default=["metrics"],
+        help="the consumers of the bus sink, which all receive every message: "
+        "'postgres' writes the tables with --sink-mode, 'ndjson' writes a file per "
+        "topic to --output-dir and 'metrics' counts the messages per topic",
+    )
+    parser.add_argument(
+        "--sink-mode",
+        choices=SINK_MODES,
+        default="orm",
+        help="how rows are loaded into the database. 'merge' skips and 'upsert' "
+        "updates rows that already exist, so runs can be retried or replayed",
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=1,
+        help="database connections every chunk is loaded over in parallel",
+    )
+    parser.add_argument(
+        "--output-dir", default="output", help="directory used by the file sinks"
+    )
+    parser.add_argument(
+        "--products",
+        default=PRODUCTS_FILE,
+        metavar="PATH",
+        help="JSON file with the products picked from without a database",
+    )
+    parser.add_argument(
+        "--writers", type=int, default=1, help="number of sink writer threads"
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=4,
+        help="maximum number of generated chunks waiting to be written",
+    )
+    parser.add_argument(
+        "--backfill",
+        nargs=2,
+        type=date.fromisoformat,
+        metavar=("START", "END"),
+        help="generate every day from START to END (inclusive) as its own partition, "
+        "with --customers customers per day",
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="regenerate backfill days that already exist instead of skipping them. "
+        "Also replaces customers of the days that no backfill wrote",
+    )
+    parser.add_argument(
+        "--shard",
+        nargs=2,
+        type=int,
+        default=(0, 1),
+        metavar=("INDEX", "COUNT"),
+        help="generate only shard INDEX of COUNT shards of the run, e.g. one per "
+        "machine. Needs --seed and --now to add up to the same run",
+    )
+    parser.add_argument(
+        "--now",
+        type=datetime.fromisoformat,
+        default=None,
+        help="the simulated current time, in ISO 8601. Defaults to the current UTC time",
+    )
+    parser.add_argument(
+        "--uuid-version",
+        type=int,
+        choices=UUID_VERSIONS,
+        default=None,
+        help="4 for random ids, 7 for ids that sort by their simulated creation time. "
+        "Defaults to FAUX_UUID_VERSION or 4",
+    )
+    parser.add_argument(
+        "--scenario",
+        type=Scenario.load,
+        default=None,
+        metavar="PATH",
+        help="JSON file with the probabilities of the shopping sessions, "
+        "see config/scenarios/",
+    )
+    parser.add_argument(
+        "--customer-store",
+        default=None,
+        metavar="PATH",
+        help="record the state of every generated customer in this file, in the .npy "
+        "format. Created if it doesn't exist and extended by later runs",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="log a metrics summary line every SECONDS",
+    )
+    args = parser.parse_args()
+    if args.backfill and args.sink == "bus":
+        parser.error("--backfill doesn't support the bus sink")
+    return args
+
+
+def create_bus_sink(args: argparse.Namespace) -> Sink:
+    from faux.sinks.bus import EventBusSink
+
+    bus = EventBus()
+    for name in args.subscribers:
+        if name == "postgres":
+            handler = PostgresWriter(mode=args.sink_mode)
+        elif name == "ndjson":
+            handler = NdjsonTopicWriter(args.output_dir)
+        else:
+            handler = MessageCounter()
+        bus.subscribe(handler, name=f"faux-{name}")
+    return EventBusSink(bus)
+
+
+def create_sink(args: argparse.Namespace) -> Sink:
+    if args.sink == "postgres":
+        from faux.sinks.postgres import PostgresSink
+
+        return PostgresSink(mode=args.sink_mode, connections=args.connections)
+
+    if args.sink == "bus":
+        return create_bus_sink(args)
+
+    if args.sink == "ndjson":
+        from faux.sinks.ndjson import NdjsonFileSink
+
+        return NdjsonFileSink(args.output_dir)
+
+    from faux.sinks.columnar import ColumnarFileSink
+
+    return ColumnarFileSink(args.output_dir, file_format=args.sink)
+
+
+def create_sink_factory(args: argparse.Namespace) -> SinkFactory:
+    if args.sink == "postgres":
+        return postgres_sink_factory(mode=args.sink_mode, connections=args.connections)
+    return file_sink_factory(args.output_dir, file_format=args.sink)
+
 
 if __name__ == "__main__":
-    start_application()
-    sim_data = create_simulation(n=100)
-    write_to_sink(data=sim_data)
+    args = parse_args()
+    configure_logging()
+    config = get_config()
+    # every writer thread holds up to `connections` connections at once
+    configure(
+        pool_size=max(config.pool_size, args.writers * args.connections),
+        uuid_version=args.uuid_version or config.uuid_version,
+    )
+    catalog = None
+    if args.sink == "postgres" or (args.sink == "bus" and "postgres" in args.subscribers):
+        start_application()
+    else:
+        # the other sinks run without a database, their products come from a file
+        catalog = file_catalog(args.seed or 0, args.products)
+    identities = None
+    if args.identity_pool:
+        identities = IdentityPool(
+            size=args.identity_pool,
+            seed=args.seed or 0,
+            namespace=args.identity_namespace,
+        )
+    reporter = (
+        SummaryReporter(metrics, args.metrics_interval)
+        if args.metrics_interval
+        else contextlib.nullcontext()
+    )
+    if args.backfill:
+        seed = args.seed
+        if seed is None:
+            seed = random.getrandbits(32)
+            logger.info(f"Backfilling with seed {seed}, pass it to regenerate days")
+        with reporter:
+            backfill(
+                *args.backfill,
+                customers_per_day=args.customers,
+                seed=seed,
+                sink_factory=create_sink_factory(args),
+                overwrite=args.overwrite,
+                workers=args.workers,
+                mode=args.mode,
+                chunk_size=args.chunk_size,
+                trusted=args.trusted,
+                validate_sample_rate=args.validate_sample_rate,
+                identities=identities,
+                catalog=catalog,
+                scenario=args.scenario,
+            )
+        logger.info(metrics.summary())
+        raise SystemExit
+
+    sim_data = iter_simulation(
+        n=args.customers,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+        mode=args.mode,
+        workers=args.workers,
+        trusted=args.trusted,
+        validate_sample_rate=args.validate_sample_rate,
+        identities=identities,
+        catalog=catalog,
+        compact=args.mode == "batch",
+        scenario=args.scenario,
+        shard=args.shard[0],
+        num_shards=args.shard[1],
+        now=args.now,
+        # the sinks take the UUIDs and datetimes of records as they are
+        dump_mode="python",
+    )
+    customer_store = None
+    if args.customer_store:
+        customer_store = (
+            CustomerStore.load(args.customer_store)
+            if os.path.exists(args.customer_store)
+            else CustomerStore()
+        )
+        sim_data = customer_store.track(sim_data)
+    with reporter, create_sink(args) as sink:
+        run_pipeline(
+            sim_data,
+            sink,
+            writers=args.writers,
+            queue_size=args.queue_size,
+            report_interval=10,
+        )
+    if customer_store is not None:
+        customer_store.save(args.customer_store)
+        logger.info(f"Customers by state: {customer_store.counts()}")
+    logger.info(metrics.summary())
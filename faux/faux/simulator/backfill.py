@@ -0,0 +1,276 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, NamedTuple, Optional, Union
+
+import numpy as np
+
+from faux.core.identity import IdentityPool
+from faux.core.metrics import Metrics, metrics
+from faux.database.base import dispose_inherited_engine
+from faux.database.catalog import ProductCatalog
+from faux.database.db_utils import product_catalog
+from faux.simulator.scenario import Scenario
+from faux.simulator.sim_utils import iter_simulation
+from faux.sinks.base import Sink
+
+logger = logging.getLogger(__name__)
+
+# Customer indexes of a day start at day.toordinal() * DAY_INDEX_STRIDE, which keeps
+# identities from an IdentityPool unique across days
+DAY_INDEX_STRIDE = 1 << 24
+
+SinkFactory = Callable[[date], Sink]
+
+
+class DayResult(NamedTuple):
+    """
+    The outcome of backfilling one day.
+
+    status is 'written', 'replaced' (existing data was dropped first) or 'skipped'.
+    """
+
+    day: date
+    status: str
+    customers: int
+    seconds: float
+
+
+def day_seed(seed: int, day: date) -> int:
+    """
+    Derives the seed of a day's partition from the backfill seed.
+
+    :param seed: The seed of the backfill.
+    :param day: The day.
+    :return: A seed that only depends on the backfill seed and the day.
+    """
+    state = np.random.SeedSequence([seed, day.toordinal()]).generate_state(1, np.uint64)
+    return int(state[0])
+
+
+def iter_days(start_date: date, end_date: date) -> Iterable[date]:
+    """
+    Iterates over the days from start_date up to and including end_date.
+    """
+    for offset in range((end_date - start_date).days + 1):
+        yield start_date + timedelta(days=offset)
+
+
+def _postgres_sink(day: date, mode: str, connections: int) -> Sink:
+    from faux.sinks.postgres import PostgresSink
+
+    return PostgresSink(mode=mode, connections=connections)
+
+
+def _file_sink(day: date, root: Union[str, Path], file_format: str) -> Sink:
+    if file_format == "ndjson":
+        from faux.sinks.ndjson import NdjsonFileSink
+
+        return NdjsonFileSink.for_day(root, day)
+
+    from faux.sinks.columnar import ColumnarFileSink
+
+    return ColumnarFileSink.for_day(root, day, file_format=file_format)
+
+
+def postgres_sink_factory(mode: str = "orm", connections: int = 1) -> SinkFactory:
+    """
+    Returns a sink factory that writes every day to the database.
+    """
+    return partial(_postgres_sink, mode=mode, connections=connections)
+
+
+def file_sink_factory(
+    root: Union[str, Path], file_format: str = "parquet"
+) -> SinkFactory:
+    """
+    Returns a sink factory that writes every day to its own part files, as
+    'parquet', 'arrow' or 'ndjson'.
+    """
+    return partial(_file_sink, root=root, file_format=file_format)
+
+
+def backfill_day(
+    day: date,
+    customers_per_day: int,
+    seed: int,
+    sink_factory: SinkFactory,
+    overwrite: bool = False,
+    mode: str = "batch",
+    chunk_size: int = 1000,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
+    identities: Optional[IdentityPool] = None,
+    catalog: Optional[ProductCatalog] = None,
+    scenario: Optional[Scenario] = None,
+) -> DayResult:
+    """
+    Generates and writes the customers that arrive on one day.
+
+    The customers arrive at random times during the day and their data only
+    depends on the seed and the day, so a day can be regenerated on its own
+    and comes out the same every time.
+
+    A day only counts as existing once the sink completed it (see
+    `Sink.complete_partition`), after its last chunk. Whatever an interrupted
+    run left of the day is dropped before the day is written again. A day that
+    holds data no backfill wrote, e.g. customers of a regular run, is only
+    replaced with `overwrite` and raises otherwise, see `Sink.drop_partition`.
+
+    :param day: The day to generate.
+    :param customers_per_day: The number of customers that arrive on the day.
+    :param seed: The seed of the backfill.
+    :param sink_factory: Creates the sink the day is written to.
+    :param overwrite: Replace the day if it already exists instead of skipping it,
+        including data of the day that no backfill wrote.
+    :param mode: The generation engine, 'scalar' or 'batch'.
+    :param chunk_size: The number of customers per chunk.
+    :param trusted: Skip model validation for the generated payloads.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :param identities: Optional identity pool to compose the customers' details from.
+    :param catalog: Optional product catalog to pick cart items from.
+    :param scenario: Optional probabilities of the shopping sessions.
+    :return: The outcome of the day.
+    """
+    started = time.perf_counter()
+    with sink_factory(day) as sink:
+        status = "written"
+        if sink.has_partition(day):
+            if not overwrite:
+                logger.info(f"Skipping {day}, it already exists")
+                return DayResult(day, "skipped", 0, time.perf_counter() - started)
+            status = "replaced"
+        # also clears the rows or files of an interrupted run of the day, and
+        # refuses to delete data of the day that no backfill wrote
+        sink.drop_partition(day, force=overwrite)
+
+        start = datetime.combine(day, datetime.min.time())
+        chunks = iter_simulation(
+            customers_per_day,
+            chunk_size=chunk_size,
+            seed=day_seed(seed, day),
+            mode=mode,
+            trusted=trusted,
+            validate_sample_rate=validate_sample_rate,
+            identities=identities,
+            catalog=catalog,
+            first_index=day.toordinal() * DAY_INDEX_STRIDE,
+            window=(start, start + timedelta(days=1)),
+            # every sink writes batches without dumping them to records first, and
+            # takes the UUIDs and datetimes of records as they are
+            compact=mode == "batch",
+            scenario=scenario,
+            dump_mode="python",
+        )
+        customers = sink.write_all(chunks)
+        sink.complete_partition(day)
+
+    seconds = time.perf_counter() - started
+    logger.info(f"Backfilled {day}: {customers} customers in {seconds:.2f}s ({status})")
+    return DayResult(day, status, customers, seconds)
+
+
+def _backfill_day_in_worker(
+    run_day: Callable[[date], DayResult], day: date
+) -> tuple[DayResult, Metrics]:
+    # the worker's metrics are sent back to be merged into the parent's
+    metrics.reset()
+    return run_day(day), metrics
+
+
+def backfill(
+    start_date: date,
+    end_date: date,
+    customers_per_day: int,
+    seed: int,
+    sink_factory: SinkFactory,
+    overwrite: bool = False,
+    workers: Optional[int] = None,
+    mode: str = "batch",
+    chunk_size: int = 1000,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
+    identities: Optional[IdentityPool] = None,
+    catalog: Optional[ProductCatalog] = None,
+    scenario: Optional[Scenario] = None,
+) -> list[DayResult]:
+    """
+    Backfills every day from start_date up to and including end_date.
+
+    Every day is an independent partition derived from the seed (see
+    `backfill_day`): days that were completely written are skipped unless
+    `overwrite` is set, so an interrupted backfill can simply be run again and
+    rewrites the day it was interrupted in, and a single bad day can be
+    regenerated by backfilling just that day with `overwrite`.
+
+    With several workers, every worker process generates and writes whole days,
+    each through its own sink.
+
+    :param start_date: The first day.
+    :param end_date: The last day, inclusive.
+    :param customers_per_day: The number of customers that arrive every day.
+    :param seed: The seed of the backfill.
+    :param sink_factory: Creates the sink a day is written to, e.g.
+        `postgres_sink_factory()` or `file_sink_factory(root)`. Must be picklable
+        when using workers.
+    :param overwrite: Replace days that already exist instead of skipping them,
+        including data of the days that no backfill wrote.
+    :param workers: Optional number of worker processes. Days are generated in the
+        current process when None or 1.
+    :param mode: The generation engine, 'scalar' or 'batch'.
+    :param chunk_size: The number of customers per chunk.
+    :param trusted: Skip model validation for the generated payloads.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :param identities: Optional identity pool to compose the customers' details from.
+    :param catalog: Optional product catalog to pick cart items from. Defaults to
+        the shared catalog loaded from the database.
+    :param scenario: Optional probabilities of the shopping sessions.
+    :return: The outcome of every day, in order.
+    """
+    if end_date < start_date:
+        raise ValueError(f"end_date {end_date} is before start_date {start_date}")
+    if customers_per_day > DAY_INDEX_STRIDE:
+        raise ValueError(f"At most {DAY_INDEX_STRIDE} customers per day are supported")
+
+    catalog = catalog or product_catalog
+    # workers receive a snapshot of the catalog instead of querying the database
+    if catalog.is_stale:
+        catalog.load()
+
+    run_day = partial(
+        backfill_day,
+        customers_per_day=customers_per_day,
+        seed=seed,
+        sink_factory=sink_factory,
+        overwrite=overwrite,
+        mode=mode,
+        chunk_size=chunk_size,
+        trusted=trusted,
+        validate_sample_rate=validate_sample_rate,
+        identities=identities,
+        catalog=catalog,
+        scenario=scenario,
+    )
+    days = list(iter_days(start_date, end_date))
+    logger.info(f"Backfilling {len(days)} days from {start_date} to {end_date}")
+
+    if workers is None or workers <= 1:
+        results = [run_day(day) for day in days]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=dispose_inherited_engine
+        ) as executor:
+            results = []
+            for result, day_metrics in executor.map(
+                partial(_backfill_day_in_worker, run_day), days
+            ):
+                metrics.merge(day_metrics)
+                results.append(result)
+
+    written = sum(result.customers for result in results)
+    skipped = sum(result.status == "skipped" for result in results)
+    logger.info(f"Backfill done: {written} customers written, {skipped} days skipped")
+    return results
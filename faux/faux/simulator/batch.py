@@ -0,0 +1,480 @@
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Optional, Sequence, Union
+
+import numpy as np
+
+from faux.core import faux_utils
+from faux.core.config import get_config
+from faux.core.identity import IdentityPool
+from faux.core.ids import random_uuid_bytes
+from faux.simulator.clock import US_PER_DAY, US_PER_HOUR, US_PER_MINUTE, US_PER_SECOND
+from faux.simulator.scenario import CHECKOUT_STATUSES, DEFAULT_SCENARIO, Scenario
+
+if TYPE_CHECKING:
+    from faker import Faker
+
+
+EVENT_TYPES = ("visit", "add_to_cart", "remove_from_cart", "checkout")
+VISIT, ADD_TO_CART, REMOVE_FROM_CART, CHECKOUT = range(len(EVENT_TYPES))
+
+# Catalogs up to this size are sampled for a whole block at once by ranking a
+# (customers x products) matrix of random keys, larger ones fall back to a
+# per-customer draw.
+DENSE_SAMPLE_LIMIT = 256
+
+
+def _to_uuids(raw: np.ndarray) -> list[uuid.UUID]:
+    return [uuid.UUID(bytes=row) for row in map(bytes, raw)]
+
+
+def _to_uuid_strings(raw: np.ndarray) -> list[str]:
+    # formatting the hex dump directly is several times faster than str(uuid.UUID(...))
+    h = raw.tobytes().hex()
+    return [
+        f"{h[i:i + 8]}-{h[i + 8:i + 12]}-{h[i + 12:i + 16]}-{h[i + 16:i + 20]}-{h[i + 20:i + 32]}"
+        for i in range(0, len(h), 32)
+    ]
+
+
+def _to_datetimes(epoch_us: np.ndarray) -> list[datetime]:
+    return epoch_us.astype("datetime64[us]").tolist()
+
+
+def _sample_products(
+    rng: np.random.Generator, n_picks: np.ndarray, num_products: int
+) -> np.ndarray:
+    """
+    Picks n_picks[i] distinct product indexes for every customer i.
+
+    :param rng: The numpy random generator to draw from.
+    :param n_picks: The number of products picked by each customer.
+    :param num_products: The number of products in the catalog.
+    :return: A flat array of product indexes, grouped by customer.
+    """
+    if num_products <= DENSE_SAMPLE_LIMIT:
+        max_picks = int(n_picks.max(initial=0))
+        keys = rng.random((len(n_picks), num_products))
+        ranked = np.argsort(keys, axis=1)[:, :max_picks]
+        return ranked[np.arange(max_picks) < n_picks[:, None]]
+    return np.concatenate(
+        [rng.choice(num_products, size=k, replace=False) for k in n_picks]
+        or [np.empty(0, dtype=np.int64)]
+    )
+
+
+class CustomerBatch:
+    """
+    A block of simulated customers and their events stored as columns.
+
+    User columns are indexed by customer position in the batch, event columns
+    hold one entry per event and are ordered by customer and then by the
+    sequence in which the events happened.
+
+    Ids are kept as 16 raw bytes, timestamps as epoch microseconds and event
+    types, browsers, items and statuses as small integer codes, about a tenth of
+    the memory of the equivalent dictionaries. Batches can be handed to the sinks
+    as they are, which only convert them to rows or records when writing.
+
+    Attributes:
+        users (dict[str, Any]): The user columns (id, timestamp, username, email, location).
+        events (dict[str, np.ndarray]): The event columns. `customer` holds the position of
+            the owning customer, `event_type` and `status` index into EVENT_TYPES and
+            CHECKOUT_STATUSES, `browser` indexes into faux_utils.browsers and `item` indexes
+            into `product_ids`. Columns that don't apply to an event type are zero.
+        product_ids (Sequence[uuid.UUID]): The product catalog the items were drawn from.
+    """
+
+    def __init__(
+        self,
+        users: dict[str, Any],
+        events: dict[str, np.ndarray],
+        product_ids: Sequence[uuid.UUID],
+    ):
+        self.users = users
+        self.events = events
+        self.product_ids = product_ids
+
+    def __len__(self) -> int:
+        return len(self.users["username"])
+
+    @property
+    def num_events(self) -> int:
+        return len(self.events["event_type"])
+
+    def customer_ids(self) -> list[str]:
+        """
+        Returns the customer ids as strings.
+        """
+        return _to_uuid_strings(self.users["id"])
+
+    def take(self, customers: np.ndarray) -> "CustomerBatch":
+        """
+        Returns a batch of some of the customers and their events.
+
+        :param customers: The positions of the customers, in increasing order.
+        :return: A new CustomerBatch.
+        """
+        customers = np.asarray(customers, dtype=np.int64)
+        position = np.full(len(self), -1)
+        position[customers] = np.arange(len(customers))
+        kept = position[self.events["customer"]] >= 0
+        events = {name: column[kept] for name, column in self.events.items()}
+        events["customer"] = position[events["customer"]]
+        users = {
+            name: (
+                column[customers]
+                if isinstance(column, np.ndarray)
+                else [column[i] for i in customers.tolist()]
+            )
+            for name, column in self.users.items()
+        }
+        return CustomerBatch(users=users, events=events, product_ids=self.product_ids)
+
+    def validate_sample(self, validate_sample_rate: float) -> int:
+        """
+        Sends a random fraction of the customers through full model validation,
+        see `faux_utils.validate_sample`.
+
+        :param validate_sample_rate: The fraction of customers to validate.
+        :return: The number of customers that were validated.
+        """
+        if not validate_sample_rate:
+            return 0
+        sampled = [
+            i
+            for i in range(len(self))
+            if faux_utils.should_validate(True, validate_sample_rate)
+        ]
+        return faux_utils.validate_sample(self.take(sampled).to_records(), 1.0)
+
+    def to_rows(
+        self, dump_mode: str = "json"
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """
+        Materializes the batch as flat user and event rows, keyed like the columns
+        of the users and events tables.
+
+        :param dump_mode: The mode to dump the rows. 'json' writes ids and timestamps
+            as strings, 'python' as UUIDs and datetimes.
+        :return: The user rows and the event rows, ordered by customer.
+        """
+        if dump_mode not in {"json", "python"}:
+            raise ValueError(f"Unsupported dump mode: {dump_mode}")
+
+        as_json = dump_mode == "json"
+
+        def ids(raw):
+            return _to_uuid_strings(raw) if as_json else _to_uuids(raw)
+
+        def timestamps(epoch_us):
+            values = _to_datetimes(epoch_us)
+            return [value.isoformat() for value in values] if as_json else values
+
+        product_ids = (
+            [str(product_id) for product_id in self.product_ids]
+            if as_json
+            else list(self.product_ids)
+        )
+
+        user_ids = ids(self.users["id"])
+        users = [
+            {
+                "id": user_id,
+                "timestamp": timestamp,
+                "username": username,
+                "email": email,
+                "location": location,
+            }
+            for user_id, timestamp, username, email, location in zip(
+                user_ids,
+                timestamps(self.users["timestamp"]),
+                self.users["username"],
+                self.users["email"],
+                self.users["location"],
+            )
+        ]
+
+        columns = self.events
+        checkouts = np.flatnonzero(columns["event_type"] == CHECKOUT)
+        checkout_data = dict(
+            zip(
+                checkouts.tolist(),
+                zip(
+                    ids(columns["order_id"][checkouts]),
+                    timestamps(columns["data_timestamp"][checkouts]),
+                ),
+            )
+        )
+        events = []
+        for position, (
+            event_id,
+            timestamp,
+            customer,
+            event_type,
+            browser,
+            item,
+            quantity,
+            status,
+        ) in enumerate(
+            zip(
+                ids(columns["id"]),
+                timestamps(columns["timestamp"]),
+                columns["customer"].tolist(),
+                columns["event_type"].tolist(),
+                columns["browser"].tolist(),
+                columns["item"].tolist(),
+                columns["quantity"].tolist(),
+                columns["status"].tolist(),
+            )
+        ):
+            if event_type == VISIT:
+                event_data = {
+                    "browser": faux_utils.browsers[browser],
+                    "timestamp": timestamp,
+                }
+            elif event_type == ADD_TO_CART:
+                event_data = {
+                    "item_id": product_ids[item],
+                    "timestamp": timestamp,
+                    "quantity": quantity,
+                }
+            elif event_type == REMOVE_FROM_CART:
+                event_data = {"item_id": product_ids[item], "timestamp": timestamp}
+            else:
+                order_id, checked_out_at = checkout_data[position]
+                event_data = {
+                    "status": CHECKOUT_STATUSES[status],
+                    "order_id": order_id,
+                    "timestamp": checked_out_at,
+                }
+            events.append(
+                {
+                    "id": event_id,
+                    "timestamp": timestamp,
+                    "customer_id": user_ids[customer],
+                    "event_type": EVENT_TYPES[event_type],
+                    "event_data": event_data,
+                }
+            )
+        return users, events
+
+    def to_records(self, dump_mode: str = "json") -> list[dict[str, Any]]:
+        """
+        Materializes the batch in the same shape as `generate_customer_data`.
+
+        :param dump_mode: The mode to dump the records. Options are 'json' or 'python'.
+        :return: A list of dictionaries containing customer data and events.
+        """
+        users, events = self.to_rows(dump_mode)
+        records = [{"customer": user, "events": []} for user in users]
+        for event, customer in zip(events, self.events["customer"].tolist()):
+            records[customer]["events"].append(event)
+        return records
+
+
+# A chunk of simulated customers, as a list of customer records or as a batch
+Chunk = Union[list[dict[str, Any]], CustomerBatch]
+
+
+def count_rows(chunk: Chunk) -> int:
+    """
+    Returns the number of user and event rows in a chunk.
+    """
+    if isinstance(chunk, CustomerBatch):
+        return len(chunk) + chunk.num_events
+    return len(chunk) + sum(len(customer_data["events"]) for customer_data in chunk)
+
+
+def generate_customer_batch(
+    n: int,
+    rng: np.random.Generator,
+    product_ids: Sequence[uuid.UUID],
+    now: Optional[datetime] = None,
+    fake: Optional["Faker"] = None,
+    identities: Optional[IdentityPool] = None,
+    first_index: int = 0,
+    arrivals: Optional[np.ndarray] = None,
+    scenario: Optional[Scenario] = None,
+    uuid_version: Optional[int] = None,
+) -> CustomerBatch:
+    """
+    Generates a block of n customers and their events in one vectorized pass.
+
+    Every per-customer count and choice is drawn as a numpy array for the whole block,
+    from the same scenario tables as `generate_customer_data`: historic visits up to
+    10 days in the past, live visits, distinct products added to the cart and maybe
+    removed again and, when the cart isn't empty, a checkout that completes some
+    minutes later unless the cart is abandoned. The live events of a customer follow
+    each other the scenario's event gaps apart, computed in integer microseconds.
+    See `Scenario`.
+
+    :param n: The number of customers to generate.
+    :param rng: The numpy random generator to draw from.
+    :param product_ids: The product ids to pick cart items from.
+    :param now: The simulated current time. Defaults to the current UTC time.
+    :param fake: The Faker instance used for usernames, emails and cities.
+        Defaults to the shared faux_utils instance.
+    :param identities: Optional identity pool to compose usernames, emails and cities
+        from instead of calling Faker for every customer.
+    :param first_index: The index of the block's first customer in the simulation,
+        which keeps identities from the pool unique across blocks.
+    :param arrivals: Optional per-customer arrival times in epoch microseconds. Every
+        customer is created and shops at its arrival time instead of at `now`.
+    :param scenario: Optional probabilities of the shopping session. Defaults to
+        DEFAULT_SCENARIO.
+    :param uuid_version: Optional version of the generated ids, 4 or 7. Version 7
+        ids are stamped with the time of their customer, event or checkout.
+        Defaults to FauxConfig.uuid_version.
+    :return: A CustomerBatch holding the generated customers and events.
+    """
+    tables = (scenario or DEFAULT_SCENARIO).compiled
+    uuid_version = uuid_version or get_config().uuid_version
+    if arrivals is None:
+        now = now or datetime.utcnow()
+        arrivals = np.full(n, int(np.datetime64(now, "us").astype(np.int64)))
+    num_products = len(product_ids)
+    customers = np.arange(n)
+
+    # per-customer counts
+    has_history = tables.history.sample_array(rng, n)
+    n_historic = np.where(has_history, tables.historic_visits.sample_array(rng, n), 0)
+    n_live = tables.visits.sample_array(rng, n)
+    n_picks = np.minimum(tables.picks.sample_array(rng, n), num_products)
+
+    # historic visits
+    historic_owner = np.repeat(customers, n_historic)
+    n_historic_total = len(historic_owner)
+    historic_ts = arrivals[historic_owner] - (
+        rng.integers(1, 11, n_historic_total) * US_PER_DAY
+        + rng.integers(0, 24, n_historic_total) * US_PER_HOUR
+        + rng.integers(0, 60, n_historic_total) * US_PER_MINUTE
+        + rng.integers(0, 60, n_historic_total) * US_PER_SECOND
+        + rng.integers(0, US_PER_SECOND, n_historic_total)
+    )
+    historic_slot = np.arange(n_historic_total) - np.repeat(
+        np.cumsum(n_historic) - n_historic, n_historic
+    )
+
+    # live visits
+    live_owner = np.repeat(customers, n_live)
+    live_slot = (
+        np.arange(len(live_owner))
+        - np.repeat(np.cumsum(n_live) - n_live, n_live)
+        + n_historic[live_owner]
+    )
+
+    # cart updates, each pick is an add_to_cart optionally followed by a remove_from_cart
+    pick_owner = np.repeat(customers, n_picks)
+    n_picks_total = len(pick_owner)
+    items = _sample_products(rng, n_picks, num_products)
+    quantities = tables.quantities.sample_array(rng, n_picks_total)
+    removed = tables.remove.sample_array(rng, n_picks_total)
+    pick_slot = (
+        n_historic[pick_owner]
+        + n_live[pick_owner]
+        + 2
+        * (np.arange(n_picks_total) - np.repeat(np.cumsum(n_picks) - n_picks, n_picks))
+    )
+
+    # checkout, only possible when the cart isn't empty and kept unless abandoned
+    n_removed = np.bincount(pick_owner, weights=removed, minlength=n)
+    statuses = tables.checkout_statuses.sample_indexes(rng, n)
+    abandoned = tables.abandon.sample_array(rng, n)
+    checkout_delay = tables.checkout_delay_minutes.sample_array(rng, n) * US_PER_MINUTE
+    checked_out = (n_removed < n_picks) & ~abandoned
+    checkout_owner = customers[checked_out]
+    n_checkouts = len(checkout_owner)
+    checkout_slot = (n_historic + n_live + 2 * n_picks)[checked_out]
+
+    event_type = np.concatenate(
+        [
+            np.full(n_historic_total + len(live_owner), VISIT),
+            np.full(n_picks_total, ADD_TO_CART),
+            np.full(int(removed.sum()), REMOVE_FROM_CART),
+            np.full(n_checkouts, CHECKOUT),
+        ]
+    )
+    owner = np.concatenate(
+        [historic_owner, live_owner, pick_owner, pick_owner[removed], checkout_owner]
+    )
+    slot = np.concatenate(
+        [
+            historic_slot,
+            live_slot,
+            pick_slot,
+            pick_slot[removed] + 1,
+            checkout_slot,
+        ]
+    )
+    num_events = len(owner)
+
+    # a session starts on arrival and every live event comes an event gap after the
+    # one before, i.e. at the customer's running sum of gaps in slot order
+    live_events = np.lexsort((slot[n_historic_total:], owner[n_historic_total:]))
+    live_event_owner = owner[n_historic_total:][live_events]
+    n_live_events = len(live_events)
+    gaps = tables.event_gap_seconds.sample_array(rng, n_live_events) * US_PER_SECOND
+    gaps += rng.integers(0, US_PER_SECOND, n_live_events)
+    session_start = np.ones(n_live_events, dtype=bool)
+    session_start[1:] = live_event_owner[1:] != live_event_owner[:-1]
+    gaps[session_start] = 0
+    session_first = np.maximum.accumulate(
+        np.where(session_start, np.arange(n_live_events), 0)
+    )
+    elapsed = np.cumsum(gaps)
+    elapsed -= elapsed[session_first]
+    live_ts = np.empty(n_live_events, dtype=np.int64)
+    live_ts[live_events] = arrivals[live_event_owner] + elapsed
+    timestamp = np.concatenate([historic_ts, live_ts])
+    data_timestamp = timestamp.copy()
+    data_timestamp[num_events - n_checkouts :] += checkout_delay[checked_out]
+
+    browser = np.zeros(num_events, dtype=np.int64)
+    n_visits = n_historic_total + len(live_owner)
+    browser[:n_visits] = rng.integers(0, len(faux_utils.browsers), n_visits)
+    item = np.concatenate(
+        [
+            np.zeros(n_visits, dtype=np.int64),
+            items,
+            items[removed],
+            np.zeros(n_checkouts, dtype=np.int64),
+        ]
+    )
+    quantity = np.zeros(num_events, dtype=np.int64)
+    quantity[n_visits : n_visits + n_picks_total] = quantities
+    status = np.zeros(num_events, dtype=np.int64)
+    status[num_events - n_checkouts :] = statuses[checked_out]
+    order_id = np.zeros((num_events, 16), dtype=np.uint8)
+    order_id[num_events - n_checkouts :] = random_uuid_bytes(
+        rng, n_checkouts, data_timestamp[num_events - n_checkouts :], uuid_version
+    )
+
+    order = np.lexsort((slot, owner))
+    events = {
+        "id": random_uuid_bytes(rng, num_events, timestamp[order], uuid_version),
+        "timestamp": timestamp[order],
+        "customer": owner[order],
+        "event_type": event_type[order],
+        "data_timestamp": data_timestamp[order],
+        "browser": browser[order],
+        "item": item[order],
+        "quantity": quantity[order],
+        "status": status[order],
+        "order_id": order_id[order],
+    }
+
+    users = {"id": random_uuid_bytes(rng, n, arrivals, uuid_version), "timestamp": arrivals}
+    if identities is not None:
+        usernames, emails, locations = zip(*identities.identities(first_index, n, rng))
+        users.update(
+            username=list(usernames), email=list(emails), location=list(locations)
+        )
+    else:
+        fake = fake or faux_utils.get_faker()
+        users.update(
+            username=[fake.user_name() for _ in range(n)],
+            email=[fake.email() for _ in range(n)],
+            location=[fake.city() for _ in range(n)],
+        )
+    return CustomerBatch(users=users, events=events, product_ids=product_ids)
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+US_PER_MS = 1_000
+US_PER_SECOND = 1_000 * US_PER_MS
+US_PER_MINUTE = 60 * US_PER_SECOND
+US_PER_HOUR = 60 * US_PER_MINUTE
+US_PER_DAY = 24 * US_PER_HOUR
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch_us(moment: datetime) -> int:
+    """
+    Converts a naive UTC datetime to microseconds since the Unix epoch.
+    """
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def from_epoch_us(epoch_us: int) -> datetime:
+    """
+    Converts microseconds since the Unix epoch to a naive UTC datetime.
+    """
+    return _EPOCH + timedelta(microseconds=epoch_us)
+
+
+class SimClock:
+    """
+    The virtual clock of a simulated session.
+
+    The simulated time is kept in integer microseconds since the Unix epoch and
+    only moves when the simulation advances it, e.g. by the gap between two
+    events of a session, so a session of several minutes is generated in a
+    fraction of a millisecond and never reads the system clock. Datetimes are
+    only built when an event is written out, see `now`.
+
+    Attributes:
+        now_us (int): The simulated time in epoch microseconds.
+    """
+
+    __slots__ = ("now_us",)
+
+    def __init__(self, now_us: int):
+        self.now_us = now_us
+
+    @classmethod
+    def at(cls, moment: Optional[datetime] = None) -> "SimClock":
+        """
+        Returns a clock set to a naive UTC datetime, or to the current UTC time.
+        """
+        return cls(to_epoch_us(moment or datetime.utcnow()))
+
+    def advance(self, microseconds: int) -> int:
+        """
+        Moves the clock forward.
+
+        :param microseconds: The number of microseconds to move forward.
+        :return: The new simulated time in epoch microseconds.
+        """
+        self.now_us += microseconds
+        return self.now_us
+
+    def now(self) -> datetime:
+        """
+        Returns the simulated time as a naive UTC datetime.
+        """
+        return from_epoch_us(self.now_us)
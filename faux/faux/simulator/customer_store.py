@@ -0,0 +1,344 @@
+import logging
+import uuid
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Union
+
+import numpy as np
+
+from faux.simulator.batch import (
+    ADD_TO_CART,
+    CHECKOUT,
+    CHECKOUT_STATUSES,
+    REMOVE_FROM_CART,
+    Chunk,
+    CustomerBatch,
+    _to_uuid_strings,
+)
+
+logger = logging.getLogger(__name__)
+
+# The state a customer's last session ended in. The checkout states follow the
+# status of the last checkout.
+CUSTOMER_STATES = ("window_shopping", "abandoned_cart") + CHECKOUT_STATUSES
+WINDOW_SHOPPING, ABANDONED_CART = range(2)
+
+CUSTOMER_DTYPE = np.dtype(
+    [
+        ("id", np.uint8, 16),
+        ("created_at", np.int64),
+        ("last_session", np.int64),
+        ("state", np.uint8),
+        ("cart_size", np.uint16),
+    ]
+)
+
+
+def _state_code(state: Union[str, int]) -> int:
+    if isinstance(state, str):
+        if state not in CUSTOMER_STATES:
+            raise ValueError(f"Unsupported customer state: {state}")
+        return CUSTOMER_STATES.index(state)
+    return state
+
+
+def _session_state(events: list[dict[str, Any]]) -> tuple[int, int]:
+    """
+    Works out the state a session ended in from its events.
+
+    :param events: The events of a simulated customer.
+    :return: The state code and the number of items left in the cart.
+    """
+    cart_size = 0
+    status = None
+    for event in events:
+        event_type = event["event_type"]
+        if event_type == "add_to_cart":
+            cart_size += 1
+        elif event_type == "remove_from_cart":
+            cart_size -= 1
+        elif event_type == "checkout":
+            status = event["event_data"]["status"]
+    if status is not None:
+        return CUSTOMER_STATES.index(status), 0 if status == "success" else cart_size
+    return (ABANDONED_CART if cart_size else WINDOW_SHOPPING), cart_size
+
+
+class CustomerStore:
+    """
+    A compact store of the simulated customers and the state their last session
+    ended in, e.g. to pick the customers of a state that should come back.
+
+    The store only records customers, e.g. with `track` as they are generated.
+    The simulation itself always generates new customers and doesn't draw
+    returning ones from a store yet, so `sample` and `update` are for code that
+    brings stored customers back.
+
+    Customers are kept as one record per customer in a numpy array of
+    CUSTOMER_DTYPE (id, created_at and last_session in epoch microseconds, state
+    and cart_size), about 35 bytes per customer, and are addressed by their slot
+    in that array. The array can be saved to an .npy file and memory-mapped back,
+    so a store of millions of customers is opened without reading it.
+
+    Every state has its own contiguous range of `_order`, which lists the slots
+    grouped by state, so sampling customers of a state and moving a customer to
+    another state both take constant time.
+
+    Attributes:
+        records (np.ndarray): The records of the stored customers, indexed by slot.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._records = np.zeros(capacity, CUSTOMER_DTYPE)
+        self._size = 0
+        self._order = np.empty(0, np.int64)
+        self._position = np.empty(0, np.int64)
+        self._bounds = np.zeros(len(CUSTOMER_STATES) + 1, np.int64)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def records(self) -> np.ndarray:
+        return self._records[: self._size]
+
+    def _reserve(self, size: int) -> None:
+        if size <= len(self._records):
+            return
+        records = np.zeros(max(size, 2 * len(self._records)), CUSTOMER_DTYPE)
+        # a memory-mapped store is copied into memory from here on, see `save`
+        records[: self._size] = self.records
+        self._records = records
+
+    def _reindex(self) -> None:
+        if len(self._order) == self._size:
+            return
+        # a stable sort of one byte keys is a linear time radix sort
+        self._order = np.argsort(self.records["state"], kind="stable")
+        self._position = np.empty(self._size, np.int64)
+        self._position[self._order] = np.arange(self._size)
+        counts = np.bincount(self.records["state"], minlength=len(CUSTOMER_STATES))
+        self._bounds = np.concatenate([[0], np.cumsum(counts)])
+
+    def _swap(self, i: int, j: int) -> None:
+        a, b = self._order[i], self._order[j]
+        self._order[i], self._order[j] = b, a
+        self._position[a], self._position[b] = j, i
+
+    def _move(self, slot: int, state: int) -> None:
+        # shifts the slot across the group boundaries between its state and the new one
+        current = int(self._records["state"][slot])
+        for group in range(current, state):
+            self._swap(self._position[slot], self._bounds[group + 1] - 1)
+            self._bounds[group + 1] -= 1
+        for group in range(current, state, -1):
+            self._swap(self._position[slot], self._bounds[group])
+            self._bounds[group] += 1
+        self._records["state"][slot] = state
+
+    def add(
+        self,
+        ids: np.ndarray,
+        created_at: np.ndarray,
+        last_session: np.ndarray,
+        states: np.ndarray,
+        cart_sizes: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Adds new customers.
+
+        :param ids: The customer ids as a (n, 16) uint8 array.
+        :param created_at: The creation times in epoch microseconds.
+        :param last_session: The times of the last sessions in epoch microseconds.
+        :param states: The state codes, indexes into CUSTOMER_STATES.
+        :param cart_sizes: Optional numbers of items left in the carts. Defaults to 0.
+        :return: The slots of the new customers.
+        """
+        n = len(ids)
+        start = self._size
+        self._reserve(start + n)
+        added = self._records[start : start + n]
+        added["id"] = ids
+        added["created_at"] = created_at
+        added["last_session"] = last_session
+        added["state"] = states
+        added["cart_size"] = 0 if cart_sizes is None else cart_sizes
+        self._size += n
+        return np.arange(start, start + n)
+
+    def _add_batch(self, batch: CustomerBatch) -> np.ndarray:
+        n = len(batch)
+        events = batch.events
+        owner = events["customer"]
+        event_type = events["event_type"]
+        last_session = batch.users["timestamp"].copy()
+        np.maximum.at(last_session, owner, events["timestamp"])
+        cart_sizes = np.bincount(
+            owner, weights=event_type == ADD_TO_CART, minlength=n
+        ) - np.bincount(owner, weights=event_type == REMOVE_FROM_CART, minlength=n)
+        states = np.where(cart_sizes > 0, ABANDONED_CART, WINDOW_SHOPPING)
+        checkouts = np.flatnonzero(event_type == CHECKOUT)
+        # events are ordered by customer, so the last checkout of a customer wins
+        states[owner[checkouts]] = len(CUSTOMER_STATES) - len(CHECKOUT_STATUSES) + (
+            events["status"][checkouts]
+        )
+        succeeded = states == CUSTOMER_STATES.index("success")
+        cart_sizes[succeeded] = 0
+        return self.add(
+            batch.users["id"],
+            batch.users["timestamp"],
+            last_session,
+            states.astype(np.uint8),
+            cart_sizes.astype(np.int64).clip(0, np.iinfo(np.uint16).max),
+        )
+
+    def add_records(self, chunk: Chunk) -> np.ndarray:
+        """
+        Adds the customers of a simulated chunk, in the state their session ended in.
+
+        :param chunk: A list of dictionaries containing customer data and events,
+            as produced by `iter_simulation`, or a CustomerBatch.
+        :return: The slots of the new customers.
+        """
+        if isinstance(chunk, CustomerBatch):
+            return self._add_batch(chunk)
+        if not chunk:
+            return np.empty(0, np.int64)
+        ids = np.frombuffer(
+            b"".join(uuid.UUID(str(c["customer"]["id"])).bytes for c in chunk),
+            dtype=np.uint8,
+        ).reshape(-1, 16)
+        created_at = np.array(
+            [c["customer"]["timestamp"] for c in chunk], dtype="datetime64[us]"
+        )
+        last_session = np.array(
+            [
+                max(
+                    (event["timestamp"] for event in c["events"]),
+                    default=c["customer"]["timestamp"],
+                )
+                for c in chunk
+            ],
+            dtype="datetime64[us]",
+        )
+        states, cart_sizes = zip(*(_session_state(c["events"]) for c in chunk))
+        return self.add(
+            ids,
+            created_at.astype(np.int64),
+            last_session.astype(np.int64),
+            np.array(states, np.uint8),
+            np.array(cart_sizes, np.int64).clip(0, np.iinfo(np.uint16).max),
+        )
+
+    def track(self, chunks: Iterable[Chunk]) -> Iterator[Chunk]:
+        """
+        Adds the customers of every chunk as it passes through.
+
+        :param chunks: An iterable of chunks, e.g. the output of `iter_simulation`.
+        :return: An iterator over the same chunks.
+        """
+        for chunk in chunks:
+            self.add_records(chunk)
+            yield chunk
+
+    def update(
+        self,
+        slots: Iterable[int],
+        state: Union[str, int],
+        last_session: Optional[int] = None,
+        cart_size: int = 0,
+    ) -> None:
+        """
+        Records the outcome of a new session of existing customers.
+
+        :param slots: The slots of the customers.
+        :param state: The state the session ended in.
+        :param last_session: Optional time of the session in epoch microseconds.
+        :param cart_size: The number of items left in the carts.
+        """
+        self._reindex()
+        state = _state_code(state)
+        for slot in slots:
+            self._move(int(slot), state)
+            self._records["cart_size"][slot] = cart_size
+            if last_session is not None:
+                self._records["last_session"][slot] = last_session
+
+    def count(self, state: Union[str, int]) -> int:
+        """
+        Returns the number of customers in a state.
+        """
+        self._reindex()
+        state = _state_code(state)
+        return int(self._bounds[state + 1] - self._bounds[state])
+
+    def counts(self) -> dict[str, int]:
+        """
+        Returns the number of customers per state.
+        """
+        return {state: self.count(state) for state in CUSTOMER_STATES}
+
+    def sample(
+        self, state: Union[str, int], k: int, rng: np.random.Generator
+    ) -> np.ndarray:
+        """
+        Picks k customers in a state uniformly at random, with replacement.
+
+        :param state: The state, e.g. 'abandoned_cart' or 'success'.
+        :param k: The number of customers to pick.
+        :param rng: The numpy random generator to draw from.
+        :return: The slots of the picked customers.
+        """
+        self._reindex()
+        state = _state_code(state)
+        start, end = self._bounds[state], self._bounds[state + 1]
+        if start == end:
+            raise ValueError(f"No customers in state {CUSTOMER_STATES[state]}")
+        return self._order[rng.integers(start, end, k)]
+
+    def customer_ids(self, slots: np.ndarray) -> list[str]:
+        """
+        Returns the ids of customers as strings.
+
+        :param slots: The slots of the customers.
+        """
+        return _to_uuid_strings(self._records["id"][slots])
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Saves the records in the .npy format to a file that `load` can memory-map.
+
+        :param path: The path of the file, used as is. Unlike `np.save`, no .npy
+            suffix is appended.
+        """
+        records = self._records
+        if isinstance(records, np.memmap) and Path(records.filename) == Path(path).resolve():
+            # the store is still mapped onto the file, which already holds every update
+            records.flush()
+        else:
+            # np.save appends .npy to a path that doesn't end in it, but not to a file
+            with open(path, "wb") as file:
+                np.save(file, self.records)
+        logger.info(f"Saved {self._size} customers to {path}")
+
+    @classmethod
+    def load(
+        cls, path: Union[str, Path], mmap_mode: Optional[str] = "r+"
+    ) -> "CustomerStore":
+        """
+        Opens a store saved with `save`.
+
+        With the default mmap_mode, records are read from the file on demand and
+        updates are written straight to it. Adding customers copies the store into
+        memory, so `save` it again afterwards.
+
+        :param path: The path of the file.
+        :param mmap_mode: The numpy memory-map mode, or None to read the file into memory.
+        :return: The store.
+        """
+        records = np.load(path, mmap_mode=mmap_mode)
+        if records.dtype != CUSTOMER_DTYPE:
+            raise ValueError(f"{path} is not a customer store")
+        store = cls(capacity=0)
+        store._records = records
+        store._size = len(records)
+        return store
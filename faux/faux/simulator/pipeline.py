@@ -0,0 +1,182 @@
+import logging
+import queue
+import threading
+import time
+from typing import Iterable, Optional
+
+from faux.simulator.batch import Chunk, count_rows
+from faux.sinks.base import Sink
+
+logger = logging.getLogger(__name__)
+
+# Put on the queue once per writer to tell it that generation is done
+_DONE = object()
+
+
+class StageStats:
+    """
+    Throughput counters for one pipeline stage.
+
+    Attributes:
+        name (str): The name of the stage.
+        chunks (int): The number of chunks the stage processed.
+        rows (int): The number of user and event rows the stage processed.
+        busy (float): The total seconds the stage spent working, excluding waits on the queue.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.chunks = 0
+        self.rows = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, rows: int, seconds: float) -> None:
+        with self._lock:
+            self.chunks += 1
+            self.rows += rows
+            self.busy += seconds
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.busy if self.busy else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.chunks} chunks, {self.rows} rows in {self.busy:.2f}s "
+            f"({self.rows_per_second:,.0f} rows/s)"
+        )
+
+
+class PipelineStats:
+    """
+    Statistics of a pipeline run.
+
+    Attributes:
+        generate (StageStats): The generation stage.
+        write (StageStats): The sink stage, summed over all writers.
+        max_queue_depth (int): The deepest the queue got.
+        wall_time (float): The elapsed seconds of the whole run.
+    """
+
+    def __init__(self):
+        self.generate = StageStats("generate")
+        self.write = StageStats("write")
+        self.max_queue_depth = 0
+        self.wall_time = 0.0
+        self._depth_total = 0
+        self._depth_samples = 0
+
+    def sample_queue_depth(self, depth: int) -> None:
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self._depth_total += depth
+        self._depth_samples += 1
+
+    @property
+    def mean_queue_depth(self) -> float:
+        return self._depth_total / self._depth_samples if self._depth_samples else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.generate} | {self.write} | queue depth mean "
+            f"{self.mean_queue_depth:.1f}, max {self.max_queue_depth} | "
+            f"wall time {self.wall_time:.2f}s"
+        )
+
+
+def run_pipeline(
+    chunks: Iterable[Chunk],
+    sink: Sink,
+    writers: int = 1,
+    queue_size: int = 4,
+    report_interval: Optional[float] = None,
+) -> PipelineStats:
+    """
+    Streams chunks into a sink while the next chunks are being generated.
+
+    The chunks are pulled from `chunks` (e.g. `iter_simulation`) in the calling
+    thread and handed to `writers` threads through a queue of at most `queue_size`
+    chunks. When the sink falls behind the queue fills up and generation blocks,
+    so memory stays bounded, and generation and writing overlap so the wall time
+    approaches the slower of the two stages instead of their sum.
+
+    :param chunks: An iterable of chunks of customer and event data.
+    :param sink: The sink to write the chunks to. Must be thread safe when writers > 1.
+    :param writers: The number of writer threads.
+    :param queue_size: The maximum number of chunks waiting to be written.
+    :param report_interval: Optional number of seconds between progress log lines.
+    :return: The statistics of the run.
+    :raises ValueError: If several writers are requested for a sink that isn't thread safe.
+    """
+    if writers > 1 and not sink.thread_safe:
+        raise ValueError(f"{type(sink).__name__} doesn't support concurrent writers")
+
+    stats = PipelineStats()
+    chunk_queue = queue.Queue(maxsize=queue_size)
+    failed = threading.Event()
+    errors = []
+
+    def write_chunks():
+        while True:
+            chunk = chunk_queue.get()
+            if chunk is _DONE:
+                return
+            if failed.is_set():
+                continue
+            try:
+                started = time.perf_counter()
+                sink.write(chunk)
+                stats.write.add(count_rows(chunk), time.perf_counter() - started)
+            except Exception as e:
+                errors.append(e)
+                failed.set()
+
+    def put(item):
+        # Blocks while the queue is full, but gives up as soon as a writer failed
+        while not failed.is_set():
+            try:
+                chunk_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    threads = [
+        threading.Thread(target=write_chunks, name=f"faux-writer-{i}", daemon=True)
+        for i in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    started = last_report = time.perf_counter()
+    try:
+        iterator = iter(chunks)
+        while not failed.is_set():
+            generate_started = time.perf_counter()
+            chunk = next(iterator, _DONE)
+            if chunk is _DONE:
+                break
+            stats.generate.add(count_rows(chunk), time.perf_counter() - generate_started)
+            stats.sample_queue_depth(chunk_queue.qsize())
+            put(chunk)
+
+            if report_interval and time.perf_counter() - last_report >= report_interval:
+                last_report = time.perf_counter()
+                stats.wall_time = last_report - started
+                logger.info(stats.summary())
+    finally:
+        # Writers drain what is left before they see the end markers
+        for _ in threads:
+            while True:
+                try:
+                    chunk_queue.put(_DONE, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+        for thread in threads:
+            thread.join()
+        stats.wall_time = time.perf_counter() - started
+
+    if errors:
+        raise errors[0]
+    logger.info(stats.summary())
+    return stats
@@ -0,0 +1,223 @@
+import bisect
+import dataclasses
+import json
+import random
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Hashable, Mapping, NamedTuple, Sequence, Union
+
+import numpy as np
+
+from faux.core import faux_utils
+
+CHECKOUT_STATUSES = ("success", "failed", "cancelled")
+
+
+def _uniform(low: int, high: int) -> dict[int, float]:
+    return {value: 1.0 for value in range(low, high + 1)}
+
+
+class Distribution:
+    """
+    A discrete distribution compiled into a cumulative lookup table.
+
+    Drawing a value is a single uniform draw and a binary search over the
+    table, for one value with a `random.Random` or for a whole array of values
+    with a numpy generator.
+
+    Attributes:
+        values (tuple): The values, in the order they were given.
+        cumulative (tuple[float, ...]): The cumulative probability up to and
+            including every value.
+    """
+
+    def __init__(self, values: Sequence[Hashable], weights: Sequence[float]):
+        if not values or len(values) != len(weights):
+            raise ValueError("A distribution needs one weight for every value")
+        if any(weight < 0 for weight in weights):
+            raise ValueError(f"Weights can't be negative: {list(weights)}")
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("At least one weight must be positive")
+
+        self.values = tuple(values)
+        self.cumulative = tuple(np.cumsum(weights) / total)
+        self._values = np.asarray(self.values)
+        # rounding can leave the last cumulative probability just below 1
+        self._last = max(i for i, weight in enumerate(weights) if weight > 0)
+
+    @classmethod
+    def from_weights(cls, weights: Mapping[Hashable, float]) -> "Distribution":
+        return cls(list(weights), list(weights.values()))
+
+    @classmethod
+    def bernoulli(cls, probability: float) -> "Distribution":
+        """
+        Returns the distribution of a single yes/no decision.
+        """
+        if not 0 <= probability <= 1:
+            raise ValueError(f"Probability must be between 0 and 1: {probability}")
+        return cls((False, True), (1 - probability, probability))
+
+    def sample(self, rng: random.Random = random) -> Any:
+        index = bisect.bisect_right(self.cumulative, rng.random())
+        return self.values[min(index, self._last)]
+
+    def sample_indexes(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        indexes = np.searchsorted(self.cumulative, rng.random(size), side="right")
+        return np.minimum(indexes, self._last)
+
+    def sample_array(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return self._values[self.sample_indexes(rng, size)]
+
+
+class CompiledScenario(NamedTuple):
+    """
+    The lookup tables of a Scenario, see `Scenario.compiled`.
+    """
+
+    history: Distribution
+    historic_visits: Distribution
+    visits: Distribution
+    picks: Distribution
+    quantities: Distribution
+    remove: Distribution
+    checkout_statuses: Distribution
+    abandon: Distribution
+    checkout_delay_minutes: Distribution
+    event_gap_seconds: Distribution
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """
+    The probabilities of a shopping session.
+
+    A session moves through visit -> browse -> add/remove -> checkout/abandon:
+    a customer with a past (`history_probability`) first gets some historic
+    visits, then visits the shop a number of times, browses and picks distinct
+    products, adds each of them to the cart and possibly removes it again, and
+    checks out if anything is left in the cart, unless the cart is abandoned.
+    The events of a session follow each other `event_gap_seconds` apart.
+
+    Counts are given as weights per count (e.g. `{1: 1, 2: 1}` for one or two
+    visits with equal chance) and checkout statuses as weights per status. The
+    defaults are the historic hard-coded behaviour of the simulator. Scenarios
+    can be loaded from JSON files, see `load`, so new funnels don't need code
+    changes.
+
+    Attributes:
+        history_probability (float): The chance a customer has historic visits.
+        historic_visits (Mapping[int, float]): The weights of the number of historic visits.
+        visits (Mapping[int, float]): The weights of the number of live visits.
+        picks (Mapping[int, float]): The weights of the number of products picked.
+        quantities (Mapping[int, float]): The weights of the quantity added to the cart.
+        remove_probability (float): The chance a product is removed from the cart again.
+        checkout_statuses (Mapping[str, float]): The weights of the checkout statuses.
+        abandon_probability (float): The chance a cart that isn't empty is abandoned.
+        checkout_delay_minutes (Mapping[int, float]): The weights of the minutes
+            between the checkout event and the checkout.
+        event_gap_seconds (Mapping[int, float]): The weights of the whole seconds
+            between two events of a session, each followed by a random fraction
+            of a second.
+    """
+
+    history_probability: float = 0.5
+    historic_visits: Mapping[int, float] = field(default_factory=lambda: _uniform(1, 5))
+    visits: Mapping[int, float] = field(default_factory=lambda: _uniform(1, 5))
+    picks: Mapping[int, float] = field(default_factory=lambda: _uniform(1, 12))
+    quantities: Mapping[int, float] = field(
+        default_factory=lambda: _uniform(faux_utils.qty_min, faux_utils.qty_max)
+    )
+    remove_probability: float = 0.5
+    checkout_statuses: Mapping[str, float] = field(
+        default_factory=lambda: {status: 1.0 for status in CHECKOUT_STATUSES}
+    )
+    abandon_probability: float = 0.5
+    checkout_delay_minutes: Mapping[int, float] = field(
+        default_factory=lambda: _uniform(3, 17)
+    )
+    event_gap_seconds: Mapping[int, float] = field(default_factory=lambda: _uniform(5, 90))
+
+    def __post_init__(self):
+        # compiling validates the scenario up front
+        self.compiled
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "Scenario":
+        """
+        Builds a scenario from a dictionary, e.g. parsed JSON. Fields that are
+        left out keep their defaults and count keys may be strings.
+
+        :param data: The fields of the scenario.
+        :return: The scenario.
+        """
+        names = {f.name for f in dataclasses.fields(cls)}
+        unknown = set(data) - names
+        if unknown:
+            raise ValueError(f"Unknown scenario fields: {sorted(unknown)}")
+        counts = {
+            "historic_visits",
+            "visits",
+            "picks",
+            "quantities",
+            "checkout_delay_minutes",
+            "event_gap_seconds",
+        }
+        return cls(
+            **{
+                name: (
+                    {int(count): weight for count, weight in value.items()}
+                    if name in counts
+                    else value
+                )
+                for name, value in data.items()
+            }
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Scenario":
+        """
+        Loads a scenario from a JSON file, see `from_dict`.
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    @cached_property
+    def compiled(self) -> CompiledScenario:
+        """
+        The scenario compiled into lookup tables. It is compiled on first use
+        and then kept with the scenario.
+
+        :raises ValueError: If a probability or weight is invalid.
+        """
+        unknown = set(self.checkout_statuses) - set(CHECKOUT_STATUSES)
+        if unknown:
+            raise ValueError(f"Unsupported checkout statuses: {sorted(unknown)}")
+        if min(self.visits) < 1 or min(self.quantities) < 1:
+            raise ValueError("Visits and quantities must be at least 1")
+        if min(self.picks) < 0 or min(self.historic_visits) < 0:
+            raise ValueError("Counts can't be negative")
+        if min(self.checkout_delay_minutes) < 0 or min(self.event_gap_seconds) < 1:
+            # a gap of at least a second keeps the events of a session strictly ordered
+            raise ValueError("Checkout delays can't be negative and event gaps must be at least 1")
+        return CompiledScenario(
+            history=Distribution.bernoulli(self.history_probability),
+            historic_visits=Distribution.from_weights(self.historic_visits),
+            visits=Distribution.from_weights(self.visits),
+            picks=Distribution.from_weights(self.picks),
+            quantities=Distribution.from_weights(self.quantities),
+            remove=Distribution.bernoulli(self.remove_probability),
+            # in CHECKOUT_STATUSES order, so indexes double as status codes
+            checkout_statuses=Distribution(
+                CHECKOUT_STATUSES,
+                [self.checkout_statuses.get(status, 0.0) for status in CHECKOUT_STATUSES],
+            ),
+            abandon=Distribution.bernoulli(self.abandon_probability),
+            checkout_delay_minutes=Distribution.from_weights(self.checkout_delay_minutes),
+            event_gap_seconds=Distribution.from_weights(self.event_gap_seconds),
+        )
+
+
+DEFAULT_SCENARIO = Scenario()
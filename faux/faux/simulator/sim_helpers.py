@@ -5,14 +5,29 @@ import uuid
 
 
 def generate_timestamps(
-    base_timestamp: datetime, iso: bool = True, seed: Optional[int] = None
+    base_timestamp: datetime,
+    iso: bool = True,
+    seed: Optional[int] = None,
+    rng: random.Random = random,
+    num_timestamps: Optional[int] = None,
 ) -> list[Union[datetime, str]]:
+    """
+    Generates 1 to 5 random timestamps up to 10 days before a base timestamp.
+
+    :param base_timestamp: The timestamp to go back from.
+    :param iso: Whether to return the timestamps in ISO 8601 string format. Defaults to True.
+    :param seed: Optional seed for the random number generator to ensure reproducibility.
+    :param rng: The random number generator to draw from. Defaults to the global `random` module.
+    :param num_timestamps: Optional number of timestamps to generate instead of 1 to 5.
+    :return: A list of timestamps as datetime objects or ISO 8601 strings.
+    """
 
     if seed is not None:
-        random.seed(seed)
+        rng.seed(seed)
 
     # Define the maximum number of timestamps to generate (between 1 and 5)
-    num_timestamps = random.randint(1, 5)
+    if num_timestamps is None:
+        num_timestamps = rng.randint(1, 5)
 
     # Define the maximum number of days, hours, minutes, and seconds to go back
     max_days_before = 10
@@ -26,11 +41,11 @@ def generate_timestamps(
     # Generate random timestamps
     for _ in range(num_timestamps):
         # Generate random components for days, hours, minutes, and seconds
-        days_before = random.randint(1, max_days_before)
-        hours_before = random.randint(0, max_hours_before)
-        minutes_before = random.randint(0, max_minutes_before)
-        seconds_before = random.randint(0, max_seconds_before)
-        microseconds_before = random.randint(0, 999999)
+        days_before = rng.randint(1, max_days_before)
+        hours_before = rng.randint(0, max_hours_before)
+        minutes_before = rng.randint(0, max_minutes_before)
+        seconds_before = rng.randint(0, max_seconds_before)
+        microseconds_before = rng.randint(0, 999999)
 
         # Calculate the new timestamp
         new_timestamp = base_timestamp - timedelta(
@@ -49,21 +64,24 @@ def generate_timestamps(
     return timestamps
 
 
-def add_random_minutes(timestamp, iso=True, seed: Optional[int] = None):
+def add_random_minutes(
+    timestamp, iso=True, seed: Optional[int] = None, rng: random.Random = random
+):
     """
     Adds a random number of minutes (between 3 and 17) to a given timestamp.
 
     :param timestamp: The original timestamp to which random minutes will be added.
     :param iso: Whether to return the new timestamp in ISO 8601 string format. Defaults to True.
     :param seed: Optional seed for the random number generator to ensure reproducibility.
+    :param rng: The random number generator to draw from. Defaults to the global `random` module.
     :return: The new timestamp as a datetime object or ISO 8601 string.
     """
 
     if seed is not None:
-        random.seed(seed)
+        rng.seed(seed)
 
     # Generate a random number of minutes to add (between 3 and 17)
-    minutes_to_add = random.randint(3, 17)
+    minutes_to_add = rng.randint(3, 17)
 
     # Create a timedelta object with the random duration
     duration = timedelta(minutes=minutes_to_add)
@@ -111,12 +129,12 @@ def _to_timestamp(timestamp_str: str, format: Optional[str] = None) -> datetime:
 
 def _generate_new_timestamp(iso=True):
     """
-    Generates a new current timestamp.
+    Generates a new current UTC timestamp, like every other timestamp of the simulation.
 
     :param iso: Whether to return the timestamp in ISO 8601 string format. Defaults to True.
     :return: The current timestamp as a datetime object or ISO 8601 string.
     """
 
     if iso:
-        return datetime.now().isoformat()
-    return datetime.now()
+        return datetime.utcnow().isoformat()
+    return datetime.utcnow()
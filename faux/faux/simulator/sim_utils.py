@@ -1,29 +1,90 @@
-import random
+from collections import Counter, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime
+from itertools import chain, repeat
 import logging
-from typing import Any, Optional, Union
+import random
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
 from faux.core import faux_utils
+from faux.core.identity import IdentityPool
+from faux.core.metrics import Metrics, metrics
 from faux.simulator.sim_helpers import (
     _to_timestamp,
     _to_uuid,
     generate_timestamps,
-    _generate_new_timestamp,
-    add_random_minutes,
 )
-from database.db_utils import get_product_ids, write_to_sink
+from faux.simulator.batch import EVENT_TYPES, Chunk, generate_customer_batch
+from faux.simulator.clock import (
+    US_PER_DAY,
+    US_PER_HOUR,
+    US_PER_MINUTE,
+    US_PER_SECOND,
+    SimClock,
+    from_epoch_us,
+)
+from faux.simulator.scenario import DEFAULT_SCENARIO, CompiledScenario, Scenario
+from faux.simulator.streams import (
+    RandomStreams,
+    block_seed_sequences,
+    default_streams,
+)
+from faux.database.catalog import ProductCatalog
+import numpy as np
 import uuid
 
 logger = logging.getLogger(__name__)
 
 
-def generate_new_users(num_users: int = 100) -> dict[str, Any]:
+def _shared_catalog() -> ProductCatalog:
+    # imported on demand, so simulating against an explicit catalog (e.g. to write
+    # files) never loads the database layer
+    from faux.database.db_utils import product_catalog
+
+    return product_catalog
+
+
+def generate_new_users(
+    num_users: int = 100,
+    streams: Optional[RandomStreams] = None,
+    created_at: Optional[datetime] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
+    identities: Optional[IdentityPool] = None,
+    first_index: int = 0,
+    dump_mode: str = "json",
+) -> dict[str, Any]:
     """
     Generates a specified number of new users.
 
     :param num_users: The number of users to generate. Defaults to 100.
+    :param streams: Optional random streams to draw from. Defaults to the global generators.
+    :param created_at: Optional creation timestamp. If not provided, the current time is used.
+    :param trusted: Skip model validation for the generated payloads.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :param identities: Optional identity pool to compose the users' details from
+        instead of calling Faker for every user.
+    :param first_index: The simulation index of the first user, which keeps
+        identities from the pool unique.
+    :param dump_mode: The mode to dump the payloads, 'json' or 'python'.
     :return: A list of dictionaries representing the generated users.
     """
-    return [faux_utils.generate_customer() for i in range(num_users)]
+    streams = streams or default_streams
+    return [
+        faux_utils.generate_customer(
+            faker=streams.fake,
+            customer_id=streams.new_id(created_at),
+            ts=created_at,
+            trusted=trusted,
+            validate_sample_rate=validate_sample_rate,
+            dump_mode=dump_mode,
+            identity=(
+                identities.identity(first_index + i, rng=streams.random)
+                if identities is not None
+                else None
+            ),
+        )
+        for i in range(num_users)
+    ]
 
 
 # TODO: create a custom type for common union types in project. e.g. T_UUID_STR = str | uuid
@@ -31,27 +92,46 @@ def generate_new_users(num_users: int = 100) -> dict[str, Any]:
 def generate_visit(
     customer_id: Union[str, uuid.UUID],
     timestamp_str: Optional[Union[str, uuid.UUID]] = None,
+    streams: Optional[RandomStreams] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
+    dump_mode: str = "json",
 ) -> dict[str, Any]:
     """
     Generates a visit event for a given customer.
 
     :param customer_id: The unique identifier of the customer.
     :param timestamp_str: Optional timestamp for the event. If not provided, the current time is used.
-    :param seed: Optional seed for the random number generator to ensure reproducibility.
+    :param streams: Optional random streams to draw from. Defaults to the global generators.
+    :param trusted: Skip model validation for the generated payloads.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :param dump_mode: The mode to dump the payloads, 'json' or 'python'.
     :return: A dictionary representing the generated visit event.
     """
-    logger.info(f"Generating visit event for customer_id: {customer_id}")
+    logger.debug("Generating visit event for customer_id: %s", customer_id)
+    streams = streams or default_streams
     if timestamp_str:
         timestamp = _to_timestamp(timestamp_str)
     else:
         timestamp = None
     return faux_utils.generate_visit_event(
-        customer_id=_to_uuid(customer_id), ts=timestamp
+        customer_id=_to_uuid(customer_id),
+        ts=timestamp,
+        rng=streams.random,
+        event_id=streams.new_id(timestamp),
+        trusted=trusted,
+        validate_sample_rate=validate_sample_rate,
+        dump_mode=dump_mode,
     )
 
 
 def generate_historic_visits(
-    customer_id: Union[str, uuid.UUID], base_ts: datetime, seed: Optional[int] = None
+    customer_id: Union[str, uuid.UUID],
+    base_ts: datetime,
+    seed: Optional[int] = None,
+    streams: Optional[RandomStreams] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
 ) -> dict[str, Any]:
     """
     Generates historic visit events for a given customer based on a base timestamp.
@@ -59,22 +139,32 @@ def generate_historic_visits(
     :param customer_id: The unique identifier of the customer.
     :param base_ts: The base timestamp for generating historic visits.
     :param seed: Optional seed for the random number generator to ensure reproducibility.
+    :param streams: Optional random streams to draw from. Defaults to the global generators.
+    :param trusted: Skip model validation for the generated payloads.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
     :return: A list of dictionaries representing the generated visit events.
     """
-    logger.info(f"Generating historic visits for customer_id: {customer_id}")
+    logger.debug("Generating historic visits for customer_id: %s", customer_id)
+    streams = streams or default_streams
     if seed is not None:
-        random.seed(seed)
+        streams.random.seed(seed)
 
     # TODO: move hardcoded values into config variables
-    if random.choice([0, 1]) > 0:
-        ts_array = generate_timestamps(base_ts)
+    if streams.random.choice([0, 1]) > 0:
+        ts_array = generate_timestamps(base_ts, rng=streams.random)
         visits = [
-            generate_visit(customer_id=customer_id, timestamp_str=visit_date)
+            generate_visit(
+                customer_id=customer_id,
+                timestamp_str=visit_date,
+                streams=streams,
+                trusted=trusted,
+                validate_sample_rate=validate_sample_rate,
+            )
             for visit_date in ts_array
         ]
-        logger.info(f"Generated {len(visits)} historic visits")
+        logger.debug("Generated %d historic visits", len(visits))
         return visits
-    logger.info("No historic visits generated")
+    logger.debug("No historic visits generated")
     return []
 
 
@@ -82,47 +172,85 @@ def generate_add_to_cart(
     customer_id: Union[str, uuid.UUID],
     item_id: Union[str, uuid.UUID],
     seed: Optional[int] = None,
+    streams: Optional[RandomStreams] = None,
+    timestamp: Optional[datetime] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
+    quantity: Optional[int] = None,
+    dump_mode: str = "json",
 ) -> dict[str, Any]:
-    # TODO: move hardcoded values into config variables
     """
     Generates an add-to-cart event for a given customer and item.
 
     :param customer_id: The unique identifier of the customer.
     :param item_id: The unique identifier of the item.
     :param seed: Optional seed for the random number generator to ensure reproducibility.
+    :param streams: Optional random streams to draw from. Defaults to the global generators.
+    :param timestamp: Optional timestamp for the event. If not provided, the current time is used.
+    :param trusted: Skip model validation for the generated payloads.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :param quantity: Optional quantity added to the cart. Defaults to a random 1 to 5.
+    :param dump_mode: The mode to dump the payloads, 'json' or 'python'.
     :return: A dictionary representing the generated add-to-cart event.
     """
-    logger.info(
-        f"Generating add_to_cart event for customer_id: {customer_id}, item_id: {item_id}"
+    logger.debug(
+        "Generating add_to_cart event for customer_id: %s, item_id: %s",
+        customer_id,
+        item_id,
     )
+    streams = streams or default_streams
     if seed is not None:
-        random.seed(seed)
+        streams.random.seed(seed)
 
     return faux_utils.generate_cart_update_event(
         customer_id=_to_uuid(customer_id),
         item_id=_to_uuid(item_id),
         event_type="add_to_cart",
-        qty=random.randint(1, 5),
+        qty=quantity if quantity is not None else streams.random.randint(1, 5),
+        ts=timestamp,
+        event_id=streams.new_id(timestamp),
+        trusted=trusted,
+        validate_sample_rate=validate_sample_rate,
+        dump_mode=dump_mode,
     )
 
 
 def generate_remove_from_cart(
-    customer_id: Union[str, uuid.UUID], item_id: Union[str, uuid.UUID]
+    customer_id: Union[str, uuid.UUID],
+    item_id: Union[str, uuid.UUID],
+    streams: Optional[RandomStreams] = None,
+    timestamp: Optional[datetime] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
+    dump_mode: str = "json",
 ) -> dict[str, Any]:
     """
     Generates a remove-from-cart event for a given customer and item.
 
     :param customer_id: The unique identifier of the customer.
     :param item_id: The unique identifier of the item.
+    :param streams: Optional random streams to draw from. Defaults to the global generators.
+    :param timestamp: Optional timestamp for the event. If not provided, the current time is used.
+    :param trusted: Skip model validation for the generated payloads.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :param dump_mode: The mode to dump the payloads, 'json' or 'python'.
     :return: A dictionary representing the generated remove-from-cart event.
     """
-    logger.info(
-        f"Generating remove_from_cart event for customer_id: {customer_id}, item_id: {item_id}"
+    logger.debug(
+        "Generating remove_from_cart event for customer_id: %s, item_id: %s",
+        customer_id,
+        item_id,
     )
+    streams = streams or default_streams
     return faux_utils.generate_cart_update_event(
         customer_id=_to_uuid(customer_id),
         item_id=_to_uuid(item_id),
         event_type="remove_from_cart",
+        ts=timestamp,
+        event_id=streams.new_id(timestamp),
+        trusted=trusted,
+        validate_sample_rate=validate_sample_rate,
+        dump_mode=dump_mode,
     )
 
 
@@ -131,6 +259,11 @@ def generate_checkout(
     order_id: Union[str, uuid.UUID],
     status: str,
     checked_out_at: Union[str, datetime],
+    streams: Optional[RandomStreams] = None,
+    timestamp: Optional[datetime] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
+    dump_mode: str = "json",
 ) -> dict[str, Any]:
     """
     Generates a checkout event for a given customer.
@@ -139,139 +272,581 @@ def generate_checkout(
     :param order_id: The unique identifier of the order.
     :param status: The status of the checkout ('success', 'failed', 'cancelled').
     :param checked_out_at: The timestamp when the checkout occurred.
+    :param streams: Optional random streams to draw from. Defaults to the global generators.
+    :param timestamp: Optional timestamp for the event. If not provided, the current time is used.
+    :param trusted: Skip model validation for the generated payloads.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :param dump_mode: The mode to dump the payloads, 'json' or 'python'.
     :return: A dictionary representing the generated checkout event.
     """
-    logger.info(
-        f"Generating checkout event for customer_id: {customer_id}, order_id: {order_id}, status: {status}"
+    logger.debug(
+        "Generating checkout event for customer_id: %s, order_id: %s, status: %s",
+        customer_id,
+        order_id,
+        status,
     )
+    streams = streams or default_streams
     return faux_utils.generate_checkout_event(
         customer_id=_to_uuid(customer_id),
         order_id=_to_uuid(order_id),
         checked_out_at=checked_out_at,
         status=status,
+        ts=timestamp,
+        event_id=streams.new_id(timestamp),
+        trusted=trusted,
+        validate_sample_rate=validate_sample_rate,
+        dump_mode=dump_mode,
     )
 
 
-def generate_customer_data():
+# The states of a shopping session, see `Scenario`
+VISIT, BROWSE, ADD_TO_CART, REMOVE_FROM_CART, CHECKOUT, END = range(6)
+
+
+def _event_gap_us(tables: CompiledScenario, rng: random.Random) -> int:
+    # whole seconds from the scenario and a random fraction of a second
+    return tables.event_gap_seconds.sample(rng) * US_PER_SECOND + rng.randrange(US_PER_SECOND)
+
+
+def _historic_visit_us(rng: random.Random) -> int:
+    # how long before the arrival a historic visit was: 1 to 10 days and a random
+    # time of day, drawn in the order `generate_timestamps` draws them
+    return (
+        rng.randint(1, 10) * US_PER_DAY
+        + rng.randint(0, 23) * US_PER_HOUR
+        + rng.randint(0, 59) * US_PER_MINUTE
+        + rng.randint(0, 59) * US_PER_SECOND
+        + rng.randint(0, US_PER_SECOND - 1)
+    )
+
+
+def generate_customer_data(
+    streams: Optional[RandomStreams] = None,
+    now: Optional[datetime] = None,
+    catalog: Optional[ProductCatalog] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
+    identities: Optional[IdentityPool] = None,
+    customer_index: int = 0,
+    scenario: Optional[Scenario] = None,
+    clock: Optional[SimClock] = None,
+    dump_mode: str = "json",
+):
     """
     Generates customer data including visit, add-to-cart, remove-from-cart, and checkout events.
 
-    :param seed: Optional seed for the random number generator to ensure reproducibility.
+    The shopping session runs as a state machine, visit -> browse -> add/remove ->
+    checkout/abandon, whose every decision is drawn from the scenario's compiled
+    tables. The events are generated in a single pass and the cart is kept up to
+    date as items are added and removed. The customer arrives at the time of the
+    session's clock, which moves forward by the scenario's event gap after every
+    event, so the events are strictly ordered in time.
+
+    :param streams: Optional random streams to draw from. Defaults to the global generators.
+    :param now: Optional simulated arrival time, used when no clock is passed.
+        Defaults to the current UTC time.
+    :param catalog: Optional product catalog to pick cart items from. Defaults to
+        the shared catalog loaded from the database.
+    :param trusted: Skip model validation for the generated payloads.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :param identities: Optional identity pool to compose the customer's details from.
+    :param customer_index: The customer's index in the simulation, which keeps
+        identities from the pool unique.
+    :param scenario: Optional probabilities of the shopping session. Defaults to
+        DEFAULT_SCENARIO.
+    :param clock: Optional clock of the session, set to the arrival time.
+    :param dump_mode: The mode to dump the payloads. 'json' writes ids and timestamps
+        as strings, 'python' as UUIDs and datetimes.
     :return: A dictionary containing customer data and events.
     """
-    # Generate visit event
-    # the simulation here should let me generate 0 - 5 previous visits for the customer
-    # generate a timestamp
-    # randomly go back up to a time stamp up to 10 days in the past
-    # not all customers must have historic visits
+    streams = streams or default_streams
+    clock = clock or SimClock.at(now)
+    catalog = catalog or _shared_catalog()
+    tables = (scenario or DEFAULT_SCENARIO).compiled
+    rng = streams.random
+    payload_options = {
+        "trusted": trusted,
+        "validate_sample_rate": validate_sample_rate,
+        "dump_mode": dump_mode,
+    }
 
     # in the future I should pick between new or existing customer
-    customer = generate_new_users(num_users=1)[0]
+    arrived_at = clock.now()
+    customer = generate_new_users(
+        num_users=1,
+        streams=streams,
+        created_at=arrived_at,
+        identities=identities,
+        first_index=customer_index,
+        **payload_options,
+    )[0]
     customer_id = customer["id"]
-    customer_data = {"customer": customer}
+    events = []
 
-    # a potential issue here is that hsitoric events can go as far back as 10 days before the base timestamp
+    # a potential issue here is that historic events can go as far back as 10 days before the base timestamp
     # customers created_at has to always be at least 11 days from current timestamp
-    customer_data["events"] = generate_historic_visits(
-        customer_id=customer_id, base_ts=_generate_new_timestamp(iso=False)
-    )
+    if tables.history.sample(rng):
+        # the times are all drawn before the visits
+        visits_us = [
+            clock.now_us - _historic_visit_us(rng)
+            for _ in range(tables.historic_visits.sample(rng))
+        ]
+        for visit_us in visits_us:
+            events.append(
+                generate_visit(
+                    customer_id=customer_id,
+                    timestamp_str=from_epoch_us(visit_us),
+                    streams=streams,
+                    **payload_options,
+                )
+            )
 
-    # Simulate sequential events
-    for _ in range(random.randint(1, 5)):  # Random number of visits
-        visit_event = generate_visit(customer_id=customer_id)
-        customer_data["events"].append(visit_event)
-
-    # need a function to pick K random products from the product table
-    num_picks = random.randint(1, 12)
-    item_ids = get_product_ids(num_ids=num_picks)
-    for item_id in item_ids:
-        customer_data["events"].append(
-            generate_add_to_cart(
-                customer_id=_to_uuid(customer_id), item_id=_to_uuid(item_id)
+    cart = {}  # the quantity of every item in the cart
+    visits_left = tables.visits.sample(rng)
+    picks = iter(())
+    item_id = None
+    state = VISIT
+    while state != END:
+        if state == VISIT:
+            events.append(
+                generate_visit(
+                    customer_id=customer_id,
+                    timestamp_str=clock.now(),
+                    streams=streams,
+                    **payload_options,
+                )
             )
-        )
+            clock.advance(_event_gap_us(tables, rng))
+            visits_left -= 1
+            state = VISIT if visits_left else BROWSE
+
+        elif state == BROWSE:
+            picks = iter(catalog.sample(tables.picks.sample(rng), rng=rng))
+            state = ADD_TO_CART
+
+        elif state == ADD_TO_CART:
+            item_id = next(picks, None)
+            if item_id is None:
+                state = CHECKOUT
+                continue
+            quantity = tables.quantities.sample(rng)
+            events.append(
+                generate_add_to_cart(
+                    customer_id=_to_uuid(customer_id),
+                    item_id=_to_uuid(item_id),
+                    streams=streams,
+                    timestamp=clock.now(),
+                    quantity=quantity,
+                    **payload_options,
+                )
+            )
+            clock.advance(_event_gap_us(tables, rng))
+            cart[item_id] = quantity
+            state = REMOVE_FROM_CART if tables.remove.sample(rng) else ADD_TO_CART
 
-        if random.choice(
-            [True, False]
-        ):  # Simulate remove_from_cart only if add_to_cart occurred
-            # print("removing from cart...")
-            customer_data["events"].append(
+        elif state == REMOVE_FROM_CART:
+            events.append(
                 generate_remove_from_cart(
-                    customer_id=_to_uuid(customer_id), item_id=_to_uuid(item_id)
+                    customer_id=_to_uuid(customer_id),
+                    item_id=_to_uuid(item_id),
+                    streams=streams,
+                    timestamp=clock.now(),
+                    **payload_options,
                 )
             )
+            clock.advance(_event_gap_us(tables, rng))
+            del cart[item_id]
+            state = ADD_TO_CART
+
+        elif state == CHECKOUT:
+            # you can't checkout with an empty cart, and abandoned carts never check out
+            if cart and not tables.abandon.sample(rng):
+                # An order is only created at the point of checkout. Its id is drawn
+                # first but stamped with the checkout time
+                order_bits = rng.getrandbits(128)
+                status = tables.checkout_statuses.sample(rng)
+                checked_out_at = from_epoch_us(
+                    clock.now_us + tables.checkout_delay_minutes.sample(rng) * US_PER_MINUTE
+                )
+                events.append(
+                    generate_checkout(
+                        customer_id=customer_id,
+                        order_id=streams.new_id(checked_out_at, bits=order_bits),
+                        status=status,
+                        checked_out_at=checked_out_at,
+                        streams=streams,
+                        timestamp=clock.now(),
+                        **payload_options,
+                    )
+                )
+            state = END
+
+    logger.debug("Customer data generated")
+    return {"customer": customer, "events": events}
+
+
+def _simulate_block(
+    size: int,
+    seed_sequence: np.random.SeedSequence,
+    now: datetime,
+    catalog: ProductCatalog,
+    mode: str,
+    trusted: bool,
+    validate_sample_rate: float,
+    first_index: int = 0,
+    identities: Optional[IdentityPool] = None,
+    window: Optional[tuple[datetime, datetime]] = None,
+    compact: bool = False,
+    scenario: Optional[Scenario] = None,
+    keep: Optional[tuple[int, int]] = None,
+    dump_mode: str = "json",
+) -> tuple[Chunk, Metrics]:
+    """
+    Generates one block of customers with its own random streams.
+
+    This runs inside the worker processes, so everything it needs is passed in and
+    the block's metrics are returned alongside its records.
+
+    A block always draws the same customers from its streams, `keep` only trims
+    the block down to the customers a shard or an index range covers.
+
+    :param size: The number of customers in the block.
+    :param seed_sequence: The seed sequence the block's random streams are derived from.
+    :param now: The simulated current time shared by every block.
+    :param catalog: The product catalog to pick cart items from.
+    :param mode: The generation engine, 'scalar' or 'batch'.
+    :param trusted: Skip model validation for the generated payloads. Batch payloads
+        are always built without validation.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :param first_index: The simulation index of the block's first customer.
+    :param identities: Optional identity pool to compose the customers' details from.
+    :param window: Optional (start, end) period. Every customer arrives at a random
+        time within it instead of at `now`.
+    :param compact: Return the batch itself instead of dumping it to records.
+    :param scenario: Optional probabilities of the shopping sessions.
+    :param keep: Optional (start, stop) positions of the customers to return.
+        Defaults to the whole block.
+    :param dump_mode: The mode the records are dumped in, 'json' or 'python'.
+    :return: A list of dictionaries containing customer data and events (or the
+        CustomerBatch when compact), and the metrics of the block.
+    """
+    keep_start, keep_stop = keep or (0, size)
+    block_metrics = Metrics()
+    streams = RandomStreams.from_seed_sequence(seed_sequence)
+    arrivals = None
+    if window is not None:
+        start_us, end_us = (
+            int(np.datetime64(bound, "us").astype(np.int64)) for bound in window
+        )
+        arrivals = np.sort(streams.numpy.integers(start_us, end_us, size))
+    if mode == "batch":
+        with block_metrics.timer("generate"):
+            batch = generate_customer_batch(
+                size,
+                streams.numpy,
+                catalog.ids,
+                now=now,
+                fake=streams.fake,
+                identities=identities,
+                first_index=first_index,
+                arrivals=arrivals,
+                scenario=scenario,
+            )
+        if (keep_start, keep_stop) != (0, size):
+            batch = batch.take(np.arange(keep_start, keep_stop))
+        if compact:
+            # the sinks dump the batch when they write it
+            records = batch
+            with block_metrics.timer("validate"):
+                batch.validate_sample(validate_sample_rate)
+        else:
+            with block_metrics.timer("dump"):
+                records = batch.to_records(dump_mode)
+            with block_metrics.timer("validate"):
+                faux_utils.validate_sample(records, validate_sample_rate)
+        event_counts = zip(
+            EVENT_TYPES,
+            np.bincount(batch.events["event_type"], minlength=len(EVENT_TYPES)),
+        )
+    else:
+        # scalar payloads are validated and dumped as they are generated
+        if arrivals is not None:
+            clocks = [SimClock(arrival) for arrival in arrivals.tolist()]
+        else:
+            clocks = [SimClock.at(now) for _ in range(size)]
+        with block_metrics.timer("generate"):
+            # customers after keep_stop don't change the ones before, so they're skipped
+            records = [
+                generate_customer_data(
+                    streams=streams,
+                    clock=clocks[i],
+                    catalog=catalog,
+                    trusted=trusted,
+                    validate_sample_rate=validate_sample_rate,
+                    identities=identities,
+                    customer_index=first_index + i,
+                    scenario=scenario,
+                    dump_mode=dump_mode,
+                )
+                for i in range(keep_stop)
+            ][keep_start:]
+        event_counts = Counter(
+            event["event_type"]
+            for customer_data in records
+            for event in customer_data["events"]
+        ).items()
 
-    add_to_cart_count = sum(
-        1 for event in customer_data["events"] if event["event_type"] == "add_to_cart"
-    )
-    remove_from_cart_count = sum(
-        1
-        for event in customer_data["events"]
-        if event["event_type"] == "remove_from_cart"
-    )
+    block_metrics.incr("customers", keep_stop - keep_start)
+    for event_type, count in event_counts:
+        block_metrics.incr(f"events.{event_type}", int(count))
+    return records, block_metrics
 
-    line_items = None
-    checked_out_at = None
-    order_id = None
-    status = None
 
-    # Simulate checkout event after add_to_cart events - you can't checkout with empty cart
-    if add_to_cart_count > remove_from_cart_count:
-        checked_out_at = add_random_minutes(_generate_new_timestamp(iso=False))
+def shard_range(n: int, chunk_size: int, shard: int, num_shards: int) -> tuple[int, int]:
+    """
+    Returns the customers a shard of a run covers.
 
-        # An order is only created at the point of checkout
-        order_id = uuid.uuid4()
-        status = random.choice(["success", "failed", "cancelled"])
+    The run's blocks of chunk_size customers are dealt out as evenly sized,
+    consecutive runs of whole blocks, so no block is split across shards.
 
-        customer_data["events"].append(
-            generate_checkout(
-                customer_id=customer_id,
-                order_id=order_id,
-                status=status,
-                checked_out_at=checked_out_at,
-            )
-        )
+    :param n: The number of customers in the run.
+    :param chunk_size: The number of customers per block.
+    :param shard: The shard, from 0 to num_shards - 1.
+    :param num_shards: The number of shards.
+    :return: The (start, stop) positions of the shard's customers within the run.
+    """
+    if not 0 <= shard < num_shards:
+        raise ValueError(f"Shard {shard} is outside of 0 to {num_shards - 1}")
+    num_blocks = -(-n // chunk_size)
+    first_block = shard * num_blocks // num_shards
+    last_block = (shard + 1) * num_blocks // num_shards
+    return min(first_block * chunk_size, n), min(last_block * chunk_size, n)
 
-        abandon_cart = random.choice([True, False])
 
-        if not abandon_cart:
-            line_items = []
+def _bounded_map(
+    executor: Executor, fn: Callable, *iterables: Iterable, prefetch: int
+) -> Iterator[Any]:
+    """
+    Like Executor.map, but keeps at most `prefetch` tasks in flight.
 
-            for event in customer_data["events"]:
-                # Still unsure about actually keeping this in the db
-                if event["event_type"] == "add_to_cart":
-                    line_items.append(
-                        {
-                            "item_id": event["event_data"]["item_id"],
-                            "quantity": event["event_data"]["quantity"],
-                            "order_id": order_id,
-                        }
-                    )
-        else:
-            # Remove the checkout event to simulate an abandoned cart
-            customer_data["events"] = [
-                event
-                for event in customer_data["events"]
-                if event["event_type"] != "checkout"
-            ]
-    # the intentional error in this code that the line items array doesn't consider items that were removed from the cart
-    logger.info("Customer data generated")
-    return customer_data
-
-
-def create_simulation(n=1000, seed: Optional[int] = None):
+    Executor.map submits every task up front, which would buffer the whole
+    simulation in memory whenever the consumer is slower than the workers.
+
+    :param executor: The executor to submit the tasks to.
+    :param fn: The function to call.
+    :param iterables: The iterables of arguments to call fn with.
+    :param prefetch: The maximum number of submitted but unconsumed tasks.
+    :return: An iterator over the results, in submission order.
+    """
+    pending = deque()
+    for args in zip(*iterables):
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= prefetch:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def iter_simulation(
+    n: int = 1000,
+    chunk_size: int = 1000,
+    seed: Optional[int] = None,
+    mode: str = "scalar",
+    workers: Optional[int] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
+    identities: Optional[IdentityPool] = None,
+    catalog: Optional[ProductCatalog] = None,
+    first_index: int = 0,
+    window: Optional[tuple[datetime, datetime]] = None,
+    compact: bool = False,
+    scenario: Optional[Scenario] = None,
+    shard: int = 0,
+    num_shards: int = 1,
+    index_range: Optional[tuple[int, int]] = None,
+    now: Optional[datetime] = None,
+    dump_mode: str = "json",
+) -> Iterator[Chunk]:
+    """
+    Lazily simulates n customers and yields them in chunks of chunk_size.
+
+    Only a bounded number of chunks is held in memory at any time, so memory use
+    doesn't grow with n. The customers are generated in blocks of chunk_size and
+    every block draws from its own streams, keyed by the seed and the block
+    number, so the output only depends on n, chunk_size, seed and mode and not on
+    the number of workers.
+
+    Any slice of a run can also be generated on its own: with `shard` and
+    `num_shards`, or with `index_range`, only the blocks holding that slice are
+    generated. Shards of the same run on several machines add up to exactly the
+    customers of a run on one machine, in shard order, provided they share the
+    seed and `now` or `window`.
+
+    :param n: The number of customer data sets to generate.
+    :param chunk_size: The number of customers per chunk. Chunks are the unit of work
+        handed to the workers.
+    :param seed: Optional seed for the random number generator to ensure reproducibility.
+    :param mode: The generation engine, 'scalar' or 'batch'.
+    :param workers: Optional number of worker processes. Chunks are generated in the
+        current process when None or 1.
+    :param trusted: Build payloads directly instead of validating every one of them
+        through the pydantic models.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :param identities: Optional identity pool to compose usernames, emails and cities
+        from instead of calling Faker for every customer. Identities are unique
+        across the run.
+    :param catalog: Optional product catalog to pick cart items from. Defaults to
+        the shared catalog loaded from the database.
+    :param first_index: The index of the first customer, for runs that continue
+        the index range of an earlier run.
+    :param window: Optional (start, end) period the customers arrive in, each at a
+        random time. By default all customers arrive at the current time.
+    :param compact: Yield every chunk as a CustomerBatch, which the sinks write
+        without building a dictionary per event. Only supported in batch mode.
+    :param scenario: Optional probabilities of the shopping sessions. Defaults to
+        DEFAULT_SCENARIO.
+    :param shard: The shard to generate, from 0 to num_shards - 1.
+    :param num_shards: The number of shards the run is split into, see `shard_range`.
+    :param index_range: Optional (start, stop) positions within the run of the
+        customers to generate, as an alternative to shards.
+    :param now: Optional simulated current time. Defaults to the current UTC time.
+    :param dump_mode: The mode the records are dumped in. 'json' writes ids and
+        timestamps as strings, 'python' as UUIDs and datetimes, which every sink
+        takes as they are. Compact chunks are dumped by the sinks.
+    :return: An iterator over lists of dictionaries containing customer data and
+        events, or over CustomerBatch chunks when compact.
+    """
+    if mode not in {"scalar", "batch"}:
+        raise ValueError(f"Unsupported simulation mode: {mode}")
+    if compact and mode != "batch":
+        raise ValueError("Compact chunks are only generated in batch mode")
+    if dump_mode not in {"json", "python"}:
+        raise ValueError(f"Unsupported dump mode: {dump_mode}")
+
+    if index_range is not None:
+        if num_shards != 1:
+            raise ValueError("Pass either shards or an index range, not both")
+        low, high = index_range
+        if not 0 <= low <= high <= n:
+            raise ValueError(f"Index range {index_range} is outside of 0 to {n}")
+    else:
+        low, high = shard_range(n, chunk_size, shard, num_shards)
+    if (low, high) != (0, n) and seed is None:
+        raise ValueError("A slice of a run can only be generated with a seed")
+
+    blocks = range(low // chunk_size, -(-high // chunk_size))
+    num_chunks = len(blocks)
+    offsets = range(blocks.start * chunk_size, blocks.stop * chunk_size, chunk_size)
+    starts = (first_index + offset for offset in offsets)
+    sizes = (min(chunk_size, n - offset) for offset in offsets)
+    # only the first and the last block can reach outside of the slice
+    keeps = (
+        (max(low - offset, 0), min(high - offset, chunk_size, n - offset))
+        for offset in offsets
+    )
+    seed_sequences = block_seed_sequences(seed, blocks)
+    now = now or datetime.utcnow()
+    # workers receive a snapshot of the catalog instead of querying the database
+    catalog = catalog or _shared_catalog()
+    if catalog.is_stale:
+        catalog.load()
+
+    args = (
+        sizes,
+        seed_sequences,
+        repeat(now),
+        repeat(catalog),
+        repeat(mode),
+        repeat(trusted),
+        repeat(validate_sample_rate),
+        starts,
+        repeat(identities),
+        repeat(window),
+        repeat(compact),
+        repeat(scenario),
+        keeps,
+        repeat(dump_mode),
+    )
+    if workers is None or workers <= 1:
+        blocks = map(_simulate_block, *args)
+        for records, block_metrics in blocks:
+            metrics.merge(block_metrics)
+            yield records
+        return
+
+    logger.info(f"Generating {num_chunks} chunks across {workers} workers")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        blocks = _bounded_map(executor, _simulate_block, *args, prefetch=2 * workers)
+        for records, block_metrics in blocks:
+            metrics.merge(block_metrics)
+            yield records
+
+
+def create_simulation(
+    n=1000,
+    seed: Optional[int] = None,
+    mode: str = "scalar",
+    chunk_size: int = 1000,
+    workers: Optional[int] = None,
+    trusted: bool = False,
+    validate_sample_rate: float = 0.0,
+    identities: Optional[IdentityPool] = None,
+    catalog: Optional[ProductCatalog] = None,
+    scenario: Optional[Scenario] = None,
+    shard: int = 0,
+    num_shards: int = 1,
+    index_range: Optional[tuple[int, int]] = None,
+    now: Optional[datetime] = None,
+):
     """
     Creates a simulation of customer shopping via an e-comm website.
 
+    The whole simulation is held in memory, use `iter_simulation` to stream large runs.
+    With shards or an index range, only that slice of the simulation is created,
+    see `iter_simulation`.
+
     :param n: The number of customer data sets to generate. Defaults to 1000.
     :param seed: Optional seed for the random number generator to ensure reproducibility.
+    :param mode: The generation engine. 'scalar' generates one customer at a time,
+        'batch' draws whole blocks of customers at once with numpy.
+    :param chunk_size: The number of customers per chunk. Chunks are the unit of work
+        handed to the workers.
+    :param workers: Optional number of worker processes to spread the chunks over.
+        The output is the same for any number of workers.
+    :param trusted: Build payloads directly instead of validating every one of them
+        through the pydantic models.
+    :param validate_sample_rate: The fraction of trusted payloads that are validated anyway.
+    :param identities: Optional identity pool to compose usernames, emails and cities from.
+    :param catalog: Optional product catalog to pick cart items from. Defaults to
+        the shared catalog loaded from the database.
+    :param scenario: Optional probabilities of the shopping sessions.
+    :param shard: The shard to create, from 0 to num_shards - 1.
+    :param num_shards: The number of shards the simulation is split into.
+    :param index_range: Optional (start, stop) positions of the customers to create.
+    :param now: Optional simulated current time. Shards created on several machines
+        must share it (or arrive in a shared window) to add up to one simulation.
     :return: A list of dictionaries containing customer data and events.
     """
-    if seed is not None:
-        random.seed(seed)
     # TODO: make the default value of n a CONSTANT stored in a config
-    events_data = []
-    for _ in range(n):
-        data = generate_customer_data()
-        events_data.append(data)
+    events_data = list(
+        chain.from_iterable(
+            iter_simulation(
+                n,
+                chunk_size=chunk_size,
+                seed=seed,
+                mode=mode,
+                workers=workers,
+                trusted=trusted,
+                validate_sample_rate=validate_sample_rate,
+                identities=identities,
+                catalog=catalog,
+                scenario=scenario,
+                shard=shard,
+                num_shards=num_shards,
+                index_range=index_range,
+                now=now,
+            )
+        )
+    )
+    logger.info(f"Generated {len(events_data)} customers")
     return events_data
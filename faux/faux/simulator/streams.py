@@ -0,0 +1,121 @@
+import random
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+import numpy as np
+
+from faux.core import faux_utils
+from faux.core.config import get_config
+from faux.core.ids import make_uuid
+
+if TYPE_CHECKING:
+    from faker import Faker
+
+
+class RandomStreams:
+    """
+    A bundle of random number generators for one unit of simulation work.
+
+    Every block of customers gets its own streams, spawned from the simulation seed,
+    so blocks can be generated in any order or process and still produce the same data.
+
+    Attributes:
+        random (random.Random): Drives the scalar helpers in sim_utils and sim_helpers.
+        numpy (np.random.Generator): Drives the vectorized batch engine.
+        fake (Faker): Generates usernames, emails and cities. It is created on first
+            use from `faker_seed`, or is the shared faux_utils instance when there's no seed.
+        uuid_version (Optional[int]): The version of the ids drawn with `new_id`.
+            None follows FauxConfig.uuid_version.
+    """
+
+    def __init__(
+        self,
+        random_: random.Random,
+        numpy_: np.random.Generator,
+        fake: Optional["Faker"] = None,
+        faker_seed: Optional[int] = None,
+        uuid_version: Optional[int] = None,
+    ):
+        self.random = random_
+        self.numpy = numpy_
+        self._fake = fake
+        self._faker_seed = faker_seed
+        self.uuid_version = uuid_version
+
+    @property
+    def fake(self) -> "Faker":
+        if self._fake is None:
+            if self._faker_seed is None:
+                return faux_utils.get_faker()
+            from faker import Faker
+
+            self._fake = Faker(get_config().faker_locale)
+            self._fake.seed_instance(self._faker_seed)
+        return self._fake
+
+    @classmethod
+    def from_seed_sequence(cls, seed_sequence: np.random.SeedSequence) -> "RandomStreams":
+        """
+        Creates independent, reproducible streams from a numpy SeedSequence.
+
+        :param seed_sequence: The seed sequence to derive the streams from.
+        :return: A RandomStreams instance.
+        """
+        random_seed, faker_seed = seed_sequence.generate_state(2, dtype=np.uint64).tolist()
+        return cls(
+            random.Random(random_seed),
+            np.random.default_rng(seed_sequence),
+            faker_seed=faker_seed,
+            uuid_version=get_config().uuid_version,
+        )
+
+    def uuid4(self) -> uuid.UUID:
+        """
+        Draws a random version 4 UUID from the streams.
+
+        :return: A UUID.
+        """
+        return uuid.UUID(int=self.random.getrandbits(128), version=4)
+
+    def new_id(
+        self, timestamp: Optional[datetime] = None, bits: Optional[int] = None
+    ) -> uuid.UUID:
+        """
+        Draws a new id of the streams' UUID version, see `faux.core.ids.make_uuid`.
+
+        :param timestamp: The simulated time the id is created at. Defaults to the
+            current time.
+        :param bits: Optional 128 random bits drawn earlier from `random`, for ids
+            whose time is only known after other draws.
+        :return: A UUID.
+        """
+        if bits is None:
+            bits = self.random.getrandbits(128)
+        return make_uuid(bits, timestamp, self.uuid_version or get_config().uuid_version)
+
+
+def block_seed_sequences(
+    seed: Optional[int], blocks: Iterable[int]
+) -> Iterator[np.random.SeedSequence]:
+    """
+    Lazily derives the seed sequences of some blocks of a simulation.
+
+    The seed sequence of block i matches `SeedSequence(seed).spawn(i + 1)[i]` and
+    only depends on the seed and on i, so any block can be generated on its own,
+    by any process or machine, and always gets the same streams.
+
+    :param seed: Optional seed. Fresh entropy is used when None, in which case the
+        blocks are only consistent with each other within this call.
+    :param blocks: The indexes of the blocks.
+    :return: An iterator over the seed sequences, in the order of blocks.
+    """
+    root = np.random.SeedSequence(seed)
+    for i in blocks:
+        yield np.random.SeedSequence(
+            root.entropy, spawn_key=root.spawn_key + (i,), pool_size=root.pool_size
+        )
+
+
+# Streams backed by the global generators, used when no streams are passed in
+default_streams = RandomStreams(random, np.random.default_rng())
@@ -0,0 +1,117 @@
+from abc import ABC, abstractmethod
+from datetime import date
+from pathlib import Path
+from typing import Iterable
+
+from faux.simulator.batch import Chunk
+
+
+def day_part_name(day: date) -> str:
+    """
+    Returns the name of the part files a file sink writes for a day, see `backfill`.
+    """
+    return f"part-{day.isoformat()}"
+
+
+def temporary_path(path: Path) -> Path:
+    """
+    Returns the hidden name a file sink writes a part file under until it is
+    closed. Readers of the datasets skip files starting with a dot.
+    """
+    return path.with_name(f".{path.name}.tmp")
+
+
+class Sink(ABC):
+    """
+    The interface every destination for simulated data implements.
+
+    A sink receives the simulation chunk by chunk, as produced by `iter_simulation`,
+    and must be closed once the last chunk has been written. A chunk is either a
+    list of customer records or, for compact simulations, a CustomerBatch that the
+    sink only converts (e.g. with `to_rows`) when it writes it. Sinks can be used as
+    context managers to close them automatically, or to abort them when a write
+    raised.
+
+    Attributes:
+        thread_safe (bool): Whether `write` may be called from several threads at once.
+    """
+
+    thread_safe = False
+
+    @abstractmethod
+    def write(self, chunk: Chunk) -> None:
+        """
+        Writes one chunk of customer and event data.
+
+        :param chunk: A list of dictionaries containing customer and event data,
+            or a CustomerBatch.
+        """
+
+    def close(self) -> None:
+        """
+        Flushes any buffered data and releases the sink's resources.
+        """
+
+    def abort(self) -> None:
+        """
+        Releases the sink's resources after a write failed. Sinks that stage their
+        output until they are closed discard it instead of publishing it. Defaults
+        to `close`.
+        """
+        self.close()
+
+    def has_partition(self, day: date) -> bool:
+        """
+        Whether the customers that arrived on a day (see `backfill`) were completely written.
+
+        :param day: The day of the partition.
+        :return: True if the partition was completed, see `complete_partition`.
+        """
+        raise NotImplementedError(f"{type(self).__name__} doesn't support day partitions")
+
+    def complete_partition(self, day: date) -> None:
+        """
+        Records that every customer of a day was written, once the last chunk of
+        the day was. Until then `has_partition` doesn't report the day, so a day
+        that an interrupted backfill left half written is written again instead
+        of skipped. Does nothing by default, for sinks that only publish a day's
+        output when they are closed.
+
+        :param day: The day of the partition.
+        """
+
+    def drop_partition(self, day: date, force: bool = False) -> None:
+        """
+        Deletes the customers that a backfill wrote for a day and their events,
+        including whatever an interrupted write of the day left behind.
+
+        Sinks that can hold data of the day from other runs raise instead of
+        deleting it, unless force is set.
+
+        :param day: The day of the partition.
+        :param force: Also delete data of the day that no backfill wrote.
+        :raises RuntimeError: If the day holds data that no backfill wrote.
+        """
+        raise NotImplementedError(f"{type(self).__name__} doesn't support day partitions")
+
+    def write_all(self, chunks: Iterable[Chunk]) -> int:
+        """
+        Writes every chunk of an iterable.
+
+        :param chunks: An iterable of chunks, e.g. the output of `iter_simulation`.
+        :return: The number of customers written.
+        """
+        written = 0
+        for chunk in chunks:
+            self.write(chunk)
+            written += len(chunk)
+        return written
+
+    def __enter__(self) -> "Sink":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
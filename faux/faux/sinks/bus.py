@@ -0,0 +1,35 @@
+import logging
+
+from faux.bus.event_bus import EventBus
+from faux.simulator.batch import Chunk
+from faux.sinks.base import Sink
+
+logger = logging.getLogger(__name__)
+
+
+class EventBusSink(Sink):
+    """
+    A sink that publishes every chunk to an event bus (see `EventBus.publish_chunk`),
+    so one simulation is fanned out to all of the bus's subscribers at once.
+
+    Closing the sink closes the bus, which waits until every subscriber handled
+    its messages and raises the first error of a subscriber.
+
+    Attributes:
+        bus (EventBus): The bus the chunks are published to.
+        published (int): The number of messages published.
+    """
+
+    def __init__(self, bus: EventBus):
+        self.bus = bus
+        self.published = 0
+
+    def write(self, chunk: Chunk) -> None:
+        self.published += self.bus.publish_chunk(chunk)
+
+    def close(self) -> None:
+        self.bus.close()
+        logger.info(
+            f"Published {self.published} messages to "
+            f"{len(self.bus.subscriptions)} subscribers"
+        )
@@ -0,0 +1,351 @@
+import logging
+import uuid
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from faux.core import faux_utils
+from faux.core.metrics import metrics
+from faux.simulator.batch import (
+    CHECKOUT_STATUSES,
+    EVENT_TYPES,
+    Chunk,
+    CustomerBatch,
+    _to_uuid_strings,
+)
+from faux.sinks.base import Sink, day_part_name, temporary_path
+
+logger = logging.getLogger(__name__)
+
+
+FILE_FORMATS = ("parquet", "arrow")
+
+_TIMESTAMP = pa.timestamp("us")
+
+USERS_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("timestamp", _TIMESTAMP),
+        ("username", pa.string()),
+        ("email", pa.string()),
+        ("location", pa.string()),
+    ]
+)
+
+# (event_data key, column name, column type) for every event type. The nested
+# event_data payload is flattened into these typed columns.
+EVENT_DATA_COLUMNS = {
+    "visit": [
+        ("browser", "browser", pa.string()),
+        ("timestamp", "data_timestamp", _TIMESTAMP),
+    ],
+    "add_to_cart": [
+        ("item_id", "item_id", pa.string()),
+        ("quantity", "quantity", pa.int32()),
+        ("timestamp", "data_timestamp", _TIMESTAMP),
+    ],
+    "remove_from_cart": [
+        ("item_id", "item_id", pa.string()),
+        ("timestamp", "data_timestamp", _TIMESTAMP),
+    ],
+    "checkout": [
+        ("status", "status", pa.string()),
+        ("order_id", "order_id", pa.string()),
+        ("timestamp", "data_timestamp", _TIMESTAMP),
+    ],
+}
+
+EVENT_SCHEMAS = {
+    event_type: pa.schema(
+        [("id", pa.string()), ("timestamp", _TIMESTAMP), ("customer_id", pa.string())]
+        + [(column, column_type) for _, column, column_type in columns]
+    )
+    for event_type, columns in EVENT_DATA_COLUMNS.items()
+}
+
+_STRING_COLUMNS = {"id", "customer_id", "item_id", "order_id"}
+
+
+def _event_date(timestamp: Any) -> str:
+    """
+    Returns the ISO date of an ISO 8601 string or datetime timestamp.
+    """
+    if isinstance(timestamp, str):
+        return timestamp[:10]
+    return timestamp.date().isoformat()
+
+
+def _to_table(columns: dict[str, list], schema: pa.Schema) -> pa.Table:
+    """
+    Builds an Arrow table from buffered column values.
+
+    UUIDs are stored as strings and ISO 8601 strings are parsed into timestamps,
+    so 'json' and 'python' dumped records produce the same table.
+
+    :param columns: The buffered values, keyed by column name.
+    :param schema: The schema of the table.
+    :return: The Arrow table.
+    """
+    arrays = []
+    for field in schema:
+        values = columns[field.name]
+        if field.name in _STRING_COLUMNS:
+            values = [str(value) for value in values]
+        arrays.append(pa.array(values).cast(field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _batch_users_table(batch: CustomerBatch, customer_ids: pa.Array) -> pa.Table:
+    return pa.Table.from_arrays(
+        [
+            customer_ids,
+            pa.array(batch.users["timestamp"], _TIMESTAMP),
+            pa.array(batch.users["username"], pa.string()),
+            pa.array(batch.users["email"], pa.string()),
+            pa.array(batch.users["location"], pa.string()),
+        ],
+        schema=USERS_SCHEMA,
+    )
+
+
+def _batch_event_tables(
+    batch: CustomerBatch, customer_ids: pa.Array
+) -> Iterator[tuple[str, str, pa.Table]]:
+    """
+    Builds the event tables of a batch straight from its columns, one per event
+    type and date.
+
+    :param batch: The batch.
+    :param customer_ids: The batch's customer ids as strings.
+    :return: An iterator over (event type, ISO date, table) tuples.
+    """
+    columns = batch.events
+    days = columns["timestamp"] // (86_400 * 1_000_000)
+    keys = columns["event_type"] * (1 << 32) + days
+    order = np.argsort(keys, kind="stable")
+    product_ids = pa.array([str(product_id) for product_id in batch.product_ids])
+    builders = {
+        "id": lambda group: pa.array(_to_uuid_strings(columns["id"][group])),
+        "timestamp": lambda group: pa.array(columns["timestamp"][group], _TIMESTAMP),
+        "customer_id": lambda group: customer_ids.take(columns["customer"][group]),
+        "data_timestamp": lambda group: pa.array(
+            columns["data_timestamp"][group], _TIMESTAMP
+        ),
+        "browser": lambda group: pa.array(faux_utils.browsers).take(
+            columns["browser"][group]
+        ),
+        "item_id": lambda group: product_ids.take(columns["item"][group]),
+        "quantity": lambda group: pa.array(columns["quantity"][group], pa.int32()),
+        "status": lambda group: pa.array(CHECKOUT_STATUSES).take(
+            columns["status"][group]
+        ),
+        "order_id": lambda group: pa.array(_to_uuid_strings(columns["order_id"][group])),
+    }
+    boundaries = np.flatnonzero(np.diff(keys[order])) + 1
+    for group in np.split(order, boundaries) if len(order) else []:
+        event_type = EVENT_TYPES[int(columns["event_type"][group[0]])]
+        event_date = str(np.datetime64(int(days[group[0]]), "D"))
+        schema = EVENT_SCHEMAS[event_type]
+        yield event_type, event_date, pa.Table.from_arrays(
+            [builders[name](group) for name in schema.names], schema=schema
+        )
+
+
+class ColumnarFileSink(Sink):
+    """
+    A sink that writes users and events as compressed columnar files.
+
+    Users are written to `<root>/users/`. Events are partitioned Hive-style by
+    type and by the date of their timestamp, e.g.
+    `<root>/events/event_type=visit/event_date=2024-05-25/`, and their event_data
+    is flattened into typed columns per event type (see EVENT_SCHEMAS).
+
+    Rows are buffered per partition and written as one row group every
+    `row_group_size` rows, so memory stays bounded however long the stream is.
+    Every sink instance writes its own part file per partition and never
+    overwrites files from other runs. The files are written under hidden
+    temporary names, which readers of the datasets skip, and only renamed to
+    their part names once the sink is closed, the users file last. Backfills name
+    the part files after the day they generate (see `for_day`), so a day can be
+    found and replaced, and a day only counts as written once its users file
+    exists.
+
+    Attributes:
+        root (Path): The directory the datasets are written to.
+        file_format (str): 'parquet' or 'arrow' (Arrow IPC).
+        compression (str): The compression codec, e.g. 'zstd', 'snappy' or 'lz4'.
+        row_group_size (int): The number of rows buffered per partition before they are written.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        file_format: str = "parquet",
+        compression: str = "zstd",
+        row_group_size: int = 32_768,
+        part_name: Optional[str] = None,
+    ):
+        if file_format not in FILE_FORMATS:
+            raise ValueError(f"Unsupported file format: {file_format}")
+
+        self.root = Path(root)
+        self.file_format = file_format
+        self.compression = compression
+        self.row_group_size = row_group_size
+        part_name = part_name or f"part-{uuid.uuid4().hex[:12]}"
+        self._part_name = f"{part_name}.{file_format}"
+        self._buffers: dict[Path, list[pa.Table]] = {}
+        self._schemas: dict[Path, pa.Schema] = {}
+        self._writers: dict[Path, Any] = {}
+        self.rows_written: dict[str, int] = defaultdict(int)
+
+    @classmethod
+    def for_day(
+        cls, root: Union[str, Path], day: date, **options: Any
+    ) -> "ColumnarFileSink":
+        """
+        Creates a sink for the customers that arrived on a day, see `backfill`.
+
+        :param root: The directory the datasets are written to.
+        :param day: The day the sink writes.
+        :param options: The other arguments of ColumnarFileSink.
+        :return: The sink.
+        """
+        return cls(root, part_name=day_part_name(day), **options)
+
+    def _day_files(self, day: date) -> list[Path]:
+        file_name = f"{day_part_name(day)}.{self.file_format}"
+        files = self.root.glob(f"*/**/{file_name}")
+        temporary_files = self.root.glob(f"*/**/{temporary_path(Path(file_name)).name}")
+        return sorted([*files, *temporary_files])
+
+    def has_partition(self, day: date) -> bool:
+        return (self.root / "users" / f"{day_part_name(day)}.{self.file_format}").exists()
+
+    def drop_partition(self, day: date, force: bool = False) -> None:
+        # only backfills write the part files named after a day
+        # the users file goes first, so an interrupted drop leaves an incomplete day
+        files = sorted(self._day_files(day), key=lambda path: path.parent.name != "users")
+        for path in files:
+            path.unlink()
+        logger.info(f"Deleted {len(files)} files of {day} from {self.root}")
+
+    def _append(self, table: pa.Table, dataset: str, *keys: str) -> None:
+        """
+        Buffers a table of rows for a partition.
+        """
+        path = self.root.joinpath(dataset, *keys)
+        self._buffers.setdefault(path, []).append(table)
+        self._schemas[path] = table.schema
+
+    def _open_writer(self, path: Path, schema: pa.Schema) -> Any:
+        path.mkdir(parents=True, exist_ok=True)
+        file_path = temporary_path(path / self._part_name)
+        if self.file_format == "parquet":
+            return pq.ParquetWriter(file_path, schema, compression=self.compression)
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        return pa.ipc.new_file(str(file_path), schema, options=options)
+
+    def _buffered_rows(self, path: Path) -> int:
+        return sum(table.num_rows for table in self._buffers[path])
+
+    def _flush(self, path: Path) -> None:
+        """
+        Writes the buffered rows of a partition as one row group.
+        """
+        num_rows = self._buffered_rows(path)
+        if not num_rows:
+            return
+
+        schema = self._schemas[path]
+        writer = self._writers.get(path)
+        if writer is None:
+            writer = self._writers[path] = self._open_writer(path, schema)
+        with metrics.timer("sink_flush"):
+            writer.write_table(pa.concat_tables(self._buffers[path]))
+        self.rows_written[str(path.relative_to(self.root).parts[0])] += num_rows
+        metrics.incr("rows_written", num_rows)
+        self._buffers[path] = []
+
+    def _write_records(self, chunk: list[dict[str, Any]]) -> None:
+        users = {name: [] for name in USERS_SCHEMA.names}
+        events: dict[tuple[str, str], dict[str, list]] = {}
+        for customer_data in chunk:
+            customer = customer_data["customer"]
+            for name, values in users.items():
+                values.append(customer[name])
+
+            for event in customer_data["events"]:
+                event_type = event["event_type"]
+                partition = (event_type, _event_date(event["timestamp"]))
+                buffers = events.get(partition)
+                if buffers is None:
+                    buffers = events[partition] = {
+                        name: [] for name in EVENT_SCHEMAS[event_type].names
+                    }
+                buffers["id"].append(event["id"])
+                buffers["timestamp"].append(event["timestamp"])
+                buffers["customer_id"].append(event["customer_id"])
+                event_data = event["event_data"]
+                for key, column, _ in EVENT_DATA_COLUMNS[event_type]:
+                    buffers[column].append(event_data[key])
+
+        self._append(_to_table(users, USERS_SCHEMA), "users")
+        for (event_type, event_date), buffers in events.items():
+            self._append(
+                _to_table(buffers, EVENT_SCHEMAS[event_type]),
+                "events",
+                f"event_type={event_type}",
+                f"event_date={event_date}",
+            )
+
+    def _write_batch(self, batch: CustomerBatch) -> None:
+        customer_ids = pa.array(batch.customer_ids(), pa.string())
+        self._append(_batch_users_table(batch, customer_ids), "users")
+        for event_type, event_date, table in _batch_event_tables(batch, customer_ids):
+            self._append(
+                table, "events", f"event_type={event_type}", f"event_date={event_date}"
+            )
+
+    def write(self, chunk: Chunk) -> None:
+        if isinstance(chunk, CustomerBatch):
+            # built column by column, without a dictionary per event
+            self._write_batch(chunk)
+        else:
+            self._write_records(chunk)
+
+        for path in self._buffers:
+            if self._buffered_rows(path) >= self.row_group_size:
+                self._flush(path)
+
+    def _close_writers(self) -> list[Path]:
+        """
+        Closes the writers and returns the partition directories they wrote.
+        """
+        paths = list(self._writers)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        return paths
+
+    def close(self) -> None:
+        for path in self._buffers:
+            self._flush(path)
+        # the users file is published last, see has_partition
+        for path in sorted(self._close_writers(), key=lambda path: path.name == "users"):
+            temporary_path(path / self._part_name).replace(path / self._part_name)
+        logger.info(
+            f"Wrote {dict(self.rows_written)} rows as {self.file_format} to {self.root}"
+        )
+
+    def abort(self) -> None:
+        self._buffers.clear()
+        for path in self._close_writers():
+            temporary_path(path / self._part_name).unlink(missing_ok=True)
+        logger.info(f"Discarded the {self.file_format} files written to {self.root}")
@@ -0,0 +1,131 @@
+import gzip
+import logging
+import uuid
+from datetime import date
+from pathlib import Path
+from typing import IO, Optional, Union
+
+from faux.core.encoding import JSON_LIBRARY, dumps_lines
+from faux.core.metrics import metrics
+from faux.simulator.batch import Chunk, CustomerBatch, count_rows
+from faux.sinks.base import Sink, day_part_name, temporary_path
+
+logger = logging.getLogger(__name__)
+
+
+NDJSON_COMPRESSIONS = (None, "gzip")
+
+
+class NdjsonFileSink(Sink):
+    """
+    A sink that exports the simulation as newline delimited JSON.
+
+    Every line holds one customer record in the shape of `create_simulation`'s
+    output, `{"customer": {...}, "events": [...]}`, so the file can be replayed or
+    streamed to other systems record by record. Lines are encoded with
+    `faux.core.encoding.dumps`, which writes the UUIDs and datetimes of records
+    dumped in 'python' mode natively, as the same strings 'json' mode holds.
+
+    Every sink instance writes its own part file to `<root>/customers/` and never
+    overwrites files from other runs. The file is written under a hidden temporary
+    name and only renamed to its part name once the sink is closed, so a part file
+    is always complete and a failed run leaves none behind. Backfills name the
+    part files after the day they generate (see `for_day`), so a day can be found
+    and replaced.
+
+    Attributes:
+        root (Path): The directory the part files are written to.
+        compression (Optional[str]): None for plain `.ndjson` files or 'gzip'.
+        records_written (int): The number of customer records written.
+        rows_written (int): The number of user and event rows in those records.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        compression: Optional[str] = None,
+        part_name: Optional[str] = None,
+    ):
+        if compression not in NDJSON_COMPRESSIONS:
+            raise ValueError(f"Unsupported NDJSON compression: {compression}")
+
+        self.root = Path(root)
+        self.compression = compression
+        part_name = part_name or f"part-{uuid.uuid4().hex[:12]}"
+        self._part_name = f"{part_name}{self._suffix()}"
+        self._file: Optional[IO[bytes]] = None
+        self.records_written = 0
+        self.rows_written = 0
+
+    @classmethod
+    def for_day(
+        cls, root: Union[str, Path], day: date, **options
+    ) -> "NdjsonFileSink":
+        """
+        Creates a sink for the customers that arrived on a day, see `backfill`.
+
+        :param root: The directory the part files are written to.
+        :param day: The day the sink writes.
+        :param options: The other arguments of NdjsonFileSink.
+        :return: The sink.
+        """
+        return cls(root, part_name=day_part_name(day), **options)
+
+    def _suffix(self) -> str:
+        return ".ndjson.gz" if self.compression == "gzip" else ".ndjson"
+
+    @property
+    def path(self) -> Path:
+        """
+        The part file the sink writes to.
+        """
+        return self.root / "customers" / self._part_name
+
+    def _day_path(self, day: date) -> Path:
+        return self.root / "customers" / f"{day_part_name(day)}{self._suffix()}"
+
+    def has_partition(self, day: date) -> bool:
+        return self._day_path(day).exists()
+
+    def drop_partition(self, day: date, force: bool = False) -> None:
+        # only backfills write the part files named after a day
+        path = self._day_path(day)
+        path.unlink(missing_ok=True)
+        temporary_path(path).unlink(missing_ok=True)
+        logger.info(f"Deleted {path}")
+
+    def _open(self) -> IO[bytes]:
+        path = temporary_path(self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if self.compression == "gzip":
+            return gzip.open(path, "wb")
+        return open(path, "wb")
+
+    def write(self, chunk: Chunk) -> None:
+        # orjson writes the UUIDs and datetimes of 'python' records natively
+        records = chunk.to_records("python") if isinstance(chunk, CustomerBatch) else chunk
+        if self._file is None:
+            self._file = self._open()
+        with metrics.timer("sink_flush"):
+            self._file.write(dumps_lines(records))
+        rows = count_rows(chunk)
+        self.records_written += len(chunk)
+        self.rows_written += rows
+        metrics.incr("rows_written", rows)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            temporary_path(self.path).replace(self.path)
+        logger.info(
+            f"Wrote {self.records_written} customer records as NDJSON to {self.root} "
+            f"with {JSON_LIBRARY}"
+        )
+
+    def abort(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            temporary_path(self.path).unlink(missing_ok=True)
+        logger.info(f"Discarded the NDJSON records written to {self.root}")
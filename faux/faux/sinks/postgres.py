@@ -0,0 +1,68 @@
+import logging
+import threading
+from datetime import date
+
+from faux.database.db_utils import (
+    SINK_MODES,
+    PartitionedWriter,
+    day_is_backfilled,
+    delete_backfilled_day,
+    record_backfilled_day,
+    write_chunk,
+)
+from faux.simulator.batch import Chunk
+from faux.sinks.base import Sink
+
+logger = logging.getLogger(__name__)
+
+
+class PostgresSink(Sink):
+    """
+    A sink that writes every chunk to the users and events tables in its own transaction.
+
+    Every write checks out its own session or connection, so chunks can be
+    written from several threads at once. With more than one connection, every
+    chunk is also split by customer and its partitions are loaded concurrently
+    (see `PartitionedWriter`).
+
+    Attributes:
+        mode (str): How the rows are loaded, one of SINK_MODES. See `write_chunk`.
+        connections (int): The number of connections every chunk is loaded over.
+    """
+
+    thread_safe = True
+
+    def __init__(self, mode: str = "orm", connections: int = 1):
+        if mode not in SINK_MODES:
+            raise ValueError(f"Unsupported sink mode: {mode}")
+        self.mode = mode
+        self.connections = connections
+        self.written = 0
+        self._lock = threading.Lock()
+        self._partitioned = (
+            PartitionedWriter(connections, mode=mode) if connections > 1 else None
+        )
+
+    def write(self, chunk: Chunk) -> None:
+        if self._partitioned is not None:
+            self._partitioned.write(chunk)
+        else:
+            write_chunk(chunk, mode=self.mode)
+        with self._lock:
+            self.written += len(chunk)
+            written = self.written
+        logger.info(f"Committed {written} records")
+
+    def close(self) -> None:
+        if self._partitioned is not None:
+            self._partitioned.close()
+
+    def has_partition(self, day: date) -> bool:
+        return day_is_backfilled(day)
+
+    def complete_partition(self, day: date) -> None:
+        record_backfilled_day(day)
+
+    def drop_partition(self, day: date, force: bool = False) -> None:
+        deleted = delete_backfilled_day(day, force=force)
+        logger.info(f"Deleted {deleted} customers of {day} and their events")
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from faux.core.config import configure, get_config
+from faux.database.catalog import ProductCatalog
+from helpers import TEST_SCHEMA, product_rows
+
+
+def pytest_configure(config):
+    # the database models bind their schema when they are first imported
+    configure(project_schema=TEST_SCHEMA)
+
+
+@pytest.fixture
+def catalog() -> ProductCatalog:
+    return ProductCatalog(loader=product_rows).load()
+
+
+@pytest.fixture(scope="session")
+def postgres():
+    """
+    An engine of the configured database. Skips the test when it isn't reachable.
+    """
+    engine = create_engine(get_config().database_url)
+    try:
+        engine.connect().close()
+    except OperationalError:
+        pytest.skip("the database isn't reachable")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def database(postgres):
+    """
+    The engine of faux.database with the tables of the models created in
+    TEST_SCHEMA, which is dropped after the test.
+    """
+    # the models register their tables with Base.metadata when imported
+    from faux.database import db_models  # noqa: F401
+    from faux.database.base import Base, get_engine, reset_engine
+
+    engine = get_engine()
+    Base.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        reset_engine()
+        with postgres.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
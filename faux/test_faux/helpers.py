@@ -0,0 +1,12 @@
+import os
+import uuid
+from datetime import datetime
+
+NOW = datetime(2024, 5, 25, 12)
+
+# The throwaway schema the database models are created in, see conftest.py
+TEST_SCHEMA = f"faux_test_{os.getpid()}"
+
+
+def product_rows() -> list[tuple[uuid.UUID, float]]:
+    return [(uuid.UUID(int=i * 7919 + 1, version=4), 10.0 + i) for i in range(15)]
@@ -0,0 +1,150 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from faux.simulator.backfill import backfill, file_sink_factory, postgres_sink_factory
+from faux.simulator.sim_utils import iter_simulation
+from faux.sinks.base import day_part_name
+
+DAY = date(2024, 5, 25)
+
+
+class _Interrupted(Exception):
+    pass
+
+
+def _interrupting_factory(sink_factory, chunks):
+    """
+    Wraps a sink factory so its sinks raise after writing `chunks` chunks.
+    """
+
+    def create(day):
+        sink = sink_factory(day)
+        write = sink.write
+        written = []
+
+        def interrupted_write(chunk):
+            if len(written) == chunks:
+                raise _Interrupted(day)
+            write(chunk)
+            written.append(chunk)
+
+        sink.write = interrupted_write
+        return sink
+
+    return create
+
+
+def _files(root):
+    return sorted(
+        str(path.relative_to(root)) for path in root.rglob("*") if path.is_file()
+    )
+
+
+def _contents(root):
+    return {name: (root / name).read_bytes() for name in _files(root)}
+
+
+def _backfill(root, file_format, catalog, sink_factory=None, **options):
+    return backfill(
+        DAY,
+        DAY,
+        customers_per_day=250,
+        seed=3,
+        sink_factory=sink_factory or file_sink_factory(root, file_format),
+        chunk_size=100,
+        catalog=catalog,
+        **options,
+    )
+
+
+@pytest.mark.parametrize("file_format", ["ndjson", "parquet"])
+def test_interrupted_day_leaves_no_part_files(tmp_path, catalog, file_format):
+    factory = _interrupting_factory(file_sink_factory(tmp_path, file_format), chunks=1)
+
+    with pytest.raises(_Interrupted):
+        _backfill(tmp_path, file_format, catalog, sink_factory=factory)
+
+    assert _files(tmp_path) == []
+    assert not file_sink_factory(tmp_path, file_format)(DAY).has_partition(DAY)
+
+
+@pytest.mark.parametrize("file_format", ["ndjson", "parquet"])
+def test_rerun_rewrites_a_partially_written_day(tmp_path, catalog, file_format):
+    complete = tmp_path / "complete"
+    _backfill(complete, file_format, catalog)
+
+    partial = tmp_path / "partial"
+    _backfill(partial, file_format, catalog)
+    # a process killed while publishing the day's files leaves the events but
+    # not the customers under their part names
+    for directory in ("users", "customers"):
+        for path in partial.glob(f"{directory}/*"):
+            path.rename(path.with_name(f".{path.name}.tmp"))
+    assert not file_sink_factory(partial, file_format)(DAY).has_partition(DAY)
+
+    [result] = _backfill(partial, file_format, catalog)
+
+    assert result.status == "written"
+    assert _contents(partial) == _contents(complete)
+
+
+def test_complete_day_is_skipped(tmp_path, catalog):
+    _backfill(tmp_path, "parquet", catalog)
+
+    [result] = _backfill(tmp_path, "parquet", catalog)
+
+    assert result.status == "skipped"
+    assert (tmp_path / "users" / f"{day_part_name(DAY)}.parquet").exists()
+
+
+def _customers(engine):
+    from faux.database.db_models import User
+
+    with engine.connect() as connection:
+        return set(connection.execute(select(User.id)).scalars())
+
+
+def _postgres_backfill(catalog, sink_factory=None, **options):
+    sink_factory = sink_factory or postgres_sink_factory("copy")
+    return _backfill(None, None, catalog, sink_factory=sink_factory, **options)
+
+
+def test_postgres_rerun_rewrites_an_interrupted_day(database, catalog):
+    factory = _interrupting_factory(postgres_sink_factory("copy"), chunks=1)
+    with pytest.raises(_Interrupted):
+        _postgres_backfill(catalog, sink_factory=factory)
+    assert len(_customers(database)) == 100
+
+    [result] = _postgres_backfill(catalog)
+    assert result.status == "written"
+    assert len(_customers(database)) == 250
+
+    [result] = _postgres_backfill(catalog)
+    assert result.status == "skipped"
+
+
+def test_postgres_backfill_keeps_customers_it_did_not_write(database, catalog):
+    from faux.database.db_models import Events
+    from faux.database.db_utils import write_chunk
+
+    # customers of a regular run that arrived on the backfilled day
+    for chunk in iter_simulation(
+        50, seed=1, mode="batch", catalog=catalog, now=datetime(2024, 5, 25, 12), compact=True
+    ):
+        write_chunk(chunk, mode="copy")
+    regular = _customers(database)
+    with database.connect() as connection:
+        events = connection.execute(select(func.count()).select_from(Events)).scalar()
+
+    with pytest.raises(RuntimeError, match="weren't backfilled"):
+        _postgres_backfill(catalog)
+
+    assert _customers(database) == regular
+    with database.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(Events)).scalar() == events
+
+    [result] = _postgres_backfill(catalog, overwrite=True)
+    assert result.status == "written"
+    assert not _customers(database) & regular
@@ -0,0 +1,98 @@
+import csv
+import json
+import uuid
+from datetime import datetime
+
+from faux.database.bulk import COPY_NULL, encode_csv
+from faux.database.db_models import Events, User
+
+AWKWARD = [
+    'say "hi"',
+    "a,b,,c",
+    "two\nlines\r\nand a carriage\rreturn",
+    r"C:\new\table\\",
+    '\\"quoted, backslash\\"',
+    "",
+    " padded ",
+]
+
+
+def _decode(table, buffer):
+    """
+    Reads the rows back as COPY ... WITH (FORMAT csv, NULL '\\N') would.
+    """
+    columns = list(table.columns)
+    rows = []
+    for fields in csv.reader(buffer):
+        assert len(fields) == len(columns)
+        rows.append(
+            {
+                column.name: None if value == COPY_NULL else value
+                for column, value in zip(columns, fields)
+            }
+        )
+    return rows
+
+
+def test_user_rows_round_trip():
+    users = [
+        {
+            "id": uuid.UUID(int=i, version=4),
+            "timestamp": datetime(2024, 5, 25, 12, 0, i, i * 1000),
+            "username": username,
+            "email": f"user{i}@example.com",
+            "location": None if i % 2 else username,
+        }
+        for i, username in enumerate(AWKWARD)
+    ]
+
+    rows = _decode(User.__table__, encode_csv(User.__table__, users))
+
+    assert rows == [
+        {
+            "id": str(user["id"]),
+            "timestamp": user["timestamp"].isoformat(),
+            "username": user["username"],
+            "email": user["email"],
+            "location": user["location"],
+        }
+        for user in users
+    ]
+
+
+def test_event_data_round_trips_as_json():
+    event_data = [
+        {"item_id": str(uuid.UUID(int=1)), "note": text, "nested": {"text": [text, None]}}
+        for text in AWKWARD
+    ] + [None, {}]
+    events = [
+        {
+            "id": uuid.UUID(int=i, version=4),
+            "timestamp": datetime(2024, 5, 25, 12),
+            "customer_id": uuid.UUID(int=100, version=4),
+            "event_type": "visit",
+            "event_data": data,
+        }
+        for i, data in enumerate(event_data)
+    ]
+
+    rows = _decode(Events.__table__, encode_csv(Events.__table__, events))
+
+    assert [
+        None if row["event_data"] is None else json.loads(row["event_data"]) for row in rows
+    ] == event_data
+    assert {row["customer_id"] for row in rows} == {str(uuid.UUID(int=100, version=4))}
+
+
+def test_missing_columns_are_null():
+    buffer = encode_csv(User.__table__, [{"id": uuid.UUID(int=1, version=4)}])
+
+    assert _decode(User.__table__, buffer) == [
+        {
+            "id": str(uuid.UUID(int=1, version=4)),
+            "timestamp": None,
+            "username": None,
+            "email": None,
+            "location": None,
+        }
+    ]
@@ -0,0 +1,40 @@
+import json
+import pickle
+
+from faux.database.catalog import ProductCatalog
+from faux.simulator.sim_utils import create_simulation
+from helpers import NOW, product_rows
+
+
+def _lambda_catalog(ttl=None) -> ProductCatalog:
+    rows = product_rows()
+    return ProductCatalog(loader=lambda: rows, ttl=ttl)
+
+
+def test_pickled_catalog_is_a_snapshot():
+    catalog = _lambda_catalog(ttl=0.0).load()
+    catalog.on_refresh(lambda refreshed: None)
+
+    snapshot = pickle.loads(pickle.dumps(catalog))
+
+    assert snapshot.ids == catalog.ids
+    assert snapshot.price(catalog.ids[0]) == catalog.price(catalog.ids[0])
+    assert not snapshot.is_stale
+    assert snapshot._loader is None
+
+
+def test_pickling_loads_an_unloaded_catalog():
+    snapshot = pickle.loads(pickle.dumps(_lambda_catalog()))
+
+    assert len(snapshot) == len(product_rows())
+
+
+def test_simulation_with_workers_and_a_lambda_loader():
+    catalog = _lambda_catalog().load()
+    options = dict(n=300, seed=5, mode="batch", chunk_size=100, catalog=catalog, now=NOW)
+
+    parallel = create_simulation(workers=2, **options)
+
+    assert json.dumps(parallel, default=str) == json.dumps(
+        create_simulation(**options), default=str
+    )
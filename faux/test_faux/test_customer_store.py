@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from faux.simulator.customer_store import CUSTOMER_STATES, CustomerStore
+from faux.simulator.sim_utils import iter_simulation
+from helpers import NOW
+
+
+def _chunks(catalog, mode):
+    return list(
+        iter_simulation(
+            200,
+            chunk_size=50,
+            seed=4,
+            mode=mode,
+            catalog=catalog,
+            now=NOW,
+            compact=mode == "batch",
+        )
+    )
+
+
+def _tracked(catalog, mode="batch"):
+    store = CustomerStore(capacity=16)
+    for chunk in _chunks(catalog, mode):
+        store.add_records(chunk)
+    return store
+
+
+@pytest.mark.parametrize("mode", ["scalar", "batch"])
+def test_track_stores_every_customer(catalog, mode):
+    chunks = _chunks(catalog, mode)
+    store = CustomerStore(capacity=16)
+
+    assert list(store.track(chunks)) == chunks
+
+    assert len(store) == 200
+    assert sum(store.counts().values()) == 200
+    assert (store.records["last_session"] >= store.records["created_at"]).all()
+
+
+def test_sample_and_update_move_customers_between_states(catalog):
+    store = _tracked(catalog)
+    rng = np.random.default_rng(0)
+    counts = store.counts()
+    state = max(counts, key=counts.get)
+
+    slots = np.unique(store.sample(state, 10, rng))
+    assert (store.records["state"][slots] == CUSTOMER_STATES.index(state)).all()
+
+    store.update(slots, "success", last_session=123)
+
+    assert store.count(state) == counts[state] - len(slots)
+    assert store.count("success") == counts["success"] + len(slots)
+    assert (store.records["last_session"][slots] == 123).all()
+    assert set(store.sample("success", 1000, rng)) >= set(slots)
+
+
+def test_sample_of_an_empty_state_raises():
+    with pytest.raises(ValueError, match="No customers"):
+        CustomerStore().sample("success", 1, np.random.default_rng(0))
+
+
+@pytest.mark.parametrize("name", ["customers.bin", "customers", "customers.npy"])
+def test_save_writes_the_given_path(tmp_path, catalog, name):
+    store = _tracked(catalog)
+    path = tmp_path / name
+
+    store.save(path)
+
+    assert [file.name for file in tmp_path.iterdir()] == [name]
+    loaded = CustomerStore.load(path)
+    assert np.array_equal(loaded.records, store.records)
+    assert loaded.counts() == store.counts()
+
+    # updates of a mapped store are flushed to the same file
+    loaded.update([0], "failed")
+    loaded.save(path)
+    reloaded = CustomerStore.load(path, mmap_mode=None)
+    assert reloaded.records["state"][0] == CUSTOMER_STATES.index("failed")
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from faux.simulator.sim_utils import create_simulation, iter_simulation
+from helpers import NOW
+
+MODES = ["scalar", "batch"]
+
+
+def _dump(records):
+    return json.dumps(records, sort_keys=True, default=str)
+
+
+def _simulation(catalog, mode, **options):
+    return create_simulation(
+        400, seed=7, mode=mode, chunk_size=100, catalog=catalog, now=NOW, **options
+    )
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_same_seed_gives_the_same_simulation(catalog, mode):
+    assert _dump(_simulation(catalog, mode)) == _dump(_simulation(catalog, mode))
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_workers_give_the_same_simulation(catalog, mode):
+    single = _simulation(catalog, mode, workers=1)
+
+    assert _dump(_simulation(catalog, mode, workers=4)) == _dump(single)
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("num_shards", [2, 3, 7])
+def test_shards_add_up_to_the_unsharded_simulation(catalog, mode, num_shards):
+    unsharded = _simulation(catalog, mode)
+
+    shards = [
+        _simulation(catalog, mode, shard=shard, num_shards=num_shards)
+        for shard in range(num_shards)
+    ]
+
+    assert _dump(sum(shards, [])) == _dump(unsharded)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_sharded_workers_give_the_same_shard(catalog, mode):
+    shard = _simulation(catalog, mode, shard=1, num_shards=2)
+
+    assert _dump(_simulation(catalog, mode, shard=1, num_shards=2, workers=4)) == _dump(shard)
+
+
+def test_compact_batches_give_the_same_records(catalog):
+    batches = iter_simulation(
+        400, seed=7, mode="batch", chunk_size=100, catalog=catalog, now=NOW, compact=True
+    )
+
+    records = [record for batch in batches for record in batch.to_records()]
+
+    assert _dump(records) == _dump(_simulation(catalog, "batch"))
@@ -0,0 +1,64 @@
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from faux.core import encoding
+from faux.simulator.sim_utils import iter_simulation
+from faux.sinks.ndjson import NdjsonFileSink
+from helpers import NOW
+
+pytest.importorskip("orjson")
+
+MODES = ["scalar", "batch"]
+
+
+def _records(catalog, mode, dump_mode):
+    chunks = iter_simulation(
+        200, seed=7, mode=mode, chunk_size=100, catalog=catalog, now=NOW, dump_mode=dump_mode
+    )
+    return [record for chunk in chunks for record in chunk]
+
+
+def _stdlib(monkeypatch, function, *args):
+    with monkeypatch.context() as patched:
+        patched.setattr(encoding, "orjson", None)
+        return function(*args)
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("dump_mode", ["json", "python"])
+def test_orjson_and_stdlib_write_the_same_lines(catalog, monkeypatch, mode, dump_mode):
+    records = _records(catalog, mode, dump_mode)
+
+    assert encoding.dumps_lines(records) == _stdlib(monkeypatch, encoding.dumps_lines, records)
+
+
+def test_orjson_and_stdlib_write_the_same_values(monkeypatch):
+    value = {
+        "id": uuid.UUID(int=1, version=4),
+        "whole_second": datetime(2024, 5, 25, 12),
+        "microseconds": datetime(2024, 5, 25, 12, 0, 0, 1000),
+        "numpy": [np.int64(3), np.float64(0.1), np.bool_(True)],
+        "text": 'Zoë "quoted" \\ \n\t ',
+        "nested": {"none": None, "list": [1, 2.5, "x"]},
+    }
+
+    assert encoding.dumps(value) == _stdlib(monkeypatch, encoding.dumps, value)
+    assert encoding.dumps_str(value) == _stdlib(monkeypatch, encoding.dumps_str, value)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_python_records_write_the_json_records(catalog, tmp_path, mode):
+    with NdjsonFileSink(tmp_path) as sink:
+        if mode == "batch":
+            for chunk in iter_simulation(
+                200, seed=7, mode=mode, chunk_size=100, catalog=catalog, now=NOW, compact=True
+            ):
+                sink.write(chunk)
+        else:
+            sink.write(_records(catalog, mode, "python"))
+
+    lines = sink.path.read_bytes().splitlines()
+    assert [encoding.loads(line) for line in lines] == _records(catalog, mode, "json")
@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+
+from faux.bus.event_bus import EventBus, chunk_messages
+from faux.bus.subscribers import MessageCounter, NdjsonTopicWriter
+from faux.core.encoding import loads
+from faux.core.metrics import Metrics
+from faux.simulator.sim_utils import iter_simulation
+from faux.sinks.bus import EventBusSink
+from helpers import NOW
+
+# long enough that a batch is never handed over because of its linger
+NEVER = 60.0
+TIMEOUT = 5.0
+
+
+class Recorder:
+    """
+    A handler that records its batches and signals once it received `expected` messages.
+    """
+
+    def __init__(self, expected=None):
+        self.batches = []
+        self.expected = expected
+        self.received = threading.Event()
+
+    def __call__(self, topic, messages):
+        self.batches.append((topic, list(messages)))
+        if sum(len(batch) for _, batch in self.batches) == self.expected:
+            self.received.set()
+
+
+def test_batches_by_size():
+    recorder = Recorder(expected=6)
+    bus = EventBus(batch_size=3, linger=NEVER)
+    bus.subscribe(recorder)
+
+    bus.publish("visit", list(range(7)))
+
+    assert recorder.received.wait(TIMEOUT)
+    assert recorder.batches == [("visit", [0, 1, 2]), ("visit", [3, 4, 5])]
+    bus.close()
+    assert recorder.batches[-1] == ("visit", [6])
+
+
+def test_lingering_batch_is_flushed():
+    recorder = Recorder(expected=2)
+    bus = EventBus(batch_size=100, linger=0.01)
+    bus.subscribe(recorder)
+
+    bus.publish("visit", [0, 1])
+
+    # the batch is neither full nor closed, only its linger hands it over
+    assert recorder.received.wait(TIMEOUT)
+    assert recorder.batches == [("visit", [0, 1])]
+    bus.close()
+
+
+def test_subscriptions_only_receive_their_topics():
+    checkouts, everything = Recorder(), Recorder()
+    with EventBus(linger=NEVER) as bus:
+        bus.subscribe(checkouts, topics=("checkout",))
+        bus.subscribe(everything)
+        bus.publish("visit", [0])
+        bus.publish("checkout", [1])
+
+    assert checkouts.batches == [("checkout", [1])]
+    assert sorted(everything.batches) == [("checkout", [1]), ("visit", [0])]
+
+
+def test_publisher_blocks_on_a_full_buffer():
+    entered, release = threading.Event(), threading.Event()
+
+    def blocking_handler(topic, messages):
+        entered.set()
+        release.wait(TIMEOUT)
+
+    bus = EventBus(batch_size=1, linger=0, buffer_size=2)
+    bus.subscribe(blocking_handler)
+    bus.publish("visit", [0])
+    assert entered.wait(TIMEOUT)
+    # the handler holds the first message, the buffer fills up with the next two
+    bus.publish("visit", [1, 2])
+
+    publisher = threading.Thread(target=bus.publish, args=("visit", [3]))
+    publisher.start()
+    publisher.join(0.2)
+    assert publisher.is_alive()
+
+    release.set()
+    publisher.join(TIMEOUT)
+    assert not publisher.is_alive()
+    bus.close()
+
+
+def _failing_handler(topic, messages):
+    raise ValueError(topic)
+
+
+def test_handler_error_is_raised_by_the_next_publish_and_close():
+    bus = EventBus(batch_size=1)
+    bus.subscribe(_failing_handler)
+    bus.publish("visit", [0])
+    assert bus._failed.wait(TIMEOUT)
+
+    with pytest.raises(ValueError, match="visit"):
+        bus.publish("visit", [1])
+    with pytest.raises(ValueError, match="visit"):
+        bus.close()
+
+
+def test_handler_error_is_raised_by_close():
+    bus = EventBus(batch_size=100, linger=NEVER)
+    bus.subscribe(_failing_handler)
+    bus.publish("checkout", [0])
+
+    # the batch is only handed over, and fails, when the bus is closed
+    with pytest.raises(ValueError, match="checkout"):
+        bus.close()
+
+
+def test_sink_fans_out_a_simulation(tmp_path, catalog):
+    chunks = list(
+        iter_simulation(
+            300, chunk_size=100, seed=2, mode="batch", catalog=catalog, now=NOW, compact=True
+        )
+    )
+    counters = Metrics()
+    bus = EventBus(batch_size=64)
+    bus.subscribe(NdjsonTopicWriter(tmp_path))
+    bus.subscribe(MessageCounter(counters))
+
+    with EventBusSink(bus) as sink:
+        sink.write_all(chunks)
+
+    expected = {}
+    for chunk in chunks:
+        for topic, messages in chunk_messages(chunk).items():
+            expected[topic] = expected.get(topic, 0) + len(messages)
+    assert sink.published == sum(expected.values())
+    for topic, count in expected.items():
+        [path] = (tmp_path / topic).iterdir()
+        assert len([loads(line) for line in path.read_bytes().splitlines()]) == count
+        assert counters.counters[f"{topic}_messages"] == count
@@ -0,0 +1,40 @@
+import itertools
+
+from faux.core.identity import IdentityPool
+
+
+def _pool(first_names, last_names, namespace="") -> IdentityPool:
+    pool = IdentityPool.__new__(IdentityPool)
+    pool.first_names = tuple(first_names)
+    pool.last_names = tuple(last_names)
+    pool.domains = ("example.com",)
+    pool.cities = ("Lagos",)
+    pool.namespace = namespace
+    return pool
+
+
+def test_usernames_are_unique_over_adversarial_names():
+    # names that are prefixes of each other or end in base36 digits, so any
+    # index suffix could be read as part of a name
+    pool = _pool(["megan", "megang", "m", "me"], ["green", "greene", "e0", "e", "0", "1z"])
+    owners = {}
+    for index, first, last in itertools.product(
+        range(1500), range(len(pool.first_names)), range(len(pool.last_names))
+    ):
+        identity = pool.compose(index, first, last, 0, 0)
+        # the same customer index may compose the same name twice, two indexes never
+        assert owners.setdefault(identity.username, index) == index, identity.username
+        assert owners.setdefault(identity.email, index) == index, identity.email
+
+
+def test_reported_collision_is_gone():
+    pool = _pool(["megan"], ["green", "greene"])
+    assert pool.compose(504, 0, 0, 0, 0).username != pool.compose(0, 0, 1, 0, 0).username
+
+
+def test_namespace_is_delimited():
+    # index 1 in namespace '1' against index 37, '11' in base36, without one
+    first = _pool(["x"], ["y"], namespace="1").compose(1, 0, 0, 0, 0)
+    second = _pool(["x"], ["y"]).compose(37, 0, 0, 0, 0)
+    assert first.username != second.username
+    assert first.email != second.email
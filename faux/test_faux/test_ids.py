@@ -0,0 +1,104 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from pydantic import TypeAdapter, ValidationError
+
+from faux.core.ids import make_uuid, random_uuid_bytes
+from faux.core.models import FauxId
+from faux.simulator.clock import US_PER_MS, to_epoch_us
+from helpers import NOW
+
+
+def _millis(value: uuid.UUID) -> int:
+    # the top 48 bits of a version 7 UUID
+    return value.int >> 80
+
+
+def _uuids(raw: np.ndarray) -> list[uuid.UUID]:
+    return [uuid.UUID(bytes=row.tobytes()) for row in raw]
+
+
+@pytest.mark.parametrize("version", [4, 7])
+def test_make_uuid_sets_the_version_and_variant(version):
+    rng = random.Random(1)
+
+    for _ in range(100):
+        value = make_uuid(rng.getrandbits(128), NOW, version)
+
+        assert value.version == version
+        assert value.variant == uuid.RFC_4122
+
+
+@pytest.mark.parametrize("version", [4, 7])
+def test_random_uuid_bytes_sets_the_version_and_variant(version):
+    epoch_us = np.full(100, to_epoch_us(NOW), dtype=np.int64)
+
+    raw = random_uuid_bytes(np.random.default_rng(1), 100, epoch_us, version)
+
+    assert raw.shape == (100, 16)
+    assert {value.version for value in _uuids(raw)} == {version}
+    assert {value.variant for value in _uuids(raw)} == {uuid.RFC_4122}
+
+
+def test_make_uuid_starts_with_its_creation_time():
+    created_at = datetime(2024, 5, 25, 12, 34, 56, 789999)
+
+    value = make_uuid(random.Random(1).getrandbits(128), created_at, 7)
+
+    assert _millis(value) == to_epoch_us(created_at) // US_PER_MS
+    assert _millis(value) == to_epoch_us(datetime(2024, 5, 25, 12, 34, 56, 789000)) // US_PER_MS
+
+
+def test_random_uuid_bytes_start_with_their_creation_times():
+    epoch_us = to_epoch_us(NOW) + np.arange(0, 10_000_000, 123_457, dtype=np.int64)
+
+    raw = random_uuid_bytes(np.random.default_rng(1), len(epoch_us), epoch_us, 7)
+
+    assert [_millis(value) for value in _uuids(raw)] == (epoch_us // US_PER_MS).tolist()
+
+
+def test_ids_sort_by_creation_time():
+    rng = random.Random(2)
+    # ids of the same millisecond are in random order, the times are a millisecond apart
+    times = sorted({NOW + timedelta(milliseconds=rng.randint(1, 10**9)) for _ in range(200)})
+    shuffled = random.Random(3).sample(times, len(times))
+    epoch_us = np.array([to_epoch_us(time) for time in shuffled], dtype=np.int64)
+
+    made = {make_uuid(rng.getrandbits(128), time, 7): time for time in shuffled}
+    raw = random_uuid_bytes(np.random.default_rng(2), len(shuffled), epoch_us, 7)
+    drawn = dict(zip(_uuids(raw), shuffled))
+
+    assert [made[value] for value in sorted(made)] == times
+    assert [drawn[value] for value in sorted(drawn)] == times
+
+
+def test_version_4_doesnt_need_a_creation_time():
+    assert make_uuid(random.Random(1).getrandbits(128), None, 4).version == 4
+    assert _uuids(random_uuid_bytes(np.random.default_rng(1), 1))[0].version == 4
+
+
+@pytest.mark.parametrize("version", [1, 3, 5, 6, 8])
+def test_unsupported_version_raises(version):
+    with pytest.raises(ValueError, match="Unsupported UUID version"):
+        make_uuid(0, NOW, version)
+    with pytest.raises(ValueError, match="Unsupported UUID version"):
+        random_uuid_bytes(np.random.default_rng(1), 1, np.zeros(1, dtype=np.int64), version)
+
+
+def test_faux_id_accepts_versions_4_and_7():
+    adapter = TypeAdapter(FauxId)
+    bits = random.Random(1).getrandbits(128)
+
+    for version in (4, 7):
+        value = make_uuid(bits, NOW, version)
+        assert adapter.validate_python(value) == value
+        assert adapter.validate_python(str(value)) == value
+
+
+@pytest.mark.parametrize("value", [uuid.uuid1(), uuid.uuid3(uuid.NAMESPACE_DNS, "faux")])
+def test_faux_id_rejects_other_versions(value):
+    with pytest.raises(ValidationError, match="is not one of"):
+        TypeAdapter(FauxId).validate_python(value)
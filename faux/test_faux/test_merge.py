@@ -0,0 +1,209 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, MetaData, String, Table, create_engine, select, text
+
+from faux.core.metrics import Metrics
+from faux.database.bulk import merge_rows, staging_table
+from helpers import TEST_SCHEMA
+
+DAY = datetime(2024, 5, 25)
+
+
+def _users(metadata):
+    return Table(
+        "users",
+        metadata,
+        Column("id", String, primary_key=True),
+        Column("username", String),
+        Column("email", String),
+    )
+
+
+def _events(metadata, **options):
+    # the primary key of the events table when it is partitioned on timestamp
+    return Table(
+        "events",
+        metadata,
+        Column("id", String, primary_key=True),
+        Column("timestamp", DateTime, primary_key=True),
+        Column("event_type", String),
+        **options,
+    )
+
+
+def _user_rows(suffix=""):
+    return [
+        {"id": str(uuid.UUID(int=i)), "username": f"user{i}{suffix}", "email": f"{i}@x{suffix}"}
+        for i in range(5)
+    ]
+
+
+def _event_rows(event_type="visit"):
+    ids = [str(uuid.UUID(int=i)) for i in range(3)]
+    # the same id at two timestamps is two rows of a partitioned table
+    return [
+        {"id": event_id, "timestamp": DAY + timedelta(days=days), "event_type": event_type}
+        for event_id in ids
+        for days in (0, 1)
+    ]
+
+
+def _rows(connection, table):
+    return sorted(tuple(row) for row in connection.execute(select(table)))
+
+
+@pytest.fixture
+def sqlite_tables():
+    metadata = MetaData()
+    users, events = _users(metadata), _events(metadata)
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        yield connection, users, events
+
+
+@pytest.fixture
+def postgres_tables(postgres):
+    """
+    The tables in a throwaway schema of the configured database, with events
+    range partitioned on timestamp.
+    """
+    engine = postgres
+    schema = f"faux_test_{uuid.uuid4().hex[:8]}"
+    metadata = MetaData(schema=schema)
+    users = _users(metadata)
+    events = _events(metadata, postgresql_partition_by="RANGE (timestamp)")
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE SCHEMA {schema}"))
+        metadata.create_all(connection)
+        connection.execute(
+            text(
+                f"CREATE TABLE {schema}.events_default PARTITION OF {schema}.events DEFAULT"
+            )
+        )
+    try:
+        with engine.begin() as connection:
+            yield connection, users, events
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def tables(request):
+    return request.getfixturevalue(f"{request.param}_tables")
+
+
+def test_merging_the_same_rows_twice_skips_them(tables):
+    connection, users, events = tables
+
+    assert merge_rows(connection, users, _user_rows()) == 5
+    assert merge_rows(connection, events, _event_rows()) == 6
+    assert merge_rows(connection, users, _user_rows()) == 0
+    assert merge_rows(connection, events, _event_rows()) == 0
+
+    assert _rows(connection, users) == sorted(tuple(row.values()) for row in _user_rows())
+    assert len(_rows(connection, events)) == 6
+
+
+def test_nothing_keeps_and_update_overwrites_existing_rows(tables):
+    connection, users, events = tables
+    merge_rows(connection, users, _user_rows())
+    merge_rows(connection, events, _event_rows())
+
+    merge_rows(connection, users, _user_rows("-changed"), action="nothing")
+    assert _rows(connection, users) == sorted(tuple(row.values()) for row in _user_rows())
+
+    merge_rows(connection, users, _user_rows("-changed"), action="update")
+    merge_rows(connection, events, _event_rows("checkout"), action="update")
+
+    assert _rows(connection, users) == sorted(
+        tuple(row.values()) for row in _user_rows("-changed")
+    )
+    assert {row.event_type for row in connection.execute(select(events))} == {"checkout"}
+    assert len(_rows(connection, events)) == 6
+
+
+def test_staging_table_is_emptied_after_every_merge(postgres_tables):
+    connection, users, _ = postgres_tables
+    merge_rows(connection, users, _user_rows())
+    merge_rows(connection, users, _user_rows()[:2])
+
+    staging = staging_table(users)
+    assert connection.execute(select(staging)).all() == []
+    assert len(_rows(connection, users)) == 5
+
+
+def test_unsupported_action_raises(sqlite_tables):
+    connection, users, _ = sqlite_tables
+
+    with pytest.raises(ValueError, match="Unsupported merge action"):
+        merge_rows(connection, users, _user_rows(), action="replace")
+
+
+@pytest.fixture
+def merge_metrics(monkeypatch):
+    """
+    The metrics of `_merge_rows`, which writes to the faux tables in SQLite.
+    """
+    from faux.database import db_utils
+    from faux.database.base import Base
+
+    # SQLite has no schemas, the tables are created without one
+    engine = create_engine(
+        "sqlite://", execution_options={"schema_translate_map": {TEST_SCHEMA: None}}
+    )
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(db_utils, "get_engine", lambda: engine)
+    monkeypatch.setattr(db_utils, "metrics", Metrics())
+    yield db_utils.metrics
+    engine.dispose()
+
+
+def _faux_rows():
+    users = [
+        {
+            "id": uuid.UUID(int=i),
+            "timestamp": DAY,
+            "username": f"user{i}",
+            "email": f"{i}@x",
+            "location": "Lagos",
+        }
+        for i in range(3)
+    ]
+    events = [
+        {
+            "id": uuid.UUID(int=10 + i),
+            "timestamp": DAY,
+            "customer_id": users[0]["id"],
+            "event_type": "visit",
+            "event_data": {"browser": "Firefox"},
+        }
+        for i in range(2)
+    ]
+    return users, events
+
+
+def test_merging_counts_the_skipped_rows(merge_metrics):
+    from faux.database.db_utils import _merge_rows
+
+    users, events = _faux_rows()
+    _merge_rows(users, events, "nothing")
+    assert merge_metrics.counters["rows_skipped"] == 0
+
+    _merge_rows(users, events, "nothing")
+    assert merge_metrics.counters["rows_skipped"] == 5
+
+
+def test_unknown_rowcount_skips_the_metric(merge_metrics, monkeypatch):
+    from faux.database import db_utils
+
+    # one rowcount is known and the other isn't
+    rowcounts = iter([3, -1])
+    monkeypatch.setattr(db_utils, "merge_rows", lambda *args: next(rowcounts))
+
+    db_utils._merge_rows(*_faux_rows(), "nothing")
+
+    assert "rows_skipped" not in merge_metrics.counters
@@ -0,0 +1,189 @@
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, select, text
+
+from faux.database.partitions import RangePartitions, next_period, period_start
+from helpers import TEST_SCHEMA
+
+
+def _table(name="events", schema=None):
+    return Table(
+        name,
+        MetaData(schema=schema),
+        Column("id", String, primary_key=True),
+        Column("timestamp", DateTime, primary_key=True),
+        postgresql_partition_by="RANGE (timestamp)",
+    )
+
+
+@pytest.mark.parametrize(
+    "value, granularity, start",
+    [
+        (date(2024, 5, 25), "day", date(2024, 5, 25)),
+        (datetime(2024, 5, 25, 23, 59), "day", date(2024, 5, 25)),
+        ("2024-05-25T23:59:59.999999", "day", date(2024, 5, 25)),
+        (date(2024, 5, 25), "month", date(2024, 5, 1)),
+        ("2024-12-31T12:00:00", "month", date(2024, 12, 1)),
+    ],
+)
+def test_period_start(value, granularity, start):
+    assert period_start(value, granularity) == start
+
+
+@pytest.mark.parametrize(
+    "start, granularity, following",
+    [
+        (date(2024, 5, 31), "day", date(2024, 6, 1)),
+        (date(2024, 12, 31), "day", date(2025, 1, 1)),
+        (date(2024, 1, 1), "month", date(2024, 2, 1)),
+        (date(2024, 2, 1), "month", date(2024, 3, 1)),
+        (date(2024, 12, 1), "month", date(2025, 1, 1)),
+    ],
+)
+def test_next_period(start, granularity, following):
+    assert next_period(start, granularity) == following
+
+
+def test_unsupported_granularity_raises():
+    with pytest.raises(ValueError, match="Unsupported partition granularity"):
+        RangePartitions(_table(), "week")
+    with pytest.raises(ValueError, match="Unsupported partition granularity"):
+        period_start(date(2024, 5, 25), "week")
+
+
+@pytest.mark.parametrize(
+    "granularity, start, name",
+    [
+        ("day", date(2024, 5, 25), "events_p20240525"),
+        ("month", date(2024, 5, 1), "events_p202405"),
+    ],
+)
+def test_partition_names_round_trip(granularity, start, name):
+    partitions = RangePartitions(_table(), granularity)
+
+    assert partitions.partition_name(start) == name
+    assert partitions._parse_name(name) == start
+    assert partitions._parse_name("events_default") is None
+    assert partitions._parse_name("users_p20240525") is None
+
+
+def test_periods_cover_both_ends():
+    days = RangePartitions(_table(), "day")
+    months = RangePartitions(_table(), "month")
+
+    assert list(days.periods(datetime(2024, 2, 28, 23), "2024-03-01T00:30:00")) == [
+        date(2024, 2, 28),
+        date(2024, 2, 29),
+        date(2024, 3, 1),
+    ]
+    assert list(months.periods(date(2024, 11, 15), date(2025, 1, 2))) == [
+        date(2024, 11, 1),
+        date(2024, 12, 1),
+        date(2025, 1, 1),
+    ]
+    assert list(days.periods(date(2024, 5, 25), date(2024, 5, 24))) == []
+
+
+@pytest.fixture
+def partitioned(postgres):
+    """
+    A table range partitioned on timestamp in a throwaway schema.
+    """
+    schema = f"faux_test_{uuid.uuid4().hex[:8]}"
+    table = _table(schema=schema)
+    with postgres.begin() as connection:
+        connection.execute(text(f"CREATE SCHEMA {schema}"))
+        table.metadata.create_all(connection)
+    try:
+        yield table
+    finally:
+        with postgres.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+
+def test_ensure_creates_the_missing_partitions(postgres, partitioned):
+    partitions = RangePartitions(partitioned, "day")
+    assert partitions.is_partitioned(postgres)
+
+    partitions.ensure(postgres, datetime(2024, 5, 24, 23), datetime(2024, 5, 26, 1))
+    partitions.ensure(postgres, date(2024, 5, 25), date(2024, 5, 27))
+    # a new instance finds the partitions another one created
+    RangePartitions(partitioned, "day").ensure(postgres, date(2024, 5, 24), date(2024, 5, 27))
+
+    assert list(partitions.partitions(postgres)) == [
+        date(2024, 5, 24),
+        date(2024, 5, 25),
+        date(2024, 5, 26),
+        date(2024, 5, 27),
+    ]
+    with postgres.begin() as connection:
+        connection.execute(
+            partitioned.insert().values(id="a", timestamp=datetime(2024, 5, 27, 23, 59))
+        )
+
+
+def test_ensure_upcoming_and_drop_before(postgres, partitioned):
+    partitions = RangePartitions(partitioned, "month")
+
+    partitions.ensure_upcoming(postgres, 2, today=date(2024, 11, 15))
+    partitions.ensure(postgres, date(2024, 9, 1), date(2024, 9, 1))
+    assert list(partitions.partitions(postgres)) == [
+        date(2024, 9, 1),
+        date(2024, 11, 1),
+        date(2024, 12, 1),
+        date(2025, 1, 1),
+    ]
+
+    # November is only partly before the cutoff and is kept
+    dropped = partitions.drop_before(postgres, datetime(2024, 11, 20))
+
+    assert dropped == ["events_p202409"]
+    assert list(partitions.partitions(postgres)) == [
+        date(2024, 11, 1),
+        date(2024, 12, 1),
+        date(2025, 1, 1),
+    ]
+    # a dropped partition is created again when it is needed
+    partitions.ensure(postgres, date(2024, 9, 5), date(2024, 9, 5))
+    assert date(2024, 9, 1) in partitions.partitions(postgres)
+
+
+@pytest.mark.parametrize("mode", ["orm", "copy"])
+def test_write_rows_creates_the_partitions_of_its_events(database, monkeypatch, mode):
+    from faux.database import db_utils
+    from faux.database.db_models import Events
+
+    # the events table as FAUX_EVENTS_PARTITION_BY=day creates it
+    table = f"{TEST_SCHEMA}.events"
+    with database.begin() as connection:
+        connection.execute(text(f"DROP TABLE {table}"))
+        connection.execute(
+            text(
+                f"CREATE TABLE {table} (id uuid, timestamp timestamp, customer_id uuid, "
+                "event_type varchar, event_data jsonb, PRIMARY KEY (id, timestamp)) "
+                "PARTITION BY RANGE (timestamp)"
+            )
+        )
+    partitions = RangePartitions(Events.__table__, "day")
+    monkeypatch.setattr(db_utils, "events_partitions", partitions)
+    customer_id = uuid.uuid4()
+    events = [
+        {
+            "id": uuid.uuid4(),
+            "timestamp": datetime(2024, 5, 23, 22) + timedelta(hours=12 * i),
+            "customer_id": customer_id,
+            "event_type": "visit",
+            "event_data": {"browser": "Firefox"},
+        }
+        for i in range(6)
+    ]
+
+    db_utils.write_rows([], events, mode)
+
+    assert list(partitions.partitions(database)) == [
+        date(2024, 5, 23) + timedelta(days=i) for i in range(4)
+    ]
+    with database.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(Events)).scalar() == 6
@@ -0,0 +1,204 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from faux.database import queries
+from faux.database.base import Base
+from faux.database.db_models import Events, User
+from faux.database.queries import (
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    fetch_events,
+    fetch_users,
+    iter_pages,
+)
+from helpers import TEST_SCHEMA
+
+START = datetime(2024, 5, 25)
+EVENT_TYPES = ("visit", "add_to_cart", "checkout")
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _users():
+    rng = random.Random(1)
+    # many users share each timestamp, so the pages split runs of tied rows
+    return [
+        {
+            "id": _uuid(rng),
+            "timestamp": START + timedelta(seconds=i % 4),
+            "username": f"user{i}",
+            "email": f"user{i}@example.com",
+            "location": "Lagos",
+        }
+        for i in range(23)
+    ]
+
+
+def _events(users):
+    rng = random.Random(2)
+    return [
+        {
+            "id": _uuid(rng),
+            "timestamp": START + timedelta(minutes=i % 5),
+            "customer_id": users[i % 3]["id"],
+            "event_type": EVENT_TYPES[i % 3],
+            "event_data": {"status": "success" if i % 2 else "failed"},
+        }
+        for i in range(40)
+    ]
+
+
+def _ordered(rows):
+    return sorted(rows, key=lambda row: (row["timestamp"], row["id"]))
+
+
+def _fill(engine):
+    users = _users()
+    events = _events(users)
+    with engine.begin() as connection:
+        connection.execute(insert(User), users)
+        connection.execute(insert(Events), events)
+    return users, events
+
+
+@pytest.fixture
+def sqlite_rows(monkeypatch):
+    # SQLite has no schemas, the tables are created without one
+    engine = create_engine(
+        "sqlite://", execution_options={"schema_translate_map": {TEST_SCHEMA: None}}
+    )
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(queries, "get_session", lambda: Session(engine))
+    yield _fill(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def postgres_rows(database):
+    return _fill(database)
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def rows(request):
+    return request.getfixturevalue(f"{request.param}_rows")
+
+
+def _paged(fetch, **filters):
+    pages = list(iter_pages(fetch, **filters))
+    assert pages[-1].next_cursor is None
+    assert all(page.next_cursor is not None for page in pages[:-1])
+    return [row for page in pages for row in page.rows], pages
+
+
+@pytest.mark.parametrize("limit", [1, 4, 23, 24, MAX_PAGE_SIZE])
+def test_pages_return_every_row_once_in_order(rows, limit):
+    users, _ = rows
+
+    fetched, pages = _paged(fetch_users, limit=limit)
+
+    assert [row["id"] for row in fetched] == [row["id"] for row in _ordered(users)]
+    assert len(pages) == max(1, -(-len(users) // limit))
+    assert all(len(page.rows) == limit for page in pages[:-1])
+
+
+def test_cursor_continues_after_the_last_row_of_a_page(rows):
+    users, _ = rows
+    first = fetch_users(limit=5)
+
+    second = fetch_users(cursor=first.next_cursor, limit=5)
+
+    last = first.rows[-1]
+    assert decode_cursor(first.next_cursor) == (last["timestamp"], last["id"])
+    assert [row["id"] for row in second.rows] == [
+        row["id"] for row in _ordered(users)[5:10]
+    ]
+
+
+def test_user_time_filters(rows):
+    users, _ = rows
+    start, end = START + timedelta(seconds=1), START + timedelta(seconds=3)
+
+    fetched, _ = _paged(fetch_users, start=start, end=end, limit=3)
+
+    expected = [row for row in users if start <= row["timestamp"] < end]
+    assert [row["id"] for row in fetched] == [row["id"] for row in _ordered(expected)]
+
+
+EVENT_FILTERS = {
+    "start": ({}, lambda event: True),
+    "end": (
+        {"end": START + timedelta(minutes=2)},
+        lambda event: event["timestamp"] < START + timedelta(minutes=2),
+    ),
+    "event_type": ({"event_type": "checkout"}, lambda event: event["event_type"] == "checkout"),
+    "customer_id": (
+        {"customer_id": _users()[1]["id"]},
+        lambda event: event["customer_id"] == _users()[1]["id"],
+    ),
+}
+
+
+@pytest.mark.parametrize("name", EVENT_FILTERS)
+def test_event_filters(rows, name):
+    _, events = rows
+    filters, matches = EVENT_FILTERS[name]
+
+    fetched, _ = _paged(fetch_events, start=START, limit=7, **filters)
+
+    expected = [event for event in events if matches(event)]
+    assert expected
+    assert [row["id"] for row in fetched] == [row["id"] for row in _ordered(expected)]
+
+
+def test_event_data_filter(postgres_rows):
+    _, events = postgres_rows
+
+    fetched, _ = _paged(
+        fetch_events, start=START, data_contains={"status": "success"}, limit=6
+    )
+
+    expected = [event for event in events if event["event_data"]["status"] == "success"]
+    assert [row["id"] for row in fetched] == [row["id"] for row in _ordered(expected)]
+
+
+def test_cursor_round_trip():
+    timestamp, row_id = datetime(2024, 5, 25, 1, 2, 3, 456789), uuid.uuid4()
+
+    cursor = encode_cursor(timestamp, row_id)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, row_id)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor",
+        encode_cursor(START, uuid.UUID(int=1)) + "x",
+        encode_cursor(START, uuid.UUID(int=1))[:-4],
+        "_-8",
+    ],
+)
+def test_malformed_cursor_raises(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_malformed_cursor_is_rejected_before_querying():
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        fetch_users(cursor="bm90IGEgY3Vyc29y")
+
+
+@pytest.mark.parametrize("limit", [0, -1, MAX_PAGE_SIZE + 1])
+def test_limit_bounds(limit):
+    with pytest.raises(ValueError, match="limit must be between"):
+        fetch_users(limit=limit)
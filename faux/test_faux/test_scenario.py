@@ -0,0 +1,142 @@
+import json
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import faux
+from faux.simulator.scenario import DEFAULT_SCENARIO, Distribution, Scenario
+from faux.simulator.sim_utils import create_simulation
+from helpers import NOW
+
+SCENARIOS_DIR = Path(faux.__file__).parent / "config/scenarios"
+SCENARIOS = sorted(SCENARIOS_DIR.glob("*.json"))
+
+
+def test_distribution_is_cumulative():
+    distribution = Distribution.from_weights({"a": 1, "b": 0, "c": 3})
+
+    assert distribution.values == ("a", "b", "c")
+    assert distribution.cumulative == pytest.approx((0.25, 0.25, 1.0))
+
+
+def test_distribution_draws_follow_the_weights():
+    distribution = Distribution.from_weights({"a": 1, "b": 0, "c": 3})
+    rng = random.Random(1)
+
+    draws = [distribution.sample(rng) for _ in range(20_000)]
+    array = distribution.sample_array(np.random.default_rng(1), 20_000)
+
+    for drawn in (draws, list(array)):
+        assert "b" not in drawn
+        assert drawn.count("a") / len(drawn) == pytest.approx(0.25, abs=0.02)
+
+
+def test_distribution_never_draws_a_trailing_zero_weight():
+    # the last positive weight is drawn even when rounding leaves its cumulative
+    # probability below the uniform draw
+    distribution = Distribution((1, 2, 3), (0.1, 0.2, 0.0))
+    distribution.cumulative = (0.3, 0.9, 0.9)
+
+    class AlmostOne:
+        def random(self):
+            return 0.95
+
+    assert distribution.sample(AlmostOne()) == 2
+    assert distribution.sample_indexes(np.random.default_rng(1), 1000).max() == 1
+
+
+@pytest.mark.parametrize(
+    "values, weights, message",
+    [
+        ((), (), "one weight for every value"),
+        ((1, 2), (1,), "one weight for every value"),
+        ((1, 2), (1, -1), "can't be negative"),
+        ((1, 2), (0, 0), "must be positive"),
+    ],
+)
+def test_invalid_distribution_raises(values, weights, message):
+    with pytest.raises(ValueError, match=message):
+        Distribution(values, weights)
+
+
+@pytest.mark.parametrize("probability", [-0.1, 1.5])
+def test_invalid_probability_raises(probability):
+    with pytest.raises(ValueError, match="Probability must be between 0 and 1"):
+        Distribution.bernoulli(probability)
+
+
+def test_from_dict_keeps_the_defaults_and_parses_count_keys():
+    scenario = Scenario.from_dict({"visits": {"1": 3, "2": 1}, "abandon_probability": 0.2})
+
+    assert scenario.visits == {1: 3, 2: 1}
+    assert scenario.abandon_probability == 0.2
+    assert scenario.picks == DEFAULT_SCENARIO.picks
+    assert scenario.compiled.visits.values == (1, 2)
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        ({"visit": {"1": 1}}, "Unknown scenario fields"),
+        ({"history_probability": 1.2}, "Probability must be between 0 and 1"),
+        ({"remove_probability": -0.5}, "Probability must be between 0 and 1"),
+        ({"visits": {"1": -1, "2": 1}}, "can't be negative"),
+        ({"picks": {"1": 0, "2": 0}}, "must be positive"),
+        ({"visits": {"0": 1, "1": 1}}, "must be at least 1"),
+        ({"picks": {"-1": 1}}, "Counts can't be negative"),
+        ({"event_gap_seconds": {"0": 1}}, "event gaps must be at least 1"),
+        ({"checkout_statuses": {"success": 1, "refunded": 1}}, "Unsupported checkout statuses"),
+        ({"checkout_statuses": {"success": 0}}, "must be positive"),
+    ],
+)
+def test_from_dict_rejects_invalid_scenarios(data, message):
+    with pytest.raises(ValueError, match=message):
+        Scenario.from_dict(data)
+
+
+def test_load_reads_a_json_file(tmp_path):
+    path = tmp_path / "scenario.json"
+    path.write_text(json.dumps({"picks": {"0": 1}, "history_probability": 0}))
+
+    scenario = Scenario.load(path)
+
+    assert scenario == Scenario(picks={0: 1}, history_probability=0)
+
+
+def test_compiled_is_kept_with_the_scenario():
+    scenario = Scenario(visits={1: 1})
+
+    assert scenario.compiled is scenario.compiled
+    assert scenario.compiled.checkout_statuses.values == ("success", "failed", "cancelled")
+
+
+@pytest.mark.parametrize("path", SCENARIOS, ids=lambda path: path.stem)
+def test_bundled_scenarios_compile(path):
+    compiled = Scenario.load(path).compiled
+
+    for name, distribution in compiled._asdict().items():
+        cumulative = np.asarray(distribution.cumulative)
+        assert np.all(np.diff(cumulative) >= 0), name
+        assert cumulative[-1] == pytest.approx(1.0), name
+
+
+def _checkouts(catalog, name, mode):
+    records = create_simulation(
+        300,
+        seed=7,
+        mode=mode,
+        chunk_size=100,
+        catalog=catalog,
+        now=NOW,
+        scenario=Scenario.load(SCENARIOS_DIR / f"{name}.json"),
+    )
+    return sum(
+        event["event_type"] == "checkout" for record in records for event in record["events"]
+    )
+
+
+@pytest.mark.parametrize("mode", ["scalar", "batch"])
+def test_scenario_changes_the_event_mix(catalog, mode):
+    assert _checkouts(catalog, "window_shoppers", mode) < _checkouts(catalog, "loyal_buyers", mode)